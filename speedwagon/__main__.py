@@ -1,12 +1,8 @@
 import logging
 import sys
 import speedwagon
+import speedwagon.cli
 import speedwagon.config
-import speedwagon.startup
-import speedwagon.gui
-logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
-logger.addHandler(logging.StreamHandler())
 
 
 def main() -> None:
@@ -14,7 +10,17 @@ def main() -> None:
         import pytest  # type: ignore  # noqa
         sys.exit(pytest.main(sys.argv[2:]))
 
-    speedwagon.startup.main()
+    if len(sys.argv) > 1 and sys.argv[1] == "run":
+        sys.exit(speedwagon.cli.main(sys.argv[2:]))
+
+    # The GUI needs Qt, which "speedwagon run" doesn't load
+    from speedwagon import startup
+
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(logging.StreamHandler())
+
+    startup.main()
 
 
 if __name__ == '__main__':
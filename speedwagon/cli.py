@@ -0,0 +1,244 @@
+"""Run a workflow from the command line, without the GUI
+
+Usage:
+
+.. code-block:: shell-session
+
+    speedwagon run "Make Checksum Batch [Multiple]" --option Input=/data
+
+"""
+import argparse
+import logging
+import os
+import sys
+import traceback
+from typing import Any, Dict, List, Optional
+
+import speedwagon.config
+from speedwagon import execution, instrumentation, job, runner_strategies
+
+#: Exit status for a workflow that ran to completion
+EXIT_SUCCESS = 0
+
+#: Exit status for a workflow that failed or stopped before finishing
+EXIT_FAILURE = 1
+
+#: Exit status for an unknown workflow or invalid options
+EXIT_USAGE_ERROR = 2
+
+#: Exit status when the run was interrupted with Ctrl+C
+EXIT_INTERRUPTED = 130
+
+_TRUE_VALUES = {"true", "yes", "on", "1"}
+_FALSE_VALUES = {"false", "no", "off", "0"}
+
+
+def get_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="speedwagon run",
+        description="Run a workflow without opening the GUI."
+    )
+    parser.add_argument("workflow", help="Name of the workflow to run")
+    parser.add_argument(
+        "--option",
+        dest="options",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Set one of the workflow's options. Can be used more than once."
+    )
+    parser.add_argument(
+        "--max-workers",
+        dest="max_workers",
+        help="Number of worker processes to use, or auto. Overrides the "
+             "max_workers value in config.ini"
+    )
+    parser.add_argument(
+        "--trace",
+        dest="trace",
+        metavar="FILE",
+        help="Save how long each subtask took as a Chrome trace that can be "
+             "opened with chrome://tracing or https://ui.perfetto.dev"
+    )
+    parser.add_argument(
+        "--timing-summary",
+        dest="timing_summary",
+        metavar="FILE",
+        help="Save a CSV summary of the time and resources used by each "
+             "kind of subtask"
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        nargs="?",
+        const=os.curdir,
+        metavar="DIR",
+        help="Profile the subtasks in the worker processes and save the "
+             "merged profile in DIR, or the current directory"
+    )
+    parser.add_argument(
+        "--fresh",
+        dest="resume",
+        action="store_false",
+        help="Start over instead of resuming an interrupted run of the "
+             "workflow with the same options"
+    )
+    parser.add_argument(
+        "--debug",
+        dest="debug",
+        action='store_true',
+        help="Run with debug mode"
+    )
+    return parser
+
+
+def _convert_option_value(user_option, value: str) -> Any:
+    data_type = getattr(user_option, "data_type", str)
+    if data_type is bool:
+        if value.lower() in _TRUE_VALUES:
+            return True
+        if value.lower() in _FALSE_VALUES:
+            return False
+        raise ValueError(
+            f"Invalid value for {user_option.label_text}: {value}. "
+            f"Expected true or false")
+    if data_type in (int, float):
+        try:
+            return data_type(value)
+        except ValueError as error:
+            raise ValueError(
+                f"Invalid value for {user_option.label_text}: {value}"
+            ) from error
+    return value
+
+
+def build_options(workflow: job.AbsWorkflow,
+                  option_args: List[str]) -> Dict[str, Any]:
+    """Get the options for a workflow from KEY=VALUE arguments.
+
+    Options that are not given keep the workflow's default value.
+
+    Raises:
+        ValueError: An argument is malformed or not one of the workflow's
+            options.
+
+    """
+    user_options = {
+        user_option.label_text: user_option
+        for user_option in workflow.user_options()
+    }
+    options = {
+        label: user_option.data for label, user_option in user_options.items()
+    }
+
+    for option_arg in option_args:
+        key, separator, value = option_arg.partition("=")
+        if not separator:
+            raise ValueError(
+                f"Invalid option {option_arg}. Expected KEY=VALUE")
+
+        if key not in user_options:
+            valid_keys = ", ".join(user_options) or "none"
+            raise ValueError(
+                f"{workflow.name} has no option named {key}. "
+                f"Valid options: {valid_keys}")
+
+        options[key] = _convert_option_value(user_options[key], value)
+    return options
+
+
+def _get_max_workers(args: argparse.Namespace, config_file: str,
+                     workflow: job.AbsWorkflow) -> int:
+    if args.max_workers is not None:
+        return speedwagon.config.resolve_max_workers(
+            args.max_workers, workflow.resource_profile)
+    if os.path.exists(config_file):
+        return speedwagon.config.get_max_workers(config_file, workflow)
+    return speedwagon.config.resolve_max_workers(
+        resource_profile=workflow.resource_profile)
+
+
+def _save_timings(args: argparse.Namespace,
+                  run_timings: Optional[instrumentation.RunTimings],
+                  logger: logging.Logger) -> None:
+    if run_timings is None:
+        return
+    if args.trace:
+        with open(args.trace, "w", encoding="utf-8") as stream:
+            run_timings.write_trace(stream)
+        logger.info(f"Saved trace to {args.trace}")
+    if args.timing_summary:
+        with open(args.timing_summary, "w", newline="",
+                  encoding="utf-8") as stream:
+            run_timings.write_summary(stream)
+        logger.info(f"Saved timing summary to {args.timing_summary}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run a workflow from the command line.
+
+    Returns:
+        Exit status for the process.
+
+    """
+    args = get_arg_parser().parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(message)s"
+    )
+    logger = logging.getLogger(__name__)
+
+    platform_settings = speedwagon.config.get_platform_settings()
+    app_data_directory = platform_settings.get_app_data_directory()
+    config_file = os.path.join(app_data_directory, "config.ini")
+    if os.path.exists(config_file):
+        with speedwagon.config.ConfigManager(config_file) as cfg:
+            platform_settings._data.update(cfg.global_settings)
+
+    all_workflows = job.available_workflows()
+    try:
+        workflow_klass = all_workflows[args.workflow]
+    except KeyError:
+        print(f"Unknown workflow: {args.workflow}. Available workflows: "
+              f"{', '.join(sorted(all_workflows))}", file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    workflow = workflow_klass(global_settings=dict(platform_settings))
+    try:
+        options = build_options(workflow, args.options)
+        workflow.validate_user_options(**options)
+        max_workers = _get_max_workers(args, config_file, workflow)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    with execution.JobManager(
+            max_workers=max_workers,
+            io_workers=speedwagon.config.resolve_io_workers()) as manager:
+        if os.path.exists(app_data_directory):
+            manager.settings_path = app_data_directory
+        manager.profiles_path = args.profile
+
+        runner = runner_strategies.RunRunner(
+            runner_strategies.UsingHeadlessManager(manager,
+                                                   resume=args.resume)
+        )
+        try:
+            succeeded = runner.run(None, workflow, options, logger)
+        except KeyboardInterrupt:
+            manager.abort()
+            return EXIT_INTERRUPTED
+        except Exception as error:
+            manager.abort()
+            traceback.print_exc(file=sys.stderr)
+            logger.error(f"{workflow.name} failed. Reason: {error}")
+            return EXIT_FAILURE
+
+        _save_timings(args, manager.run_timings, logger)
+
+    return EXIT_SUCCESS if succeeded else EXIT_FAILURE
+
+
+if __name__ == '__main__':
+    sys.exit(main())
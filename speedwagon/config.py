@@ -8,11 +8,15 @@ from pathlib import Path
 import io
 import abc
 import collections.abc
-from typing import Optional, Dict, Type, Set, Iterator, Iterable
+from typing import Optional, Dict, Type, Set, Iterator, Iterable, \
+    TYPE_CHECKING
 import platform
 
-from speedwagon.job import all_required_workflow_keys
-from speedwagon.models import SettingsModel
+from speedwagon.job import all_required_workflow_keys, AbsWorkflow, \
+    ResourceProfile
+
+if TYPE_CHECKING:
+    from speedwagon.models import SettingsModel
 
 
 class AbsConfig(collections.abc.Mapping):
@@ -129,6 +133,16 @@ class ConfigManager(contextlib.AbstractContextManager):
             print("Unable to load global settings.", file=sys.stderr)
         return global_settings
 
+    def workflow_settings(self, workflow_name: str) -> dict:
+        """Get the settings in the section named after a workflow.
+
+        These override the settings in the GLOBAL section for that workflow
+        only.
+        """
+        if not self.cfg_parser.has_section(workflow_name):
+            return dict()
+        return dict(self.cfg_parser[workflow_name].items())
+
 
 def generate_default(config_file: str) -> None:
     """Generate config file with default settings"""
@@ -143,13 +157,17 @@ def generate_default(config_file: str) -> None:
         raise FileNotFoundError("Unable to locate user data directory")
 
     tessdata = os.path.join(data_dir, "tessdata")
+    checksum_cache = os.path.join(data_dir, "checksum_cache.sqlite")
 
     config = configparser.ConfigParser(allow_no_value=True)
     config.add_section("GLOBAL")
     config['GLOBAL'] = {
         "tessdata": tessdata,
+        "checksum_cache": checksum_cache,
+        "quick_verify_sample": "5",
         "starting-tab": "Tools",
-        "debug": "False"
+        "debug": "False",
+        "max_workers": "auto"
     }
 
     with open(config_file, "w") as file:
@@ -174,8 +192,11 @@ def get_platform_settings(configuration: Optional[AbsConfig] = None) -> \
     return configuration
 
 
-def build_setting_model(config_file: str) -> SettingsModel:
+def build_setting_model(config_file: str) -> "SettingsModel":
     """Read a configuration file and generate a SettingsModel"""
+    # The models use Qt, which "speedwagon run" doesn't need to load
+    from speedwagon.models import SettingsModel
+
     if not os.path.exists(config_file):
         raise FileNotFoundError(f"No existing Configuration in ${config_file}")
 
@@ -188,7 +209,7 @@ def build_setting_model(config_file: str) -> SettingsModel:
     return my_model
 
 
-def serialize_settings_model(model: SettingsModel) -> str:
+def serialize_settings_model(model: "SettingsModel") -> str:
     """Convert a SettingsModel into a data format that can be written to a file.
 
     Note:
@@ -266,3 +287,72 @@ def ensure_keys(config_file: str, keys: Iterable[str]) -> Optional[Set[str]]:
         config_data.write(file_pointer)
 
     return added if len(added) > 0 else None
+
+
+# ProcessPoolExecutor refuses to start more workers than this on Windows
+WINDOWS_MAX_WORKERS = 61
+
+#: Threads for IO_BOUND jobs for each CPU. Those jobs spend most of their
+#: time waiting on the disk, so they don't need a CPU each.
+IO_WORKERS_PER_CPU = 2
+
+
+def resolve_max_workers(
+        value: Optional[str] = None,
+        resource_profile: ResourceProfile = ResourceProfile.CPU_BOUND
+) -> int:
+    """Get the number of worker processes from a max_workers setting.
+
+    Args:
+        value: Either a number or "auto". Empty or missing values are
+            treated as "auto".
+        resource_profile: Used to size the pool in auto mode. IO_BOUND
+            jobs run on the thread pool sized by resolve_io_workers, so
+            IO_BOUND workflows keep the same number of worker processes as
+            CPU_BOUND ones.
+
+    Returns:
+        Number of worker processes to use.
+
+    """
+    if value is None or str(value).strip().lower() in ("", "auto"):
+        cpu_count = os.cpu_count() or 1
+        auto_sizes = {
+            ResourceProfile.CPU_BOUND: cpu_count,
+            ResourceProfile.IO_BOUND: cpu_count,
+            ResourceProfile.MEMORY_BOUND: max(1, cpu_count // 2),
+        }
+        workers = auto_sizes[resource_profile]
+    else:
+        try:
+            workers = int(value)
+        except ValueError as error:
+            raise ValueError(
+                f"Invalid value for max_workers: {value}. "
+                f"Expected a number or auto"
+            ) from error
+        if workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+    if platform.system() == "Windows":
+        workers = min(workers, WINDOWS_MAX_WORKERS)
+    return workers
+
+
+def resolve_io_workers() -> int:
+    """Get the number of threads for running IO_BOUND jobs."""
+    return (os.cpu_count() or 1) * IO_WORKERS_PER_CPU
+
+
+def get_max_workers(config_file: str, workflow: AbsWorkflow) -> int:
+    """Get the number of worker processes to use for running a workflow.
+
+    A max_workers value in a section named after the workflow takes priority
+    over the one in the GLOBAL section.
+    """
+    with ConfigManager(config_file) as cfg:
+        value = cfg.workflow_settings(str(workflow.name)).get(
+            "max_workers",
+            cfg.global_settings.get("max_workers")
+        )
+    return resolve_max_workers(value, workflow.resource_profile)
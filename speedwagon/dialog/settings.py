@@ -1,5 +1,7 @@
+import configparser
 import os
 import platform
+from typing import Optional
 
 from PyQt5 import QtWidgets, QtCore  # type: ignore
 
@@ -75,6 +77,24 @@ class GlobalSettingsTab(QtWidgets.QWidget):
 
         self.layout.addWidget(self.settings_table)
 
+        self.active_workers_label = QtWidgets.QLabel(self)
+        self.layout.addWidget(self.active_workers_label)
+        self.active_workers: Optional[int] = None
+
+    @property
+    def active_workers(self) -> Optional[int]:
+        """Number of worker processes currently used by the job manager"""
+        return self._active_workers
+
+    @active_workers.setter
+    def active_workers(self, value: Optional[int]) -> None:
+        self._active_workers = value
+        if value is None:
+            self.active_workers_label.setText("")
+        else:
+            self.active_workers_label.setText(
+                f"Worker processes in use: {value}")
+
     def read_config_data(self) -> None:
         if self.config_file is None:
             raise FileNotFoundError("No Configuration file set")
@@ -92,8 +112,13 @@ class GlobalSettingsTab(QtWidgets.QWidget):
             print("Saving changes")
             data = config.serialize_settings_model(self.settings_table.model())
 
+            # Keep any workflow specific sections already in the file
+            config_data = configparser.ConfigParser()
+            config_data.read(self.config_file)
+            config_data.read_string(data)
+
             with open(self.config_file, "w") as fw:
-                fw.write(data)
+                config_data.write(fw)
 
             msg_box = QtWidgets.QMessageBox(self)
             msg_box.setWindowTitle("Saved changes")
@@ -0,0 +1,1159 @@
+"""Run jobs in worker processes
+
+Nothing in this module depends on Qt, so the worker processes that unpickle
+and run the jobs don't have to load it. The GUI's job manager, which does
+use Qt, is in :py:mod:`speedwagon.worker`.
+"""
+import abc
+import concurrent.futures
+import contextlib
+import enum
+import functools
+import heapq
+import importlib
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+import typing
+
+from . import instrumentation
+from .tasks import AbsSubtask, QueueAdapter, ResourceProfile, Subtask
+
+
+class MessageChannelControl(enum.Enum):
+    """Control values sent through the message channel instead of a batch"""
+    STOP = 0
+    SYNC = 1
+
+
+class WorkerStarted(typing.NamedTuple):
+    """Sent through the message channel by each worker process as it starts.
+
+    Lets the job manager find its own worker processes to terminate them.
+    """
+    pid: int
+
+
+class JobStarted(typing.NamedTuple):
+    """Sent through the message channel by a worker process right before it
+    runs a job that writes files."""
+
+    #: Chunk of jobs the job belongs to
+    chunk_id: int
+
+    #: Output files of the job that didn't exist before it started. These
+    #: are removed if the job is terminated.
+    created_files: typing.Tuple[str, ...]
+
+
+class MessageBatcher:
+    """Send log messages from a worker process to the job manager in batches.
+
+    Messages are buffered and written to the channel together once
+    max_messages have been collected or max_delay seconds have passed since
+    the first buffered message, whichever comes first.
+    """
+
+    def __init__(self, channel, max_messages: int = 100,
+                 max_delay: float = 0.25) -> None:
+        self._channel = channel
+        self.max_messages = max_messages
+        self.max_delay = max_delay
+        self._buffer: typing.List[str] = []
+        self._lock = threading.Lock()
+        self._timer: typing.Optional[threading.Timer] = None
+
+    def put(self, message: str) -> None:
+        with self._lock:
+            self._buffer.append(message)
+            if len(self._buffer) >= self.max_messages:
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def send_now(self, value) -> None:
+        """Send a control value right away, after the buffered messages."""
+        with self._lock:
+            self._flush()
+            self._channel.put(value)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._buffer:
+            self._channel.put(self._buffer)
+            self._buffer = []
+
+
+#: Slow to import modules used by the bundled workflows. A prewarmed worker
+#: pool imports them as soon as each worker starts.
+PREWARM_MODULES = (
+    "lxml.etree",
+    "hathi_validate.process",
+    "pyhathiprep.package_creater",
+    "uiucprescon.images",
+    "uiucprescon.imagevalidate",
+    "uiucprescon.ocr",
+    "uiucprescon.packager",
+)
+
+# Set in each worker process by _initialize_worker_process
+_worker_messages: typing.Optional[MessageBatcher] = None
+
+
+def _initialize_worker_process(message_channel,
+                               prewarm_modules: typing.Sequence[str] = ()
+                               ) -> None:
+    global _worker_messages
+    _worker_messages = MessageBatcher(message_channel)
+    _worker_messages.send_now(WorkerStarted(os.getpid()))
+    for module_name in prewarm_modules:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            # Not every workflow's dependencies have to be installed
+            continue
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+class AbsJobWorker(metaclass=abc.ABCMeta):
+    name: typing.Optional[str] = None
+
+    def __init__(self) -> None:
+        self.result = None
+        self.successful = None
+
+    def execute(self, *args, **kwargs):
+        try:
+            self.process(*args, **kwargs)
+            self.on_completion(*args, **kwargs)
+            self.successful = True
+            return self.result
+        except Exception as e:
+            print("Failed {}".format(e), file=sys.stderr)
+            self.successful = False
+            raise
+
+    @abc.abstractmethod
+    def process(self, *args, **kwargs):
+        pass
+
+    @abc.abstractmethod
+    def log(self, message):
+        pass
+
+    def on_completion(self, *args, **kwargs):
+        pass
+
+    @classmethod
+    def new(cls, job, message_queue, *args, **kwargs):
+        new_job = job()
+        new_job.set_message_queue(message_queue)
+        new_job.execute(*args, **kwargs)
+        return new_job.task_result
+
+
+class ProcessJobWorker(AbsJobWorker):
+    _mq = None
+
+    #: Quick jobs that can share a single call to a worker process with
+    #: other lightweight jobs.
+    lightweight = False
+
+    #: IO_BOUND jobs are run on a thread pool instead of a worker process
+    resource_profile = ResourceProfile.CPU_BOUND
+
+    #: Rough relative cost of the job. See AbsSubtask.cost
+    cost: typing.Optional[float] = None
+
+    #: Key the result of the job is recorded under in the run journal, if
+    #: the run has one
+    journal_key: typing.Optional[str] = None
+
+    def __init__(self) -> None:
+        super().__init__()
+
+    def process(self, *args, **kwargs):
+        pass
+
+    def set_message_queue(self, value):
+        self._mq = value
+
+    def log(self, message):
+        if self._mq:
+            self._mq.put(message)
+
+    def partial_output_files(self) -> typing.Sequence[str]:
+        """Files the job writes, to remove if it is terminated."""
+        return ()
+
+    def describe(self) -> typing.Any:
+        """Get what is pickled and sent to a worker process to run the job.
+
+        Override this to send something smaller than the whole job.
+        """
+        return self
+
+
+class JobPair(typing.NamedTuple):
+    task: ProcessJobWorker
+    args: dict
+
+    #: Jobs that can only start after this one has finished, in order
+    remaining: typing.Tuple["JobPair", ...] = ()
+
+
+def _sequence_cost(job_pair: JobPair) -> typing.Optional[float]:
+    costs = [job_.task.cost for job_ in (job_pair, *job_pair.remaining)
+             if job_.task.cost is not None]
+    return sum(costs) if costs else None
+
+
+class _PendingJobs(queue.Queue):
+    """Jobs waiting to be submitted, with the most expensive ones first.
+
+    Starting the longest jobs first keeps a few large files from running
+    alone at the end of a run while the other workers sit idle. The cost of
+    a sequence of jobs is the total of the costs of its jobs. Jobs without a
+    cost come after every job that has one, in the order they were added.
+    """
+
+    def _init(self, maxsize: int) -> None:
+        self.queue: typing.List[
+            typing.Tuple[typing.Tuple[int, float], int, JobPair]
+        ] = []
+        self._order = itertools.count()
+
+    def _qsize(self) -> int:
+        return len(self.queue)
+
+    def _put(self, item: JobPair) -> None:
+        cost = _sequence_cost(item)
+        priority = (1, 0.0) if cost is None else (0, -cost)
+        heapq.heappush(self.queue, (priority, next(self._order), item))
+
+    def _get(self) -> JobPair:
+        return heapq.heappop(self.queue)[-1]
+
+    def peek(self) -> typing.Optional[JobPair]:
+        """Get the job that would be taken next without removing it."""
+        with self.mutex:
+            return self.queue[0][-1] if self.queue else None
+
+
+class GuiLogHandler(logging.Handler):
+    def __init__(
+            self,
+            callback: typing.Callable[[str], None],
+            level: int = logging.NOTSET
+    ) -> None:
+
+        super().__init__(level)
+        self.callback = callback
+
+    def emit(self, record) -> None:
+        self.callback(logging.Formatter().format(record))
+
+
+class AbsJobManager(metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    def add_job(self, new_job, settings) -> None:
+        pass
+
+    @abc.abstractmethod
+    def start(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def flush_message_buffer(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def abort(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def open(self, parent, runner, *args, **kwargs):
+        """Open a runner for a phase of a workflow, such as a progress
+        dialog."""
+
+
+class JobChunkResult(typing.NamedTuple):
+    results: typing.List[typing.Any]
+    duration: float
+    timings: typing.Sequence[instrumentation.SubtaskTiming] = ()
+
+
+def _job_type_name(job_) -> str:
+    return type(getattr(job_, "adaptee", job_)).__name__
+
+
+def _report_job_started(channel: MessageBatcher, chunk_id: int,
+                        job_: ProcessJobWorker, reported: bool) -> bool:
+    # Once a job of the chunk has been reported, every following job is
+    # reported as well, so the files of a finished job are never mistaken
+    # for those of the running one
+    output_files = job_.partial_output_files()
+    if not output_files and not reported:
+        return False
+    channel.send_now(JobStarted(chunk_id, tuple(
+        output_file for output_file in output_files
+        if not os.path.exists(output_file)
+    )))
+    return True
+
+
+def _execute_jobs(jobs,
+                  message_channel: typing.Optional[MessageBatcher] = None,
+                  profile_directory: typing.Optional[str] = None,
+                  chunk_id: typing.Optional[int] = None) -> JobChunkResult:
+    """Run a chunk of jobs in a single call to a worker process or thread.
+
+    Jobs run in a worker process log to the channel set up when the process
+    started. Jobs run on a thread in the main process need to be given one.
+    Each job is measured and the measurements are returned with the results.
+    If a profile directory is given, the jobs are also profiled and the
+    profile is saved there. If a chunk id is given, the output files each
+    job is about to create are reported with a :py:class:`JobStarted`.
+    """
+    channel = message_channel or _worker_messages
+    started = time.perf_counter()
+    try:
+        results = []
+        timings = []
+        reported = False
+        for job_, settings in jobs:
+            if isinstance(job_, SubtaskDescriptor):
+                job_ = SubtaskJobAdapter(job_.build())
+            if channel is not None:
+                job_.set_message_queue(channel)
+                if chunk_id is not None:
+                    reported = _report_job_started(
+                        channel, chunk_id, job_, reported)
+            execute = job_.execute
+            if profile_directory is not None:
+                execute = functools.partial(
+                    instrumentation.profile, profile_directory, job_.execute)
+            result, timing = instrumentation.measure(
+                _job_type_name(job_), execute, **settings)
+            results.append(result)
+            timings.append(timing)
+    finally:
+        if channel is not None:
+            channel.flush()
+        if profile_directory is not None:
+            instrumentation.save_profile(profile_directory)
+    return JobChunkResult(results, time.perf_counter() - started, timings)
+
+
+def _runs_on_thread(job_: ProcessJobWorker) -> bool:
+    return job_.resource_profile is ResourceProfile.IO_BOUND
+
+
+class _Submission(typing.NamedTuple):
+    jobs: typing.List[JobPair]
+    lightweight: bool
+    chunk_id: int
+
+    @property
+    def job_count(self) -> int:
+        return len(self.jobs)
+
+
+class JobManager(contextlib.AbstractContextManager, AbsJobManager):
+    """Run jobs on a pool of worker processes without needing Qt.
+
+    Used directly for running workflows from the command line. The GUI uses
+    :py:class:`ToolJobManager`, which keeps the Qt event loop running while
+    waiting for results.
+    """
+
+    #: Default number of jobs submitted to the executor for each worker when
+    #: no explicit limit is set with max_in_flight.
+    IN_FLIGHT_PER_WORKER = 4
+
+    #: Default number of jobs that can wait to be submitted for each job in
+    #: the submission window when no explicit limit is set with max_pending.
+    PENDING_PER_IN_FLIGHT = 64
+
+    #: How long a chunk of lightweight jobs should take to run in a worker
+    CHUNK_TARGET_DURATION = 0.1
+
+    #: Largest number of lightweight jobs sent to a worker in a single chunk
+    MAX_CHUNK_SIZE = 256
+
+    #: Seconds to wait for a terminated worker to exit before killing it
+    TERMINATE_TIMEOUT = 5.0
+
+    #: Seconds to wait for the forwarder thread to read the messages already
+    #: sent by the workers
+    SYNC_TIMEOUT = 30.0
+
+    def __init__(self, max_workers: int = 1,
+                 max_in_flight: typing.Optional[int] = None,
+                 io_workers: typing.Optional[int] = None,
+                 prewarm_modules: typing.Sequence[str] = ()) -> None:
+        """Create a job manager.
+
+        Args:
+            max_workers: Number of worker processes for CPU-bound jobs
+            max_in_flight: Maximum number of jobs submitted at once
+            io_workers: Number of threads for jobs with an IO_BOUND
+                resource_profile. None uses the ThreadPoolExecutor default.
+            prewarm_modules: Modules each worker process imports when it
+                starts, such as :py:data:`PREWARM_MODULES`
+        """
+        self.settings_path = None
+        self._max_workers = max_workers
+        self._prewarm_modules = tuple(prewarm_modules)
+        self._prewarmed = False
+        self._io_workers = io_workers
+        self.max_in_flight = max_in_flight
+        self.max_pending = None
+        self.active = False
+        self._pending_jobs = _PendingJobs()
+        self.futures: typing.Dict[concurrent.futures.Future,
+                                  _Submission] = dict()
+        self._lightweight_job_duration: typing.Optional[float] = None
+        self._jobs_added = 0
+        self._completed_futures: "queue.Queue[concurrent.futures.Future]" = \
+            queue.Queue()
+        self._finished_futures: "queue.Queue[concurrent.futures.Future]" = \
+            queue.Queue()
+        self._log_buffer: "queue.Queue[str]" = queue.Queue()
+        self._in_flight = 0
+        self._lock = threading.RLock()
+        self._pending_space = threading.Condition(self._lock)
+        self._threads: typing.List[threading.Thread] = []
+        self._chunk_ids = itertools.count()
+
+        # Reported by the workers through the message channel. The files of
+        # the last job started in each chunk, and the workers' process ids.
+        self._started_jobs: typing.Dict[int, typing.Tuple[str, ...]] = \
+            dict()
+        self._worker_pids: typing.Set[int] = set()
+        self._executor: typing.Optional[concurrent.futures.Executor] = None
+        self._io_executor: \
+            typing.Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.logger = logging.getLogger(__name__)
+        self.user_settings = None
+        self.configuration_file = None
+
+        #: Measurements of the jobs run, when set. The runner sets a new one
+        #: at the start of each workflow run.
+        self.run_timings: typing.Optional[instrumentation.RunTimings] = None
+
+        #: Directory where the merged profile of each workflow run is saved.
+        #: Runs are only profiled when this is set.
+        self.profiles_path: typing.Optional[str] = None
+
+        #: Directory where the workers save the profiles of the jobs they
+        #: run. Jobs are profiled while it is set.
+        self.profile_directory: typing.Optional[str] = None
+
+    def __enter__(self):
+        self._messages_synced = threading.Event()
+        self._open_message_channel()
+
+        self._executor = self._create_executor()
+
+        # I/O-bound jobs don't need a process of their own. They run on
+        # threads and log through the same channel as the workers.
+        self._io_executor = concurrent.futures.ThreadPoolExecutor(
+            self._io_workers, thread_name_prefix="io job")
+        self._threads = [
+            threading.Thread(target=self._collect_finished_jobs,
+                             name="job collector", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # Leaving because of an error, such as Ctrl+C or a workflow
+            # failing while its tasks were being discovered. Nothing will
+            # collect the results, so the remaining jobs are not run.
+            self._cancel_jobs()
+        self._cleanup()
+        self._executor.shutdown()
+        self._io_executor.shutdown()
+        self._completed_futures.put(None)
+        self._message_queue.put(MessageChannelControl.STOP)
+        for thread in self._threads:
+            thread.join()
+        self._forwarder.join()
+        self._close_message_channel(self._message_queue)
+        self.flush_message_buffer()
+
+    def _open_message_channel(self) -> None:
+        # Workers receive the channel when they start, so no job needs to
+        # carry a queue proxy with it.
+        self._message_queue: "multiprocessing.SimpleQueue[typing.Any]" = \
+            multiprocessing.SimpleQueue()
+        self._thread_messages = MessageBatcher(self._message_queue)
+        self._forwarder = threading.Thread(
+            target=self._forward_messages,
+            args=(self._message_queue,),
+            name="job message forwarder",
+            daemon=True
+        )
+        self._forwarder.start()
+
+    @staticmethod
+    def _close_message_channel(message_queue) -> None:
+        # SimpleQueue can only be closed on Python 3.9 and newer. Before that
+        # its pipe is closed when it is garbage collected.
+        close = getattr(message_queue, "close", None)
+        if close is not None:
+            close()
+
+    def open(self, parent, runner, *args, **kwargs):
+        return runner(*args, **kwargs, parent=parent)
+
+    def _create_executor(self) -> concurrent.futures.Executor:
+        return concurrent.futures.ProcessPoolExecutor(
+            self._max_workers,
+            initializer=_initialize_worker_process,
+            initargs=(self._message_queue, self._prewarm_modules)
+        )
+
+    def prewarm(self) -> None:
+        """Start every worker process now instead of on the first job.
+
+        The workers start, and import the prewarm modules, in the background.
+        The same pool is then used by every phase of every workflow run until
+        the manager is closed, so later runs don't pay for starting workers
+        again. If the pool is resized, the new one is prewarmed as well.
+        """
+        if self._executor is None:
+            raise RuntimeError("The job manager has not been opened")
+        self._prewarmed = True
+        for _ in range(self._max_workers):
+            self._executor.submit(_worker_ready)
+
+    @property
+    def max_workers(self) -> int:
+        """Number of worker processes in the pool.
+
+        Changing this between runs replaces the pool with a new one of the
+        requested size.
+        """
+        return self._max_workers
+
+    @max_workers.setter
+    def max_workers(self, value: int) -> None:
+        if value < 1:
+            raise ValueError("max_workers must be at least 1")
+        if value == self._max_workers:
+            return
+        if self.active:
+            raise RuntimeError(
+                "Unable to resize the worker pool while jobs are running")
+        self._max_workers = value
+        if self._executor is not None:
+            self.logger.debug(f"Resizing worker pool to {value} workers")
+            self._executor.shutdown()
+            self._executor = self._create_executor()
+            if self._prewarmed:
+                self.prewarm()
+
+    @property
+    def max_in_flight(self) -> int:
+        """Maximum number of jobs submitted to the executor at once.
+
+        Jobs beyond this limit wait in the pending queue and are submitted as
+        the running ones complete. Set to None to use a multiple of the number
+        of workers.
+        """
+        if self._max_in_flight is not None:
+            return self._max_in_flight
+        return self._max_workers * self.IN_FLIGHT_PER_WORKER
+
+    @max_in_flight.setter
+    def max_in_flight(self, value: typing.Optional[int]) -> None:
+        if value is not None and value < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self._max_in_flight = value
+
+    @property
+    def max_pending(self) -> int:
+        """Maximum number of queued jobs waiting to be submitted.
+
+        Once the manager has been started, add_job() waits for the running
+        jobs to make room before queuing more than this. A sequence of jobs
+        counts once. Set to None to use a multiple of max_in_flight.
+        """
+        if self._max_pending is not None:
+            return self._max_pending
+        return self.max_in_flight * self.PENDING_PER_IN_FLIGHT
+
+    @max_pending.setter
+    def max_pending(self, value: typing.Optional[int]) -> None:
+        if value is not None and value < 1:
+            raise ValueError("max_pending must be at least 1")
+        self._max_pending = value
+
+    def add_job(self, new_job: ProcessJobWorker, settings: dict) -> None:
+        """Queue a job.
+
+        If the manager has already been started, the job is submitted to the
+        executor right away instead of waiting for another call to start().
+        When max_pending jobs are already waiting, this blocks until the
+        running jobs finish and make room, so queuing a large batch doesn't
+        keep every job in memory at once. The results of finished jobs are
+        still kept until get_results() collects them.
+        """
+        self._queue_job(JobPair(new_job, settings))
+
+    def add_job_sequence(
+            self,
+            jobs: typing.Sequence[typing.Tuple[ProcessJobWorker, dict]]
+    ) -> None:
+        """Queue jobs that have to run one after another.
+
+        Each job is only submitted once the one before it has finished, so
+        the subtasks of a single task never race each other. Separate
+        sequences still run in parallel.
+        """
+        if not jobs:
+            return
+        pairs = [JobPair(job_, settings) for job_, settings in jobs]
+        self._queue_job(pairs[0]._replace(remaining=tuple(pairs[1:])))
+
+    def _queue_job(self, job_pair: JobPair) -> None:
+        with self._lock:
+            if self.active:
+                # The collector thread makes room as the running jobs finish
+                self._pending_space.wait_for(
+                    lambda: not self.active or
+                    self._pending_jobs.qsize() < self.max_pending
+                )
+                if not self.active:
+                    # Aborted while waiting
+                    return
+            self._jobs_added += 1 + len(job_pair.remaining)
+            self._pending_jobs.put(job_pair)
+        if self.active:
+            self._submit_pending_jobs()
+
+    def start(self) -> None:
+        self.active = True
+        self._submit_pending_jobs()
+
+    @property
+    def chunk_size(self) -> int:
+        """Number of lightweight jobs to send to a worker at once.
+
+        This is adjusted from the average time it took to run the previous
+        lightweight jobs so that each chunk takes about
+        CHUNK_TARGET_DURATION seconds.
+        """
+        if not self._lightweight_job_duration:
+            return 1
+        size = int(self.CHUNK_TARGET_DURATION /
+                   self._lightweight_job_duration)
+        return max(1, min(size, self.MAX_CHUNK_SIZE))
+
+    def _take_chunk(self) -> typing.List[JobPair]:
+        chunk = [self._pending_jobs.get()]
+        if not chunk[0].task.lightweight:
+            return chunk
+
+        chunk_size = self.chunk_size
+        on_thread = _runs_on_thread(chunk[0].task)
+        while len(chunk) < chunk_size:
+            next_job = self._pending_jobs.peek()
+            if next_job is None or not next_job.task.lightweight or \
+                    _runs_on_thread(next_job.task) != on_thread:
+                break
+            chunk.append(self._pending_jobs.get())
+        return chunk
+
+    def _submit_chunk(self, chunk: typing.List[JobPair], chunk_id: int
+                      ) -> concurrent.futures.Future:
+        assert self._executor is not None and self._io_executor is not None
+        if _runs_on_thread(chunk[0].task):
+            jobs = [(job_.task, job_.args) for job_ in chunk]
+            return self._io_executor.submit(
+                _execute_jobs, jobs, self._thread_messages,
+                self.profile_directory)
+
+        # Only what is needed to run each job is sent to the worker
+        jobs = [(job_.task.describe(), job_.args) for job_ in chunk]
+        return self._executor.submit(_execute_jobs, jobs, None,
+                                     self.profile_directory, chunk_id)
+
+    def _submit_pending_jobs(self) -> None:
+        with self._lock:
+            while not self._pending_jobs.empty() and \
+                    self._in_flight < self.max_in_flight:
+
+                chunk = self._take_chunk()
+                chunk_id = next(self._chunk_ids)
+                fut = self._submit_chunk(chunk, chunk_id)
+                self._in_flight += 1
+                self.futures[fut] = _Submission(
+                    jobs=chunk,
+                    lightweight=chunk[0].task.lightweight,
+                    chunk_id=chunk_id
+                )
+                fut.add_done_callback(
+                    functools.partial(self._job_done, len(chunk))
+                )
+            self._pending_space.notify_all()
+
+    def _job_done(self, job_count: int,
+                  future: concurrent.futures.Future) -> None:
+        for _ in range(job_count):
+            self._pending_jobs.task_done()
+        self._completed_futures.put(future)
+
+    def _record_duration(self, submission: _Submission,
+                         chunk_result: JobChunkResult) -> None:
+        if not submission.lightweight:
+            return
+        duration = chunk_result.duration / submission.job_count
+        if self._lightweight_job_duration is None:
+            self._lightweight_job_duration = duration
+        else:
+            self._lightweight_job_duration = \
+                0.8 * self._lightweight_job_duration + 0.2 * duration
+
+    def _collect_finished_jobs(self) -> None:
+        # Runs on its own thread. Refills the submission window as soon as a
+        # job finishes and wakes up the Qt thread to collect the result.
+        while True:
+            future = self._completed_futures.get()
+            if future is None:
+                return
+            with self._lock:
+                self._in_flight -= 1
+                submission = self.futures.get(future)
+                if self.active and submission is not None and \
+                        not future.cancelled() and \
+                        future.exception() is None:
+                    self._queue_following_jobs(submission)
+            if self.active:
+                self._submit_pending_jobs()
+            self._finished_futures.put(future)
+            self._notify_job_finished()
+
+    def _queue_following_jobs(self, submission: _Submission) -> None:
+        for finished_job in submission.jobs:
+            if finished_job.remaining:
+                next_job, *after = finished_job.remaining
+                self._pending_jobs.put(
+                    next_job._replace(remaining=tuple(after))
+                )
+
+    def _forward_messages(self, message_queue) -> None:
+        # Runs on its own thread. Moves the batches of messages logged by the
+        # workers into a local buffer so that they can be flushed by the Qt
+        # thread.
+        while True:
+            try:
+                batch = message_queue.get()
+            except (EOFError, OSError):
+                # The channel was closed after its workers were terminated
+                return
+            if batch is MessageChannelControl.STOP:
+                return
+            try:
+                self._forward_batch(batch)
+            except Exception:
+                # One bad message must not stop the forwarder, or every
+                # message after it would be lost and _sync_messages would
+                # never return.
+                self.logger.exception("Unable to forward a job message")
+
+    def _forward_batch(self, batch) -> None:
+        if batch is MessageChannelControl.SYNC:
+            self._messages_synced.set()
+        elif isinstance(batch, JobStarted):
+            self._started_jobs[batch.chunk_id] = batch.created_files
+        elif isinstance(batch, WorkerStarted):
+            self._worker_pids.add(batch.pid)
+        else:
+            for message in batch:
+                self._log_buffer.put(message)
+            self._notify_messages_received()
+
+    def _notify_job_finished(self) -> None:
+        """Called from the collector thread each time a job finishes."""
+
+    def _notify_messages_received(self) -> None:
+        """Called from the forwarder thread when messages are buffered."""
+        self.flush_message_buffer()
+
+    def _sync_messages(self) -> None:
+        # Workers send their messages before returning a result, so once the
+        # forwarder thread reaches this marker, everything logged by the
+        # finished jobs is in the local buffer.
+        self._messages_synced.clear()
+        self._message_queue.put(MessageChannelControl.SYNC)
+        deadline = time.monotonic() + self.SYNC_TIMEOUT
+        while not self._messages_synced.wait(0.1):
+            if not self._forwarder.is_alive():
+                self.logger.warning(
+                    "Job message forwarder stopped. Some job messages may "
+                    "be missing")
+                return
+            if time.monotonic() > deadline:
+                self.logger.warning(
+                    "Timed out waiting for the job messages. Some job "
+                    "messages may be missing")
+                return
+
+    def _cancel_jobs(self) -> typing.List[concurrent.futures.Future]:
+        """Stop every job and return the ones that have to be waited for.
+
+        Jobs that haven't started are cancelled. Worker processes that are
+        running a job are terminated and replaced. The files created by the
+        jobs they were running, as reported by the workers when the jobs
+        started, are removed. Jobs on the I/O thread pool can't be
+        interrupted, so those are returned to be waited for.
+        """
+        self.active = False
+
+        with self._lock:
+            # Jobs that never made it into the submission window
+            while not self._pending_jobs.empty():
+                self._pending_jobs.get()
+                self._pending_jobs.task_done()
+            self._jobs_added = 0
+            self._pending_space.notify_all()
+
+            still_running: typing.Dict[concurrent.futures.Future,
+                                       _Submission] = dict()
+            for future, submission in list(self.futures.items()):
+                if not future.cancel() and not future.done():
+                    still_running[future] = submission
+                del self.futures[future]
+
+        on_threads = [
+            future for future, submission in still_running.items()
+            if _runs_on_thread(submission.jobs[0].task)
+        ]
+        in_workers = {
+            future: submission for future, submission in still_running.items()
+            if future not in on_threads
+        }
+        if in_workers:
+            self._restart_workers()
+            for future, submission in in_workers.items():
+                if future.done() and future.exception() is None:
+                    # Finished before its worker was terminated
+                    continue
+                self._remove_created_files(submission.chunk_id)
+        self._started_jobs.clear()
+        return on_threads
+
+    def _remove_created_files(self, chunk_id: int) -> None:
+        # Jobs that never reported starting haven't created anything. Files
+        # that existed before the job started are left alone.
+        for created_file in self._started_jobs.get(chunk_id, ()):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(created_file)
+                self.logger.debug(f"Removed partial output {created_file}")
+
+    def _worker_processes(self) -> \
+            typing.List[multiprocessing.process.BaseProcess]:
+        # Every worker reports its process id before it runs any job, so
+        # waiting for the forwarder to catch up finds every busy worker.
+        self._sync_messages()
+        return [
+            process for process in multiprocessing.active_children()
+            if process.pid in self._worker_pids
+        ]
+
+    def _restart_workers(self) -> None:
+        """Terminate the worker processes and start a new pool."""
+        old_executor = self._executor
+        assert old_executor is not None
+        old_message_queue = self._message_queue
+        old_forwarder = self._forwarder
+        processes = self._worker_processes()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(self.TERMINATE_TIMEOUT)
+            if process.is_alive():
+                process.kill()
+        # Its workers are gone, so the old pool shuts down straight away and
+        # fails the jobs they were running. Before Python 3.9, shutdown()
+        # can't cancel the queued jobs, and shutting down without waiting
+        # could close the pool before it failed the running ones.
+        with self._lock:
+            for future in self.futures:
+                future.cancel()
+        old_executor.shutdown()
+
+        # A terminated worker may have been writing to the message channel,
+        # which can leave it locked or half written. The new workers get a
+        # new channel. The old one is stopped from a separate thread so that
+        # a stuck channel can't block the caller. Whatever the old workers
+        # sent before they were terminated, including which jobs they
+        # started, is read before the old forwarder stops.
+        self._worker_pids = set()
+        self._open_message_channel()
+        threading.Thread(target=old_message_queue.put,
+                         args=(MessageChannelControl.STOP,),
+                         name="retire message channel",
+                         daemon=True).start()
+        old_forwarder.join(self.TERMINATE_TIMEOUT)
+
+        self._executor = self._create_executor()
+        if self._prewarmed:
+            self.prewarm()
+        self.logger.debug(f"Terminated {len(processes)} worker processes")
+
+    def abort(self):
+        still_running = self._cancel_jobs()
+        concurrent.futures.wait(still_running)
+        self.logger.info("Cancelled")
+        self.flush_message_buffer()
+
+        # Wake up get_results if it is waiting for a job
+        self._finished_futures.put(None)
+
+    def _wait_for_finished_job(self) -> \
+            typing.Optional[concurrent.futures.Future]:
+        if not self.active:
+            return None
+        return self._finished_futures.get()
+
+    # TODO: refactor to use an overloaded method instead of a callback
+    def get_results(self, timeout_callback=None, result_callback=None):
+        """Yield the results of the submitted jobs in the order they complete.
+
+        Finished jobs are collected by a background thread, so no CPU is
+        spent polling while the workers are busy.
+
+        If result_callback is given, it is called with each job and its
+        result before the result is yielded.
+        """
+        total_jobs = self._jobs_added
+        completed = 0
+        if timeout_callback:
+            timeout_callback(completed, total_jobs)
+
+        while self.active and (self.futures or
+                               not self._pending_jobs.empty()):
+
+            future = self._wait_for_finished_job()
+            if future is None or future not in self.futures:
+                # Left over from a job that was aborted
+                continue
+
+            submission = self.futures.pop(future)
+            if future.cancelled():
+                continue
+
+            try:
+                chunk_result = future.result()
+            except concurrent.futures.process.BrokenProcessPool as e:
+                if not self.active:
+                    # Its worker was terminated by abort()
+                    continue
+                traceback.print_tb(e.__traceback__)
+                print(e, file=sys.stderr)
+                raise
+            self._record_duration(submission, chunk_result)
+            if self.run_timings is not None:
+                self.run_timings.extend(chunk_result.timings)
+
+            for job_pair, result in zip(submission.jobs,
+                                        chunk_result.results):
+                if result_callback:
+                    result_callback(job_pair.task, result)
+                completed += 1
+                if timeout_callback:
+                    timeout_callback(completed, total_jobs)
+                yield result
+
+        self.active = False
+        self._jobs_added = 0
+
+        # Make sure every message sent by the workers has been forwarded
+        self._sync_messages()
+        self._started_jobs.clear()
+        self.flush_message_buffer()
+
+    def flush_message_buffer(self) -> None:
+        while True:
+            try:
+                message = self._log_buffer.get_nowait()
+            except queue.Empty:
+                return
+            self.logger.info(message)
+
+    def _cleanup(self) -> None:
+        if self._pending_jobs.unfinished_tasks > 0:
+            self.logger.warning("Pending jobs has unfinished tasks")
+        self._pending_jobs.join()
+
+
+# Attribute names of subtask types, shared by every descriptor of the type so
+# that pickle only writes them out once per chunk of jobs
+_field_names: typing.Dict[typing.Tuple[type, typing.Tuple[str, ...]],
+                          typing.Tuple[str, ...]] = dict()
+
+#: Subtask attributes that are set up again by the worker instead of being
+#: sent to it
+_WORKER_LOCAL_ATTRIBUTES = frozenset({"_parent_task_log_q"})
+
+# Attributes of a Subtask that hasn't run yet. Values that haven't changed
+# are left out of a descriptor and set again by Subtask.__init__.
+_SUBTASK_DEFAULTS = vars(Subtask())
+
+
+class SubtaskDescriptor:
+    """Compact description of a subtask, sent to a worker to run it.
+
+    Pickling a job adapter sends the adapter, the subtask and the name of
+    every attribute of the subtask along with it. A descriptor only holds the
+    subtask's type and a tuple of its attribute values. The attribute names
+    are a tuple shared by all the subtasks of the same type, so they are only
+    written once for a chunk of jobs. Attributes of a
+    :py:class:`speedwagon.tasks.Subtask` that still have their initial value
+    are left out.
+    """
+
+    __slots__ = ("subtask_type", "fields", "values")
+
+    def __init__(self, subtask_type: typing.Type[AbsSubtask],
+                 fields: typing.Tuple[str, ...],
+                 values: tuple) -> None:
+        self.subtask_type = subtask_type
+        self.fields = fields
+        self.values = values
+
+    def __reduce__(self):
+        return SubtaskDescriptor, (self.subtask_type, self.fields,
+                                   self.values)
+
+    @staticmethod
+    def can_describe(subtask: AbsSubtask) -> bool:
+        """Check that the subtask only needs its attributes to be rebuilt."""
+        subtask_type = type(subtask)
+        return hasattr(subtask, "__dict__") and \
+            subtask_type.__reduce_ex__ is object.__reduce_ex__ and \
+            subtask_type.__reduce__ is object.__reduce__ and \
+            getattr(subtask_type, "__getstate__", None) is \
+            getattr(object, "__getstate__", None) and \
+            not hasattr(subtask_type, "__setstate__")
+
+    @classmethod
+    def from_subtask(cls, subtask: AbsSubtask) -> "SubtaskDescriptor":
+        state = subtask.__dict__
+        subtask_type = type(subtask)
+        defaults = _SUBTASK_DEFAULTS if isinstance(subtask, Subtask) else {}
+        names = tuple(
+            name for name, value in state.items()
+            if name not in _WORKER_LOCAL_ATTRIBUTES and
+            not (name in defaults and value == defaults[name])
+        )
+        fields = _field_names.setdefault(
+            (subtask_type, names),
+            tuple(sys.intern(name) for name in names)
+        )
+        return cls(subtask_type, fields,
+                   tuple(state[name] for name in fields))
+
+    def build(self) -> AbsSubtask:
+        """Create the described subtask, without calling its __init__."""
+        subtask = self.subtask_type.__new__(self.subtask_type)
+        if isinstance(subtask, Subtask):
+            Subtask.__init__(subtask)
+        subtask.__dict__.update(zip(self.fields, self.values))
+        return subtask
+
+
+class AbsJobAdapter(metaclass=abc.ABCMeta):
+    def __init__(self, adaptee):
+        self._adaptee = adaptee
+
+    @property
+    def adaptee(self):
+        return self._adaptee
+
+    @abc.abstractmethod
+    def process(self, *args, **kwargs):
+        pass
+
+    @abc.abstractmethod
+    def set_message_queue(self, value):
+        pass
+
+    @property
+    @abc.abstractmethod
+    def name(self) -> str:
+        pass
+
+
+class SubtaskJobAdapter(AbsJobAdapter,  # type: ignore
+                        ProcessJobWorker):
+
+    def __init__(self, adaptee: AbsSubtask) -> None:
+        AbsJobAdapter.__init__(self, adaptee)
+        ProcessJobWorker.__init__(self)
+        self.adaptee.parent_task_log_q = QueueAdapter()
+
+    @property
+    def queue_adapter(self):
+        return QueueAdapter()
+
+    def process(self, *args, **kwargs):
+        self.adaptee.exec()
+        self.result = self.adaptee.task_result
+
+    def set_message_queue(self, value):
+        self.adaptee.parent_task_log_q.set_message_queue(value)
+
+    @property
+    def settings(self) -> dict:
+        # The subtask is sent to the worker with its attributes, so they don't
+        # need to be passed again as arguments
+        return self.adaptee.settings
+
+    def describe(self) -> typing.Any:
+        if SubtaskDescriptor.can_describe(self.adaptee):
+            return SubtaskDescriptor.from_subtask(self.adaptee)
+        return self
+
+    @property
+    def lightweight(self) -> bool:  # type: ignore
+        return self.adaptee.lightweight
+
+    @property
+    def resource_profile(self) -> ResourceProfile:  # type: ignore
+        return self.adaptee.resource_profile
+
+    @property
+    def cost(self) -> typing.Optional[float]:  # type: ignore
+        return self.adaptee.cost
+
+    def partial_output_files(self) -> typing.Sequence[str]:
+        return self.adaptee.partial_output_files()
+
+    @property
+    def name(self) -> str:  # type: ignore
+        return self.adaptee.name
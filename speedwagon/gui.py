@@ -199,6 +199,13 @@ class MainWindow(QtWidgets.QMainWindow, main_window_shell_ui.Ui_MainWindow):
 
         export_logs_button.triggered.connect(self.save_log)
         file_menu.addAction(export_logs_button)
+
+        # File --> Export Run Timings
+        export_timings_button = \
+            QtWidgets.QAction(" Export Run &Timings", self)
+
+        export_timings_button.triggered.connect(self.save_run_timings)
+        file_menu.addAction(export_timings_button)
         file_menu.setObjectName("fileMenu")
 
         file_menu.addSeparator()
@@ -320,6 +327,7 @@ class MainWindow(QtWidgets.QMainWindow, main_window_shell_ui.Ui_MainWindow):
             config_dialog.settings_location = self._work_manager.settings_path
 
         global_settings_tab = speedwagon.dialog.settings.GlobalSettingsTab()
+        global_settings_tab.active_workers = self._work_manager.max_workers
 
         if self._work_manager.settings_path is not None:
             global_settings_tab.config_file = \
@@ -370,6 +378,27 @@ class MainWindow(QtWidgets.QMainWindow, main_window_shell_ui.Ui_MainWindow):
 
         self.log_manager.info("Saved log to {}".format(log_file_name))
 
+    def save_run_timings(self) -> None:
+        run_timings = self._work_manager.run_timings
+        if run_timings is None or len(run_timings) == 0:
+            self.log_manager.warning("No workflow has been run yet")
+            return
+
+        epoch_in_minutes = int(time.time() / 60)
+        file_name, _ = \
+            QtWidgets.QFileDialog.getSaveFileName(
+                self,
+                "Export Run Timings",
+                "speedwagon_trace_{}.json".format(epoch_in_minutes),
+                "Chrome Trace (*.json);;CSV Summary (*.csv)")
+
+        if not file_name:
+            return
+        run_timings.save(file_name)
+
+        self.log_manager.info(
+            "Saved run timings to {}".format(file_name))
+
 
 class SplashScreenLogHandler(logging.Handler):
     def __init__(self, widget, level=logging.NOTSET):
@@ -0,0 +1,341 @@
+"""Measure how long subtasks take and what resources they use
+
+Every job run by :py:class:`speedwagon.execution.JobManager` is measured in
+the worker that runs it and the measurement is sent back with its result.
+The measurements of a workflow run are collected in a :py:class:`RunTimings`,
+which can be saved as a Chrome trace, to be opened with chrome://tracing or
+https://ui.perfetto.dev, or as a CSV summary.
+
+Jobs can also be run under :py:mod:`cProfile`. Each worker saves its profile
+in a directory shared by the run, and :py:func:`merge_profiles` combines them
+afterwards.
+"""
+
+import collections
+import cProfile
+import csv
+import glob
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import typing
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None  # type: ignore
+
+_IO_COUNTERS = "/proc/thread-self/io"
+
+
+class SubtaskTiming(typing.NamedTuple):
+    """Measurement of a single subtask."""
+
+    #: Name of the subtask's class
+    subtask: str
+
+    #: Process and thread that ran the subtask
+    pid: int
+    thread_id: int
+
+    #: Time the subtask started, in seconds since the epoch
+    start: float
+
+    #: Seconds the subtask took to run
+    wall_time: float
+
+    #: Seconds of CPU time used by the thread running the subtask
+    cpu_time: float
+
+    #: Peak resident memory of the worker process after the subtask finished,
+    #: in bytes. None if the platform doesn't report it.
+    max_rss: typing.Optional[int]
+
+    #: Bytes read and written by the thread running the subtask. None if the
+    #: platform doesn't report them.
+    read_bytes: typing.Optional[int]
+    written_bytes: typing.Optional[int]
+
+
+def _io_counters() -> typing.Tuple[typing.Optional[int],
+                                   typing.Optional[int]]:
+    try:
+        with open(_IO_COUNTERS, "rb") as counters:
+            lines = counters.read().split(b"\n")
+    except OSError:
+        return None, None
+    return int(lines[0].split()[1]), int(lines[1].split()[1])
+
+
+def _max_rss() -> typing.Optional[int]:
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # macOS reports bytes, other platforms kilobytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _difference(before: typing.Optional[int],
+                after: typing.Optional[int]) -> typing.Optional[int]:
+    if before is None or after is None:
+        return None
+    return after - before
+
+
+def measure(subtask: str, function: typing.Callable[..., typing.Any],
+            *args, **kwargs) -> typing.Tuple[typing.Any, SubtaskTiming]:
+    """Call a function and measure it.
+
+    Returns:
+        The function's return value and its measurement, recorded under the
+        name given as subtask.
+
+    """
+    read_before, written_before = _io_counters()
+    start = time.time()
+    cpu_started = time.thread_time()
+    started = time.perf_counter()
+
+    value = function(*args, **kwargs)
+
+    wall_time = time.perf_counter() - started
+    cpu_time = time.thread_time() - cpu_started
+    read_after, written_after = _io_counters()
+
+    return value, SubtaskTiming(
+        subtask=subtask,
+        pid=os.getpid(),
+        thread_id=threading.get_ident(),
+        start=start,
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        max_rss=_max_rss(),
+        read_bytes=_difference(read_before, read_after),
+        written_bytes=_difference(written_before, written_after)
+    )
+
+
+class _Summary:
+    def __init__(self) -> None:
+        self.count = 0
+        self.wall_time = 0.0
+        self.max_wall_time = 0.0
+        self.cpu_time = 0.0
+        self.max_rss: typing.Optional[int] = None
+        self.read_bytes: typing.Optional[int] = None
+        self.written_bytes: typing.Optional[int] = None
+
+    def add(self, timing: SubtaskTiming) -> None:
+        self.count += 1
+        self.wall_time += timing.wall_time
+        self.max_wall_time = max(self.max_wall_time, timing.wall_time)
+        self.cpu_time += timing.cpu_time
+        if timing.max_rss is not None:
+            self.max_rss = max(self.max_rss or 0, timing.max_rss)
+        if timing.read_bytes is not None:
+            self.read_bytes = (self.read_bytes or 0) + timing.read_bytes
+        if timing.written_bytes is not None:
+            self.written_bytes = \
+                (self.written_bytes or 0) + timing.written_bytes
+
+    def row(self, workflow: str, subtask: str) -> typing.List[typing.Any]:
+        return [
+            workflow,
+            subtask,
+            self.count,
+            f"{self.wall_time:.6f}",
+            f"{self.wall_time / self.count:.6f}",
+            f"{self.max_wall_time:.6f}",
+            f"{self.cpu_time:.6f}",
+            "" if self.max_rss is None else self.max_rss,
+            "" if self.read_bytes is None else self.read_bytes,
+            "" if self.written_bytes is None else self.written_bytes,
+        ]
+
+
+class RunTimings:
+    """Measurements of the subtasks run by a workflow run."""
+
+    SUMMARY_COLUMNS = [
+        "workflow",
+        "subtask",
+        "count",
+        "total_wall_time",
+        "mean_wall_time",
+        "max_wall_time",
+        "total_cpu_time",
+        "max_rss",
+        "read_bytes",
+        "written_bytes",
+    ]
+
+    def __init__(self, workflow: str) -> None:
+        self.workflow = workflow
+        self.timings: typing.List[SubtaskTiming] = []
+
+    def __len__(self) -> int:
+        return len(self.timings)
+
+    def extend(self, timings: typing.Iterable[SubtaskTiming]) -> None:
+        self.timings.extend(timings)
+
+    def trace_events(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Get the measurements as Chrome trace events.
+
+        Each subtask is a complete ("X") event on the process and thread that
+        ran it, with timestamps in microseconds from the start of the run.
+        """
+        if not self.timings:
+            return []
+        run_started = min(timing.start for timing in self.timings)
+
+        events: typing.List[typing.Dict[str, typing.Any]] = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": f"{self.workflow} worker {pid}"},
+            }
+            for pid in sorted({timing.pid for timing in self.timings})
+        ]
+        for timing in self.timings:
+            events.append({
+                "name": timing.subtask,
+                "cat": self.workflow,
+                "ph": "X",
+                "ts": round((timing.start - run_started) * 1e6, 3),
+                "dur": round(timing.wall_time * 1e6, 3),
+                "pid": timing.pid,
+                "tid": timing.thread_id,
+                "args": {
+                    "cpu_time": timing.cpu_time,
+                    "max_rss": timing.max_rss,
+                    "read_bytes": timing.read_bytes,
+                    "written_bytes": timing.written_bytes,
+                },
+            })
+        return events
+
+    def write_trace(self, stream: typing.TextIO) -> None:
+        """Write the measurements as Chrome trace JSON."""
+        json.dump(
+            {"traceEvents": self.trace_events(), "displayTimeUnit": "ms"},
+            stream
+        )
+
+    def write_summary(self, stream: typing.TextIO) -> None:
+        """Write a CSV summary of the measurements.
+
+        There is a row for each subtask class, followed by a row for the
+        whole workflow with an empty subtask column.
+        """
+        by_subtask: typing.DefaultDict[str, _Summary] = \
+            collections.defaultdict(_Summary)
+        total = _Summary()
+        for timing in self.timings:
+            by_subtask[timing.subtask].add(timing)
+            total.add(timing)
+
+        writer = csv.writer(stream, lineterminator="\n")
+        writer.writerow(self.SUMMARY_COLUMNS)
+        for subtask, summary in sorted(by_subtask.items()):
+            writer.writerow(summary.row(self.workflow, subtask))
+        if total.count:
+            writer.writerow(total.row(self.workflow, ""))
+
+    def save(self, file_name: str) -> None:
+        """Save the measurements to a file.
+
+        Files ending in .csv get the CSV summary, anything else gets the
+        Chrome trace.
+        """
+        with open(file_name, "w", newline="", encoding="utf-8") as stream:
+            if file_name.lower().endswith(".csv"):
+                self.write_summary(stream)
+            else:
+                self.write_trace(stream)
+
+
+# Profiler of each thread, for the profile directory of the current run
+_profilers = threading.local()
+
+
+def _thread_profiler(directory: str) -> cProfile.Profile:
+    if getattr(_profilers, "directory", None) != directory:
+        _profilers.directory = directory
+        _profilers.profiler = cProfile.Profile()
+        _profilers.used = False
+    return _profilers.profiler
+
+
+def profile(directory: str, function: typing.Callable[..., typing.Any],
+            *args, **kwargs) -> typing.Any:
+    """Call a function under the profiler of the current thread.
+
+    The profiler keeps adding up calls until it is saved to the directory
+    with :py:func:`save_profile`.
+    """
+    profiler = _thread_profiler(directory)
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another thread of the process is already being profiled. Newer
+        # versions of Python only allow one active profiler at a time.
+        return function(*args, **kwargs)
+    _profilers.used = True
+    try:
+        return function(*args, **kwargs)
+    finally:
+        profiler.disable()
+
+
+def save_profile(directory: str) -> None:
+    """Save the profile of the current thread in the directory.
+
+    Each process and thread has its own file, which is replaced every time
+    the profile is saved. Nothing is saved if the thread's profiler never
+    ran.
+    """
+    profiler = _thread_profiler(directory)
+    if not _profilers.used:
+        return
+    profiler.dump_stats(
+        os.path.join(directory,
+                     f"{os.getpid()}-{threading.get_ident()}.prof")
+    )
+
+
+def merge_profiles(directory: str) -> typing.Optional[pstats.Stats]:
+    """Merge the profiles saved by the workers in the directory.
+
+    Profiles that are empty or can't be read are skipped.
+
+    Returns:
+        The merged profile, or None if no profile could be read.
+
+    """
+    stats: typing.Optional[pstats.Stats] = None
+    for profile_file in sorted(glob.glob(os.path.join(directory, "*.prof"))):
+        try:
+            if stats is None:
+                stats = pstats.Stats(profile_file, stream=io.StringIO())
+            else:
+                stats.add(profile_file)
+        except (TypeError, ValueError, EOFError, OSError):
+            # pstats raises TypeError for a profile without any calls
+            continue
+    return stats
+
+
+def hot_functions(stats: pstats.Stats, limit: int = 20) -> str:
+    """Get a table of the functions with the most cumulative time."""
+    report = io.StringIO()
+    stats.stream = report  # type: ignore
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return report.getvalue().strip()
@@ -5,11 +5,17 @@ import importlib
 import inspect
 import logging
 import os
-import sys
-from typing import Type, Optional, Iterable, Dict, List, Any, Tuple, Set
+from typing import Type, Optional, Iterable, Dict, List, Any, Tuple, Set, \
+    Sequence, TYPE_CHECKING
 
-from PyQt5 import QtWidgets  # type: ignore
 from . import tasks
+from .tasks import ResourceProfile
+
+
+if TYPE_CHECKING:
+    # Worker processes import this module, so Qt is only imported for type
+    # checking.
+    from PyQt5 import QtWidgets  # type: ignore
 
 
 class JobCancelled(Exception):
@@ -23,24 +29,49 @@ class AbsWorkflow(metaclass=abc.ABCMeta):
     global_settings: Dict[str, str] = dict()
     required_settings_keys: Set[str] = set()
 
+    #: Used to size the worker pool when max_workers is set to auto
+    resource_profile = ResourceProfile.CPU_BOUND
+
+    #: Maximum number of jobs the job manager keeps submitted at once while
+    #: running this workflow. None uses the job manager's default.
+    max_in_flight: Optional[int] = None
+
     def __init__(self, *args, **kwargs) -> None:
         super().__init__()
         self.options = []  # type: ignore
 
+        # The GUI passes the settings as the first positional argument
+        global_settings = kwargs.get("global_settings")
+        if global_settings is None and args:
+            global_settings = args[0]
+        if global_settings is not None:
+            self.global_settings = global_settings
+
     @abc.abstractmethod
     def discover_task_metadata(self, initial_results: List[Any],
-                               additional_data, **user_args) -> List[dict]:
+                               additional_data,
+                               **user_args) -> Iterable[dict]:
         """Generate data or parameters needed for task to complete based on
         the user's original configuration
 
         Return a list of dictionaries of types that can be serialized,
             preferably strings.
 
+        This can also be written as a generator that yields each dictionary
+        as it is located. The runner submits every job as soon as it is
+        yielded, so workers can start processing while the rest of the
+        metadata is still being discovered.
+
         """
 
     def completion_task(self, task_builder: tasks.TaskBuilder, results,
                         **user_args) -> None:
-        pass
+        """Add subtasks to run after all the main tasks have finished.
+
+        The results of the earlier phases are given as a
+        :py:class:`speedwagon.results.ResultStore`, which reads them from
+        disk as it is iterated over.
+        """
 
     def initial_task(self, task_builder: tasks.TaskBuilder,
                      **user_args) -> None:
@@ -81,10 +112,15 @@ class AbsWorkflow(metaclass=abc.ABCMeta):
         """
 
     @classmethod
-    def generate_report(cls, results: List[tasks.Result], **user_args) \
+    def generate_report(cls, results: Sequence[tasks.Result], **user_args) \
             -> Optional[str]:
         """Generate a text report for the results of the workflow.
 
+            The results are given as a
+            :py:class:`speedwagon.results.ResultStore`. Iterating over it
+            reads the results from disk one batch at a time, so prefer
+            looping over it to copying everything into a list.
+
             Example:
                 .. code-block::
 
@@ -119,6 +155,15 @@ class AbsWorkflow(metaclass=abc.ABCMeta):
         """
         return True
 
+    def user_options(self) -> Sequence[Any]:
+        """Get the options the user sets before the workflow is run.
+
+        The label_text and data of each option are the names and default
+        values of the options given to the workflow.
+
+        """
+        return []
+
 
 class Workflow(AbsWorkflow):
     """Base class for defining a new workflow item
@@ -126,7 +171,7 @@ class Workflow(AbsWorkflow):
         Subclass this class to generate a new workflow
     """
 
-    def get_additional_info(self, parent: QtWidgets.QWidget,
+    def get_additional_info(self, parent: "QtWidgets.QWidget",
                             options: dict, pretask_results: list) -> dict:
         """If a user needs to be prompted for more information, run this
 
@@ -198,7 +243,6 @@ class AbsDynamicFinder(metaclass=abc.ABCMeta):
 
         except ImportError as e:
             msg = "Unable to load {}. Reason: {}".format(module_file, e)
-            print(msg, file=sys.stderr)
             self.logger.warning(msg)
 
     @property
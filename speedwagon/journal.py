@@ -0,0 +1,221 @@
+"""Keep track of finished subtasks so that interrupted runs can be resumed"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Set
+
+from .tasks import AbsSubtask
+
+#: Attributes set on every Subtask by the task builder. These depend on the
+#: temporary working directory of a run, so they are not used to tell
+#: subtasks apart.
+_RUN_SPECIFIC_ATTRIBUTES = {
+    "_parent_task_log_q",
+    "parent_task_log_q",
+    "_result",
+    "_status",
+    "_working_dir",
+    "task_working_dir",
+}
+
+
+# Default repr of an object, which is different in every run
+_OBJECT_ADDRESS = re.compile(r" at 0x[0-9a-fA-F]+")
+
+
+def _stable_repr(value: Any) -> str:
+    text = repr(value)
+    if _OBJECT_ADDRESS.search(text):
+        raise ValueError(
+            f"{type(value).__name__} has no stable representation, so it "
+            f"can't be recognized in a later run")
+    return text
+
+
+def _digest(value: Any) -> str:
+    try:
+        serialized = json.dumps(value, sort_keys=True, default=_stable_repr)
+    except TypeError as error:
+        raise ValueError(str(error)) from error
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def run_key(workflow_name: str, options: Dict[str, Any]) -> str:
+    """Identify a run of a workflow by its name and the user's options.
+
+    Raises:
+        ValueError: An option has a value that would be different in a
+            later run, such as an object without a repr of its own.
+
+    """
+    return _digest({"workflow": workflow_name, "options": options})
+
+
+def subtask_key(subtask: AbsSubtask) -> str:
+    """Identify a subtask by its type and its arguments.
+
+    Raises:
+        ValueError: An argument has a value that would be different in a
+            later run, such as an object without a repr of its own. The
+            subtask could never be matched by a resumed run.
+
+    """
+    if subtask.settings:
+        arguments = subtask.settings
+    else:
+        arguments = {
+            key: value for key, value in subtask.__dict__.items()
+            if key not in _RUN_SPECIFIC_ATTRIBUTES
+        }
+    subtask_type = type(subtask)
+    return _digest({
+        "type": f"{subtask_type.__module__}.{subtask_type.__qualname__}",
+        "arguments": arguments
+    })
+
+
+class RunJournal:
+    """Record the result of every subtask of a run as it finishes.
+
+    The journal is an SQLite database. If a run is interrupted, running the
+    same workflow again with the same options can pick up where it left off
+    by skipping the subtasks that already have a result recorded.
+
+    Results are committed at most every COMMIT_INTERVAL seconds, so that
+    runs with many small subtasks don't wait on the disk after each one.
+    """
+
+    #: Longest time in seconds a recorded result can wait to be committed
+    COMMIT_INTERVAL = 1.0
+
+    def __init__(self, database: str) -> None:
+        self.database = database
+        self._connection = sqlite3.connect(database)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_key TEXT PRIMARY KEY,
+                workflow TEXT NOT NULL,
+                started REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                run_key TEXT NOT NULL,
+                subtask_key TEXT NOT NULL,
+                result BLOB,
+                PRIMARY KEY (run_key, subtask_key)
+            );
+            """
+        )
+        self._connection.commit()
+        self._last_commit = time.monotonic()
+        self._run_key: Optional[str] = None
+        self._completed: Set[str] = set()
+
+    def __enter__(self) -> "RunJournal":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @classmethod
+    def in_directory(cls, directory: str) -> "RunJournal":
+        """Open the journal stored in a directory, such as the app data dir."""
+        return cls(os.path.join(directory, "journal.sqlite"))
+
+    def has_unfinished_run(self, workflow_name: str,
+                           options: Dict[str, Any]) -> bool:
+        """Check if a run with the same workflow and options was interrupted.
+
+        Only runs that recorded at least one result are worth resuming.
+        """
+        row = self._connection.execute(
+            "SELECT COUNT(*) FROM results WHERE run_key = ?",
+            (run_key(workflow_name, options),)
+        ).fetchone()
+        return row[0] > 0
+
+    def start_run(self, workflow_name: str, options: Dict[str, Any],
+                  resume: bool = False) -> None:
+        """Start recording a run.
+
+        Args:
+            workflow_name: Name of the workflow being run
+            options: User options the workflow is run with
+            resume: Keep the results recorded by an earlier run with the same
+                workflow and options. Otherwise they are discarded.
+
+        """
+        self._run_key = run_key(workflow_name, options)
+        if not resume:
+            self._forget(self._run_key)
+        self._connection.execute(
+            "INSERT OR IGNORE INTO runs (run_key, workflow, started) "
+            "VALUES (?, ?, ?)",
+            (self._run_key, workflow_name, time.time())
+        )
+        self._connection.commit()
+        self._completed = {
+            key for key, in self._connection.execute(
+                "SELECT subtask_key FROM results WHERE run_key = ?",
+                (self._run_key,)
+            )
+        }
+
+    def is_completed(self, key: str) -> bool:
+        return key in self._completed
+
+    def completed_result(self, key: str) -> Any:
+        """Get the result recorded for a subtask by an earlier run.
+
+        Results are read from the database when asked for, so resuming a
+        large run doesn't load all of them into memory.
+        """
+        if key not in self._completed:
+            raise KeyError(key)
+        row = self._connection.execute(
+            "SELECT result FROM results WHERE run_key = ? AND subtask_key = ?",
+            (self._run_key, key)
+        ).fetchone()
+        return pickle.loads(row[0])
+
+    def record(self, key: str, result: Any) -> None:
+        """Record the result of a subtask that has finished."""
+        if self._run_key is None:
+            raise RuntimeError("No run has been started")
+        self._connection.execute(
+            "INSERT OR REPLACE INTO results (run_key, subtask_key, result) "
+            "VALUES (?, ?, ?)",
+            (self._run_key, key, pickle.dumps(result))
+        )
+        self._completed.add(key)
+        if time.monotonic() - self._last_commit >= self.COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self) -> None:
+        self._connection.commit()
+        self._last_commit = time.monotonic()
+
+    def finish_run(self) -> None:
+        """Discard the results of the run once it has completed."""
+        if self._run_key is not None:
+            self._forget(self._run_key)
+            self._connection.commit()
+        self._run_key = None
+        self._completed = set()
+
+    def close(self) -> None:
+        self.commit()
+        self._connection.close()
+
+    def _forget(self, key: str) -> None:
+        self._connection.execute("DELETE FROM results WHERE run_key = ?",
+                                 (key,))
+        self._connection.execute("DELETE FROM runs WHERE run_key = ?",
+                                 (key,))
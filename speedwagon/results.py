@@ -0,0 +1,100 @@
+"""Keep the results of a workflow run on disk instead of in memory"""
+
+import collections.abc
+import os
+import pickle
+import sqlite3
+from typing import Any, Iterable, Iterator, List, Union
+
+
+class ResultStore(collections.abc.Sequence):
+    """Append-only list of results, stored in an SQLite file.
+
+    The runner collects the results of every phase of a run here and hands
+    the store to :py:meth:`speedwagon.job.Workflow.completion_task` and
+    :py:meth:`speedwagon.job.Workflow.generate_report`. Iterating over it
+    reads the results back from disk in batches, so a workflow that looks at
+    one result at a time never has all of them in memory.
+
+    It can be used like a read-only list: it supports len(), indexing,
+    sorted() and ``for`` loops. New results are added with append(),
+    extend() or ``+=``.
+    """
+
+    #: Number of results read from the disk at a time while iterating
+    BATCH_SIZE = 100
+
+    def __init__(self, database: str) -> None:
+        self.database = database
+        self._connection = sqlite3.connect(database)
+
+        # The store only lives as long as a run, so it doesn't need to
+        # survive a crash
+        self._connection.execute("PRAGMA journal_mode=OFF")
+        self._connection.execute("PRAGMA synchronous=OFF")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "id INTEGER PRIMARY KEY, "
+            "result BLOB)"
+        )
+        self._length = self._connection.execute(
+            "SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @classmethod
+    def in_directory(cls, directory: str) -> "ResultStore":
+        """Open a store in a directory, such as a run's working directory."""
+        return cls(os.path.join(directory, "results.sqlite"))
+
+    def append(self, result: Any) -> None:
+        self._connection.execute(
+            "INSERT INTO results (id, result) VALUES (?, ?)",
+            (self._length, pickle.dumps(result))
+        )
+        self._length += 1
+
+    def extend(self, results: Iterable[Any]) -> None:
+        for result in results:
+            self.append(result)
+
+    def __iadd__(self, results: Iterable[Any]) -> "ResultStore":
+        self.extend(results)
+        return self
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        position = index + self._length if index < 0 else index
+        if not 0 <= position < self._length:
+            raise IndexError("result index out of range")
+        row = self._connection.execute(
+            "SELECT result FROM results WHERE id = ?", (position,)
+        ).fetchone()
+        return pickle.loads(row[0])
+
+    def __iter__(self) -> Iterator[Any]:
+        next_id = 0
+        while next_id < self._length:
+            batch: List[bytes] = [
+                row[0] for row in self._connection.execute(
+                    "SELECT result FROM results WHERE id >= ? "
+                    "ORDER BY id LIMIT ?",
+                    (next_id, self.BATCH_SIZE)
+                )
+            ]
+            if not batch:
+                return
+            next_id += len(batch)
+            for result in batch:
+                yield pickle.loads(result)
+
+    def close(self) -> None:
+        self._connection.close()
@@ -1,12 +1,20 @@
 """Defining execution of a given workflow steps and processes"""
 
 import abc
+import contextlib
 import logging
+import os
+import sys
 import tempfile
-from typing import List, Any
-
+import time
+from typing import Optional, List, Set, TextIO
+
+from . import config
+from . import execution
+from . import instrumentation
+from . import journal
+from . import results as result_store
 from . import tasks
-from . import worker
 from .job import AbsWorkflow, Workflow, JobCancelled
 
 
@@ -18,8 +26,13 @@ class AbsRunner(metaclass=abc.ABCMeta):
 
     @abc.abstractmethod
     def run(self, parent, job: AbsWorkflow, options: dict,
-            logger: logging.Logger, completion_callback=None) -> None:
-        pass
+            logger: logging.Logger, completion_callback=None) -> bool:
+        """Run a workflow.
+
+        Returns:
+            True if the workflow ran to completion, False otherwise.
+
+        """
 
 
 class RunRunner:
@@ -27,14 +40,15 @@ class RunRunner:
         self._strategy = strategy
 
     def run(self, parent, tool: AbsWorkflow, options: dict,
-            logger: logging.Logger, completion_callback=None) -> None:
+            logger: logging.Logger, completion_callback=None) -> bool:
 
-        self._strategy.run(parent, tool, options, logger, completion_callback)
+        return self._strategy.run(parent, tool, options, logger,
+                                  completion_callback)
 
 
 class UsingExternalManagerForAdapter(AbsRunner):
 
-    def __init__(self, manager: "worker.ToolJobManager") -> None:
+    def __init__(self, manager: "execution.JobManager") -> None:
         self._manager = manager
 
     def _update_progress(self, runner, current: int, total: int):
@@ -48,13 +62,16 @@ class UsingExternalManagerForAdapter(AbsRunner):
             runner.dialog.accept()
 
     def run(self, parent, job: AbsWorkflow, options: dict,
-            logger: logging.Logger, completion_callback=None) -> None:
-
-        results: List[Any] = []
+            logger: logging.Logger, completion_callback=None) -> bool:
 
         temp_dir = tempfile.TemporaryDirectory()
-        with temp_dir as build_dir:
+        with temp_dir as build_dir, \
+                self._open_journal(
+                    parent, job, options, logger) as run_journal, \
+                result_store.ResultStore.in_directory(build_dir) as results, \
+                self._profile_run(job, build_dir, logger):
             if isinstance(job, AbsWorkflow):
+                self._configure_manager(job, logger)
 
                 try:
                     pre_results = self._run_pre_tasks(parent, job, options,
@@ -75,7 +92,7 @@ class UsingExternalManagerForAdapter(AbsRunner):
                     else:
                         new_options = {}
                 except JobCancelled:
-                    return
+                    return False
 
                 except TaskFailed as e:
 
@@ -84,16 +101,18 @@ class UsingExternalManagerForAdapter(AbsRunner):
                         "Reason: {}".format(e)
                     )
 
-                    return
+                    return False
 
                 try:
-                    results += self._run_main_tasks(parent,
-                                                    job,
-                                                    options,
-                                                    pre_results,
-                                                    new_options,
-                                                    build_dir,
-                                                    logger)
+                    self._run_main_tasks(parent,
+                                         job,
+                                         options,
+                                         pre_results,
+                                         new_options,
+                                         build_dir,
+                                         logger,
+                                         results,
+                                         run_journal)
 
                 except TaskFailed as e:
 
@@ -102,7 +121,7 @@ class UsingExternalManagerForAdapter(AbsRunner):
                         "Reason: {}".format(e)
                     )
 
-                    return
+                    return False
 
                 try:
                     results += self._run_post_tasks(parent, job, options,
@@ -116,64 +135,253 @@ class UsingExternalManagerForAdapter(AbsRunner):
                         "Reason: {}".format(e)
                     )
 
-                    return
+                    return False
 
                 logger.debug("Generating report")
                 report = job.generate_report(results, **options)
                 if report:
                     logger.info(report)
 
+                if run_journal is not None:
+                    run_journal.finish_run()
+        return True
+
+    #: Number of functions listed in the log after a profiled run
+    PROFILE_REPORT_LENGTH = 20
+
+    @contextlib.contextmanager
+    def _profile_run(self, job, working_dir: str, logger: logging.Logger):
+        profiles_path = self._manager.profiles_path
+        if profiles_path is None:
+            yield
+            return
+
+        self._manager.profile_directory = \
+            os.path.join(working_dir, "profiles")
+        os.makedirs(self._manager.profile_directory)
+        try:
+            yield
+        finally:
+            profile_directory = self._manager.profile_directory
+            self._manager.profile_directory = None
+            try:
+                self._save_profile(job, profile_directory, profiles_path,
+                                   logger)
+            except Exception as e:
+                # Profiling is only a diagnostic, so it must not change the
+                # outcome of the run
+                logger.warning(f"Unable to save the profile. Reason: {e}")
+
+    def _save_profile(self, job, profile_directory: str, profiles_path: str,
+                      logger: logging.Logger) -> None:
+        stats = instrumentation.merge_profiles(profile_directory)
+        if stats is None:
+            return
+
+        os.makedirs(profiles_path, exist_ok=True)
+        file_name = "{}-{}.prof".format(
+            "".join(c if c.isalnum() else "_"
+                    for c in job.name or type(job).__name__),
+            time.strftime("%Y%m%d-%H%M%S")
+        )
+        profile_file = os.path.join(profiles_path, file_name)
+        stats.dump_stats(profile_file)
+
+        logger.info(f"Saved profile to {profile_file}")
+        logger.info(instrumentation.hot_functions(
+            stats, self.PROFILE_REPORT_LENGTH))
+
+    def _open_journal(self, parent, job, options: dict,
+                      logger: logging.Logger):
+        if not isinstance(job, AbsWorkflow) or \
+                self._manager.settings_path is None:
+            return contextlib.nullcontext()
+
+        try:
+            journal.run_key(str(job.name), options)
+        except ValueError as e:
+            logger.warning(
+                f"{job.name} can't be resumed if it is interrupted. {e}")
+            return contextlib.nullcontext()
+
+        run_journal = journal.RunJournal.in_directory(
+            self._manager.settings_path)
+
+        resume = \
+            run_journal.has_unfinished_run(job.name, options) and \
+            self._ask_to_resume(parent, job)
+
+        run_journal.start_run(job.name, options, resume=resume)
+        return run_journal
+
+    def _ask_to_resume(self, parent, job: AbsWorkflow) -> bool:
+        # Qt is imported only by the methods that show the GUI, so that
+        # UsingHeadlessManager can run without it
+        from PyQt5 import QtWidgets  # type: ignore
+
+        if QtWidgets.QApplication.instance() is None:
+            return True
+
+        answer = QtWidgets.QMessageBox.question(
+            parent,
+            "Resume",
+            f"An earlier run of {job.name} with the same options did not "
+            f"finish. Do you want to resume it? Subtasks that have already "
+            f"finished will be skipped.",
+        )
+        return answer == QtWidgets.QMessageBox.Yes
+
+    def _configure_manager(self, job: AbsWorkflow,
+                           logger: logging.Logger) -> None:
+        self._manager.max_in_flight = job.max_in_flight
+        self._manager.run_timings = \
+            instrumentation.RunTimings(job.name or type(job).__name__)
+        if self._manager.configuration_file is not None:
+            try:
+                max_workers = config.get_max_workers(
+                    self._manager.configuration_file, job)
+            except ValueError as e:
+                logger.warning(
+                    "{}. Sizing the worker pool automatically".format(e))
+                max_workers = config.resolve_max_workers(
+                    resource_profile=job.resource_profile)
+            self._manager.max_workers = max_workers
+
+    def _queue_main_tasks(
+            self, job: AbsWorkflow, options, pretask_results,
+            additional_data, working_dir, logger,
+            results: result_store.ResultStore,
+            run_journal: Optional[journal.RunJournal] = None
+    ) -> None:
+        """Discover the main tasks and queue their subtasks with the manager.
+
+        Results recorded in the journal for tasks that finished in an earlier
+        run are added to results instead of being queued again. Each job
+        queued carries its journal key, so its result can be recorded when
+        it finishes.
+        """
+        resumed_tasks = 0
+        journal_warnings: Set[str] = set()
+        i = -1
+
+        # Start the manager before discovering the tasks so that each job is
+        # submitted as soon as the workflow yields it.
+        self._manager.start()
+        try:
+            metadata_tasks = \
+                job.discover_task_metadata(pretask_results,
+                                           additional_data,
+                                           **options) or []
+
+            for new_task_metadata in metadata_tasks:
+
+                main_task_builder = tasks.TaskBuilder(
+                    tasks.MultiStageTaskBuilder(working_dir),
+                    working_dir
+                )
+
+                job.create_new_task(main_task_builder, **new_task_metadata)
+
+                new_task = main_task_builder.build_task()
+
+                subtask_keys: List[Optional[str]] = \
+                    [None] * len(new_task.subtasks)
+                if run_journal is not None:
+                    try:
+                        subtask_keys = [journal.subtask_key(subtask)
+                                        for subtask in new_task.subtasks]
+                    except ValueError as e:
+                        # Left out of the journal, so it is run again if the
+                        # run is resumed
+                        if str(e) not in journal_warnings:
+                            journal_warnings.add(str(e))
+                            logger.warning(
+                                f"Some tasks can't be resumed if the run is "
+                                f"interrupted. {e}")
+
+                    # Replay tasks finished by an interrupted run
+                    journaled_keys = [
+                        key for key in subtask_keys if key is not None
+                    ]
+                    if len(journaled_keys) == len(subtask_keys) and \
+                            all(map(run_journal.is_completed,
+                                    journaled_keys)):
+                        results += (
+                            result for result in
+                            map(run_journal.completed_result, journaled_keys)
+                            if result is not None
+                        )
+                        resumed_tasks += 1
+                        continue
+
+                # Subtasks of the same task depend on each other, so they are
+                # run in order. Other tasks can run in parallel.
+                task_jobs = []
+                for subtask, key in zip(new_task.subtasks, subtask_keys):
+                    i += 1
+
+                    adapted_tool = execution.SubtaskJobAdapter(subtask)
+                    adapted_tool.journal_key = key
+                    task_jobs.append((adapted_tool, adapted_tool.settings))
+
+                self._manager.add_job_sequence(task_jobs)
+        except BaseException:
+            # The jobs already queued would otherwise still be running, or
+            # waiting to run, when the manager is used for the next workflow
+            self._manager.abort()
+            raise
+
+        if resumed_tasks:
+            logger.info(
+                f"Resuming. Skipped {resumed_tasks} tasks that finished in an "
+                f"earlier run")
+        logger.info("Found {} jobs".format(i + 1))
+
+    @staticmethod
+    def _journal_recorder(run_journal: Optional[journal.RunJournal]):
+        def record_result(job_, result):
+            if run_journal is not None and job_.journal_key is not None:
+                run_journal.record(job_.journal_key, result)
+        return record_result
+
+    def _run_subtasks(self, subtasks, progress_callback) -> list:
+        for subtask in subtasks:
+            adapted_tool = execution.SubtaskJobAdapter(subtask)
+            self._manager.add_job(adapted_tool, adapted_tool.settings)
+        self._manager.start()
+
+        return [
+            result for result in
+            self._manager.get_results(progress_callback)
+            if result is not None
+        ]
+
     def _run_main_tasks(self, parent, job: AbsWorkflow, options,
                         pretask_results, additional_data, working_dir,
-                        logger) -> list:
-
-        results = []
+                        logger, results: result_store.ResultStore,
+                        run_journal: Optional[journal.RunJournal] = None
+                        ) -> None:
+        from . import worker
 
         with self._manager.open(parent=parent,
                                 runner=worker.WorkRunnerExternal3) as runner:
 
             runner.abort_callback = self._manager.abort
-            i = -1
             runner.dialog.setRange(0, 0)
             runner.dialog.setWindowTitle(job.name)
 
             try:
                 logger.addHandler(runner.progress_dialog_box_handler)
 
-                # Run the main tasks. Keep track of the progress
-                metadata_tasks = \
-                    job.discover_task_metadata(pretask_results,
-                                               additional_data,
-                                               **options) or []
-
-                for new_task_metadata in metadata_tasks:
-
-                    main_task_builder = tasks.TaskBuilder(
-                        tasks.MultiStageTaskBuilder(working_dir),
-                        working_dir
-                    )
-
-                    job.create_new_task(main_task_builder, **new_task_metadata)
-
-                    new_task = main_task_builder.build_task()
-                    for subtask in new_task.subtasks:
-                        i += 1
-
-                        adapted_tool = worker.SubtaskJobAdapter(
-                            subtask
-                        )
-
-                        self._manager.add_job(adapted_tool,
-                                              adapted_tool.settings)
-
-                logger.info("Found {} jobs".format(i + 1))
-                runner.dialog.setMaximum(i)
-                self._manager.start()
+                self._queue_main_tasks(
+                    job, options, pretask_results, additional_data,
+                    working_dir, logger, results, run_journal)
 
                 runner.dialog.show()
 
                 main_results = self._manager.get_results(
-                    lambda x, y: self._update_progress(runner, x, y)
+                    lambda x, y: self._update_progress(runner, x, y),
+                    self._journal_recorder(run_journal)
                 )
 
                 for result in main_results:
@@ -183,11 +391,37 @@ class UsingExternalManagerForAdapter(AbsRunner):
                     raise TaskFailed("User Aborted")
             finally:
                 logger.removeHandler(runner.progress_dialog_box_handler)
-            return results
+
+    @staticmethod
+    def _build_post_task(job, options, results,
+                         working_dir) -> tasks.MultiStageTask:
+        finalization_task_builder = tasks.TaskBuilder(
+            tasks.MultiStageTaskBuilder(working_dir),
+            working_dir
+        )
+
+        job.completion_task(finalization_task_builder,
+                            results,
+                            **options)
+
+        return finalization_task_builder.build_task()
+
+    @staticmethod
+    def _build_pre_task(job, options,
+                        working_dir) -> tasks.MultiStageTask:
+        task_builder = tasks.TaskBuilder(
+            tasks.MultiStageTaskBuilder(working_dir),
+            working_dir
+        )
+
+        job.initial_task(task_builder, **options)
+
+        return task_builder.build_task()
 
     def _run_post_tasks(self, parent, job, options, results, working_dir,
                         logger) -> list:
-        _results = []
+        from . import worker
+
         with self._manager.open(parent=parent,
                                 runner=worker.WorkRunnerExternal3) as runner:
 
@@ -195,29 +429,14 @@ class UsingExternalManagerForAdapter(AbsRunner):
             try:
                 logger.addHandler(runner.progress_dialog_box_handler)
 
-                finalization_task_builder = tasks.TaskBuilder(
-                    tasks.MultiStageTaskBuilder(working_dir),
-                    working_dir
-                )
-
-                job.completion_task(finalization_task_builder,
-                                    results,
-                                    **options)
+                task = self._build_post_task(job, options, results,
+                                             working_dir)
 
-                task = finalization_task_builder.build_task()
-                for subtask in task.main_subtasks:
-                    adapted_tool = worker.SubtaskJobAdapter(subtask)
-                    self._manager.add_job(adapted_tool, adapted_tool.settings)
-                self._manager.start()
-
-                post_results = self._manager.get_results(
+                _results = self._run_subtasks(
+                    task.main_subtasks,
                     lambda x, y: self._update_progress(runner, x, y)
                 )
 
-                for post_result in post_results:
-                    if post_result is not None:
-                        _results.append(post_result)
-
                 runner.dialog.accept()
                 runner.dialog.close()
                 if runner.was_aborted:
@@ -227,7 +446,7 @@ class UsingExternalManagerForAdapter(AbsRunner):
                 logger.removeHandler(runner.progress_dialog_box_handler)
 
     def _run_pre_tasks(self, parent, job, options, working_dir, logger):
-        results = []
+        from . import worker
 
         with self._manager.open(parent=parent,
                                 runner=worker.WorkRunnerExternal3) as runner:
@@ -236,28 +455,13 @@ class UsingExternalManagerForAdapter(AbsRunner):
             logger.addHandler(runner.progress_dialog_box_handler)
 
             try:
-                task_builder = tasks.TaskBuilder(
-                    tasks.MultiStageTaskBuilder(working_dir),
-                    working_dir
-                )
-
-                job.initial_task(task_builder, **options)
-
-                task = task_builder.build_task()
-                for subtask in task.main_subtasks:
-                    adapted_tool = worker.SubtaskJobAdapter(subtask)
-                    self._manager.add_job(adapted_tool, adapted_tool.settings)
-
-                self._manager.start()
+                task = self._build_pre_task(job, options, working_dir)
 
-                post_results = self._manager.get_results(
+                results = self._run_subtasks(
+                    task.main_subtasks,
                     lambda x, y: self._update_progress(runner, x, y)
                 )
 
-                for post_result in post_results:
-                    if post_result is not None:
-                        results.append(post_result)
-
                 runner.dialog.accept()
                 runner.dialog.close()
                 if runner.was_aborted:
@@ -270,3 +474,79 @@ class UsingExternalManagerForAdapter(AbsRunner):
     def _get_additional_options(parent, job, options, pretask_results) -> dict:
 
         return job.get_additional_info(parent, options, pretask_results)
+
+
+class UsingHeadlessManager(UsingExternalManagerForAdapter):
+    """Run a workflow without a GUI, reporting progress to a text stream.
+
+    Workflows that need to ask the user for more information after their
+    initial tasks can't be run this way.
+    """
+
+    #: Minimum number of seconds between progress updates
+    PROGRESS_INTERVAL = 1.0
+
+    def __init__(self, manager: "execution.JobManager",
+                 stream: TextIO = sys.stdout, resume: bool = True) -> None:
+        """Create a headless runner.
+
+        Args:
+            manager: Job manager to run the workflow with
+            stream: Where progress is reported
+            resume: Resume an interrupted run of the same workflow with the
+                same options. Otherwise it is discarded and started over.
+        """
+        super().__init__(manager)
+        self._stream = stream
+        self._resume = resume
+        self._last_progress_update = 0.0
+
+    def _report_progress(self, phase: str, current: int, total: int) -> None:
+        now = time.monotonic()
+        if current != total and \
+                now - self._last_progress_update < self.PROGRESS_INTERVAL:
+            return
+        self._last_progress_update = now
+        print(f"{phase}: {current}/{total}", file=self._stream, flush=True)
+
+    def _run_pre_tasks(self, parent, job, options, working_dir, logger):
+        task = self._build_pre_task(job, options, working_dir)
+        return self._run_subtasks(
+            task.main_subtasks,
+            lambda x, y: self._report_progress("Initial tasks", x, y)
+        )
+
+    def _run_main_tasks(self, parent, job: AbsWorkflow, options,
+                        pretask_results, additional_data, working_dir,
+                        logger, results: result_store.ResultStore,
+                        run_journal: Optional[journal.RunJournal] = None
+                        ) -> None:
+
+        self._queue_main_tasks(
+            job, options, pretask_results, additional_data, working_dir,
+            logger, results, run_journal)
+
+        main_results = self._manager.get_results(
+            lambda x, y: self._report_progress(str(job.name), x, y),
+            self._journal_recorder(run_journal)
+        )
+        results += filter(lambda result: result is not None, main_results)
+
+    def _run_post_tasks(self, parent, job, options, results, working_dir,
+                        logger) -> list:
+        task = self._build_post_task(job, options, results, working_dir)
+        return self._run_subtasks(
+            task.main_subtasks,
+            lambda x, y: self._report_progress("Finishing", x, y)
+        )
+
+    @staticmethod
+    def _get_additional_options(parent, job, options, pretask_results) -> dict:
+        if type(job).get_additional_info is not Workflow.get_additional_info:
+            raise TaskFailed(
+                f"{job.name} needs to ask for more information while it "
+                f"runs, so it can only be run from the GUI")
+        return dict()
+
+    def _ask_to_resume(self, parent, job: AbsWorkflow) -> bool:
+        return self._resume
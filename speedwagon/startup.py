@@ -68,6 +68,7 @@ class DefaultsSetter(AbsSetting):
     def update(self, settings=None) -> Dict["str", Union[str, bool]]:
         new_settings = super().update(settings)
         new_settings["debug"] = False
+        new_settings["profile"] = False
         return new_settings
 
 
@@ -85,6 +86,9 @@ class CliArgsSetter(AbsSetting):
         if args.debug is True:
             new_settings["debug"] = args.debug
 
+        if args.profile is True:
+            new_settings["profile"] = args.profile
+
         return new_settings
 
     @staticmethod
@@ -112,6 +116,14 @@ class CliArgsSetter(AbsSetting):
             action='store_true',
             help="Run with debug mode"
         )
+
+        parser.add_argument(
+            "--profile",
+            dest="profile",
+            action='store_true',
+            help="Profile the workflows that are run and save the profiles "
+                 "in the app data directory"
+        )
         return parser
 
     @staticmethod
@@ -247,11 +259,22 @@ class StartupDefault(AbsStarter):
 
         self.set_app_display_metadata()
 
-        with worker.ToolJobManager() as work_manager:
+        with worker.ToolJobManager(
+                max_workers=self._get_max_workers(),
+                io_workers=speedwagon.config.resolve_io_workers(),
+                prewarm_modules=worker.PREWARM_MODULES) as work_manager:
+
+            # Start the workers while the rest of the app loads. They are
+            # kept for every workflow run until the app closes.
+            work_manager.prewarm()
 
             work_manager.settings_path = \
                 self.platform_settings.get_app_data_directory()
 
+            if self.startup_settings.get("profile"):
+                work_manager.profiles_path = \
+                    os.path.join(work_manager.settings_path, "profiles")
+
             windows = MainWindow(work_manager=work_manager,
                                  debug=self.startup_settings['debug'])
 
@@ -327,6 +350,15 @@ class StartupDefault(AbsStarter):
             self._logger.removeHandler(splash_message_handler)
             return self.app.exec_()
 
+    def _get_max_workers(self) -> int:
+        try:
+            return speedwagon.config.resolve_max_workers(
+                self.startup_settings.get("max_workers"))
+        except ValueError as e:
+            self._logger.warning(
+                "{}. Sizing the worker pool automatically".format(e))
+            return speedwagon.config.resolve_max_workers()
+
     def read_settings_file(self, settings_file: str) -> None:
         with speedwagon.config.ConfigManager(settings_file) as f:
             self.platform_settings._data.update(f.global_settings)
@@ -7,7 +7,9 @@ import enum
 import pickle
 import queue
 import sys
-from typing import NamedTuple, Type, Optional, List, Deque, Any
+import threading
+from typing import NamedTuple, Type, Optional, List, Deque, Any, Callable, \
+    Dict, Hashable, Tuple
 
 
 class TaskStatus(enum.IntEnum):
@@ -17,9 +19,96 @@ class TaskStatus(enum.IntEnum):
     FAILED = 3
 
 
+class ResourceProfile(enum.Enum):
+    """Describe what limits how fast a workflow or a subtask can run.
+
+    For workflows, this is used to decide how many worker processes to start
+    when max_workers is set to auto. For subtasks, it decides whether the job
+    manager runs them in a worker process or on a thread.
+    """
+
+    #: Mostly keeps a core busy, such as image conversions or OCR
+    CPU_BOUND = "cpu"
+
+    #: Mostly waits on disk or network access, such as hashing files
+    IO_BOUND = "io"
+
+    #: Needs a large amount of memory
+    MEMORY_BOUND = "memory"
+
+
+# Factories added with register_worker_resource, by name
+_resource_factories: Dict[str, Callable[..., Any]] = dict()
+
+# Resources already built in this process, by name and arguments
+_worker_resources: Dict[Tuple[Hashable, ...], Any] = dict()
+_worker_resources_lock = threading.RLock()
+
+
+def register_worker_resource(name: str, factory: Callable[..., Any]) -> None:
+    """Register a resource that is expensive to set up, such as an OCR engine.
+
+    Call this at module level in the module that defines the subtasks that
+    use the resource. Worker processes import that module when they unpickle
+    the subtasks, so the factory is registered in every process without the
+    job manager having to know about it.
+
+    Args:
+        name: Name the subtasks use to ask for the resource
+        factory: Builds the resource from the arguments given to
+            :py:func:`worker_resource`
+
+    """
+    _resource_factories[name] = factory
+
+
+def worker_resource(name: str, *args: Hashable) -> Any:
+    """Get a resource added with :py:func:`register_worker_resource`.
+
+    The resource is built the first time it is asked for in a process. Every
+    subtask that asks for it again with the same arguments, in the same
+    process, gets the same object back. Resources are shared by the threads
+    of a process, so only use this for objects that are safe to share or for
+    subtasks that run in worker processes.
+    """
+    key = (name, *args)
+    with _worker_resources_lock:
+        if key not in _worker_resources:
+            try:
+                factory = _resource_factories[name]
+            except KeyError as error:
+                raise KeyError(
+                    f"No worker resource registered as {name}") from error
+            _worker_resources[key] = factory(*args)
+        return _worker_resources[key]
+
+
+def clear_worker_resources() -> None:
+    """Drop every resource built in this process."""
+    with _worker_resources_lock:
+        _worker_resources.clear()
+
+
 class AbsSubtask(metaclass=abc.ABCMeta):
     name: Optional[str] = None
 
+    #: Set to True for small, quick subtasks, such as hashing a single file.
+    #: The job manager may run several of them in a single call to a worker
+    #: process to avoid paying the dispatch overhead for each one.
+    lightweight = False
+
+    #: Subtasks that are IO_BOUND are run on a thread pool in the main
+    #: process instead of in a worker process. Only use this for work that
+    #: spends its time waiting on disk or network access, or in code that
+    #: releases the GIL.
+    resource_profile = ResourceProfile.CPU_BOUND
+
+    #: Rough relative cost of running the subtask, such as the size in bytes
+    #: of the file it converts. The job manager starts the most expensive
+    #: jobs first. Subtasks with no cost are started after the others, in
+    #: the order they were added.
+    cost: Optional[float] = None
+
     @abc.abstractmethod
     def work(self) -> bool:
         pass
@@ -50,6 +139,17 @@ class AbsSubtask(metaclass=abc.ABCMeta):
     def exec(self) -> None:
         pass
 
+    def partial_output_files(self) -> List[str]:
+        """Get the files the subtask writes.
+
+        Called in the worker process right before the subtask runs. If the
+        worker is terminated because the user cancelled the job, the files
+        that didn't exist before the subtask started are removed. Override
+        this for subtasks that write files, so that a cancelled run doesn't
+        leave half-written files behind.
+        """
+        return []
+
     @property
     def settings(self):
         return {}
@@ -433,6 +533,11 @@ class TaskBuilder:
         TaskBuilder._task_counter += 1
         self.task_id = TaskBuilder._task_counter
 
+    @property
+    def working_dir(self) -> str:
+        """Directory for temporary files of the run the task is built for."""
+        return self._working_dir
+
     def build_task(self) -> MultiStageTask:
         task = self._builder.build_task()
         return task
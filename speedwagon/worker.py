@@ -13,7 +13,19 @@ from collections import namedtuple
 from PyQt5 import QtCore, QtWidgets  # type: ignore
 
 from .dialog.dialogs import WorkProgressBar
-from .tasks import AbsSubtask, QueueAdapter
+from .execution import (  # noqa: F401
+    PREWARM_MODULES,
+    AbsJobAdapter,
+    AbsJobManager,
+    AbsJobWorker,
+    GuiLogHandler,
+    JobManager,
+    JobPair,
+    MessageBatcher,
+    MessageChannelControl,
+    ProcessJobWorker,
+    SubtaskJobAdapter,
+)
 
 MessageLog = namedtuple("MessageLog", ("message",))
 
@@ -26,65 +38,6 @@ class NoWorkError(RuntimeError):
     pass
 
 
-class AbsJobWorker(metaclass=QtMeta):
-    name: typing.Optional[str] = None
-
-    def __init__(self) -> None:
-        self.result = None
-        self.successful = None
-
-    def execute(self, *args, **kwargs):
-        try:
-            self.process(*args, **kwargs)
-            self.on_completion(*args, **kwargs)
-            self.successful = True
-            return self.result
-        except Exception as e:
-            print("Failed {}".format(e), file=sys.stderr)
-            self.successful = False
-            raise
-
-    @abc.abstractmethod
-    def process(self, *args, **kwargs):
-        pass
-
-    @abc.abstractmethod
-    def log(self, message):
-        pass
-
-    def on_completion(self, *args, **kwargs):
-        pass
-
-    @classmethod
-    def new(cls, job, message_queue, *args, **kwargs):
-        new_job = job()
-        new_job.set_message_queue(message_queue)
-        new_job.execute(*args, **kwargs)
-        return new_job.task_result
-
-
-class ProcessJobWorker(AbsJobWorker):
-    _mq = None
-
-    def __init__(self) -> None:
-        super().__init__()
-
-    def process(self, *args, **kwargs):
-        pass
-
-    def set_message_queue(self, value):
-        self._mq = value
-
-    def log(self, message):
-        if self._mq:
-            self._mq.put(message)
-
-
-class JobPair(typing.NamedTuple):
-    task: ProcessJobWorker
-    args: dict
-
-
 class WorkerMeta(type(QtCore.QObject), abc.ABCMeta):  # type: ignore
     pass
 
@@ -127,35 +80,52 @@ class UIWorker(Worker):
 
 
 class ProcessWorker(UIWorker, QtCore.QObject, metaclass=WorkerMeta):
-    executor = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+    # Created on first use, so that importing this module doesn't start a
+    # worker process
+    executor: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.manager = multiprocessing.Manager()
-        self._message_queue = self.manager.Queue()  # type: ignore
+        self._manager = None
+        self._message_queue = None
         self._results = None
         self._tasks = []
 
+    @property
+    def manager(self):
+        # Starting a Manager spawns a server process, so only do it for
+        # workers that actually need a shared queue
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+            self._message_queue = self._manager.Queue()  # type: ignore
+        return self._manager
+
     @classmethod
     def initialize_worker(cls, max_workers: int = 1) -> None:
-
+        if cls.executor is not None:
+            cls.executor.shutdown()
         cls.executor = concurrent.futures.ProcessPoolExecutor(
             max_workers=max_workers
-        )  # TODO: Fix this
+        )
 
     def cancel(self) -> None:
-        self.executor.shutdown()
+        if self.executor is not None:
+            self.executor.shutdown()
+            type(self).executor = None
 
     @classmethod
     def _exec_job(cls, job, args, message_queue):
+        if cls.executor is None:
+            cls.initialize_worker()
         new_job = job()
         new_job.mq = message_queue
         fut = cls.executor.submit(new_job.execute, **args)
         return fut
 
-    def add_job(self, job: ProcessJobWorker, **job_args):
-        new_job = JobPair(job, args=job_args)
-        self._jobs_queue.put(new_job)
+    def add_job(self, job: typing.Type[ProcessJobWorker], **job_args):
+        # The job is created in the worker, so the class is queued along
+        # with the message queue it reports to
+        self._jobs_queue.put((job, job_args, self._message_queue))
 
     def run_all_jobs(self) -> None:
 
@@ -219,20 +189,6 @@ class AbsSubject(metaclass=abc.ABCMeta):
                     observer.emit(value)
 
 
-class GuiLogHandler(logging.Handler):
-    def __init__(
-            self,
-            callback: typing.Callable[[str], None],
-            level: int = logging.NOTSET
-    ) -> None:
-
-        super().__init__(level)
-        self.callback = callback
-
-    def emit(self, record) -> None:
-        self.callback(logging.Formatter().format(record))
-
-
 class WorkRunnerExternal3(contextlib.AbstractContextManager):
     def __init__(self, parent):
         self.results = []
@@ -261,203 +217,85 @@ class WorkRunnerExternal3(contextlib.AbstractContextManager):
         self.dialog.close()
 
 
-class AbsJobManager(metaclass=abc.ABCMeta):
-    @abc.abstractmethod
-    def add_job(self, new_job, settings) -> None:
-        pass
+class JobManagerSignals(QtCore.QObject):
+    """Signals used to wake the Qt thread from the job manager's threads."""
 
-    @abc.abstractmethod
-    def start(self) -> None:
-        pass
+    #: A job has finished and its future is ready to be collected
+    job_finished = QtCore.pyqtSignal()
 
-    @abc.abstractmethod
-    def flush_message_buffer(self) -> None:
-        pass
-
-    @abc.abstractmethod
-    def abort(self) -> None:
-        pass
+    #: Log messages from the workers are ready to be flushed
+    messages_received = QtCore.pyqtSignal()
 
 
-class ToolJobManager(contextlib.AbstractContextManager, AbsJobManager):
+class ToolJobManager(JobManager):
+    """Job manager used by the GUI.
 
-    def __init__(self, max_workers: int = 1) -> None:
-        self.settings_path = None
-        self.manager = multiprocessing.Manager()
-        self._max_workers = max_workers
-        self.active = False
-        self._pending_jobs: queue.Queue[JobPair] = queue.Queue()
-        self.futures: typing.List[concurrent.futures.Future] = []
-        self.logger = logging.getLogger(__name__)
-        self.user_settings = None
-        self.configuration_file = None
+    Finished jobs and log messages are reported to the Qt thread through
+    queued signals. While waiting for results, the Qt event loop keeps
+    running so that the application stays responsive.
+    """
 
-    def __enter__(self):
-        self._message_queue = self.manager.Queue()
-
-        self._executor = concurrent.futures.ProcessPoolExecutor(
-            self._max_workers
-        )
-
-        return self
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        self._cleanup()
-        self._executor.shutdown()
-
-    def open(self, parent, runner, *args, **kwargs):
-        return runner(*args, **kwargs, parent=parent)
-
-    def add_job(self, new_job: ProcessJobWorker, settings: dict) -> None:
-        self._pending_jobs.put(JobPair(new_job, settings))
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.signals = JobManagerSignals()
+        self.signals.messages_received.connect(self.flush_message_buffer)
+        self._waiting_loop: typing.Optional[QtCore.QEventLoop] = None
 
-    def start(self) -> None:
-        self.active = True
-        while not self._pending_jobs.empty():
-            job_, settings = self._pending_jobs.get()
-            job_.set_message_queue(self._message_queue)
-            fut = self._executor.submit(job_.execute, **settings)
+    def _notify_job_finished(self) -> None:
+        self.signals.job_finished.emit()
 
-            fut.add_done_callback(fn=lambda x: self._pending_jobs.task_done())
-            self.futures.append(fut)
+    def _notify_messages_received(self) -> None:
+        self.signals.messages_received.emit()
 
     def abort(self):
-        self.active = False
-        still_running = []
-
+        still_running = self._cancel_jobs()
         dialog_box = WorkProgressBar("Canceling", None, 0, 0)
 
-        for future in reversed(self.futures):
-            if not future.cancel and future.running():
-                still_running.append(future)
-            self.futures.remove(future)
-
         dialog_box.setRange(0, len(still_running))
         dialog_box.setLabelText("Please wait")
         dialog_box.show()
-        # TODO: set cancel dialog to force the cancellation of the future
 
-        while True:
+        # Worker processes have already been terminated. Only jobs on the
+        # I/O thread pool are left to finish. The collector thread reports
+        # each of them as it finishes.
+        stopping_loop = QtCore.QEventLoop()
 
-            try:
-                QtWidgets.QApplication.processEvents()
-
-                futures = concurrent.futures.as_completed(still_running,
-                                                          timeout=.1)
-
-                for i, future in enumerate(futures):
-                    dialog_box.setValue(i + 1)
+        def update_progress() -> None:
+            stopped = sum(future.done() for future in still_running)
+            dialog_box.setValue(stopped)
+            if stopped == len(still_running):
+                stopping_loop.quit()
 
-                break
-            except concurrent.futures.TimeoutError:
-                continue
+        self.signals.job_finished.connect(update_progress)
+        try:
+            if not all(future.done() for future in still_running):
+                stopping_loop.exec_()
+        finally:
+            self.signals.job_finished.disconnect(update_progress)
 
         self.logger.info("Cancelled")
         self.flush_message_buffer()
         dialog_box.accept()
+        self.signals.job_finished.emit()
 
-    # TODO: refactor to use an overloaded method instead of a callback
-    def get_results(self, timeout_callback=None):
-        total_jobs = len(self.futures)
-        completed = 0
-        futures = [(i, False) for i in self.futures]
-        while self.active:
-            try:
-                for f in concurrent.futures.as_completed(self.futures,
-                                                         timeout=0.01):
-                    self.flush_message_buffer()
-                    if not f.cancel() and f.done():
-                        completed += 1
-                        self.futures.remove(f)
-                        if timeout_callback:
-                            timeout_callback(completed, total_jobs)
-                        for i, (future, reported) in enumerate(futures):
-
-                            if not reported and future.done():
-                                result = future.result()
-                                yield result
-                                futures[i] = future, True
-                    if timeout_callback:
-                        timeout_callback(completed, total_jobs)
-
-                self.active = False
-                self.futures.clear()
-                self.flush_message_buffer()
-
-            except concurrent.futures.TimeoutError:
-                self.flush_message_buffer()
-                if timeout_callback:
-                    timeout_callback(completed, total_jobs)
-                QtWidgets.QApplication.processEvents()
-                if self.active:
-                    continue
-            except concurrent.futures.process.BrokenProcessPool as e:
-                traceback.print_tb(e.__traceback__)
-                print(e, file=sys.stderr)
-                print(f.exception(), file=sys.stderr)
-                raise
-            self.flush_message_buffer()
-
-    def flush_message_buffer(self) -> None:
-        while not self._message_queue.empty():
-            self.logger.info(self._message_queue.get())
-            self._message_queue.task_done()
-
-    def _cleanup(self) -> None:
-        if self._pending_jobs.unfinished_tasks > 0:
-            self.logger.warning("Pending jobs has unfinished tasks")
-        self._pending_jobs.join()
-
-
-class AbsJobAdapter(metaclass=abc.ABCMeta):
-    def __init__(self, adaptee):
-        self._adaptee = adaptee
+    def _wait_for_finished_job(self) -> \
+            typing.Optional[concurrent.futures.Future]:
 
-    @property
-    def adaptee(self):
-        return self._adaptee
-
-    @abc.abstractmethod
-    def process(self, *args, **kwargs):
-        pass
-
-    @abc.abstractmethod
-    def set_message_queue(self, value):
-        pass
-
-    @property
-    @abc.abstractmethod
-    def name(self) -> str:
-        pass
-
-
-class SubtaskJobAdapter(AbsJobAdapter,  # type: ignore
-                        ProcessJobWorker):
-
-    def __init__(self, adaptee: AbsSubtask) -> None:
-        AbsJobAdapter.__init__(self, adaptee)
-        ProcessJobWorker.__init__(self)
-        self.adaptee.parent_task_log_q = QueueAdapter()
-
-    @property
-    def queue_adapter(self):
-        return QueueAdapter()
-
-    def process(self, *args, **kwargs):
-        self.adaptee.exec()
-        self.result = self.adaptee.task_result
-
-    def set_message_queue(self, value):
-        self.adaptee.parent_task_log_q.set_message_queue(value)
+        if QtCore.QCoreApplication.instance() is None:
+            # Nothing needs to be kept responsive, so just block.
+            future = super()._wait_for_finished_job()
+            self.flush_message_buffer()
+            return future
 
-    @property
-    def settings(self) -> dict:
-        if self.adaptee.settings:
-            return self.adaptee.settings
-        else:
-            return {key: value for key, value in self.adaptee.__dict__.items()
-                    if key != "parent_task_log_q"}
+        if self._waiting_loop is None:
+            # One loop for the life of the manager, quit by the collector
+            # thread each time a job finishes
+            self._waiting_loop = QtCore.QEventLoop()
+            self.signals.job_finished.connect(self._waiting_loop.quit)
 
-    @property
-    def name(self) -> str:  # type: ignore
-        return self.adaptee.name
+        while self.active:
+            try:
+                return self._finished_futures.get_nowait()
+            except queue.Empty:
+                self._waiting_loop.exec_()
+        return None
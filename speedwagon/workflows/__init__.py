@@ -49,8 +49,16 @@ Changes:
        Generate MARC.XML Files supports MMSID and bibid id type
 
 """
-from .workflow_completeness import CompletenessWorkflow
-
 __all__ = [
     "CompletenessWorkflow"
 ]
+
+
+def __getattr__(name):
+    # Imported on first use. Worker processes import the module holding a
+    # single subtask from this package, and shouldn't have to load every
+    # workflow along with the GUI code they use.
+    if name == "CompletenessWorkflow":
+        from .workflow_completeness import CompletenessWorkflow
+        return CompletenessWorkflow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
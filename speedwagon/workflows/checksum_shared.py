@@ -1,7 +1,677 @@
+import collections
+import concurrent.futures
 import enum
+import hashlib
+import heapq
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, DefaultDict, Dict, Iterable, Iterator, \
+    List, Mapping, Optional, Sequence, Tuple
+
+from speedwagon import tasks
+from . import shared_custom_widgets
 
 
 class ResultsValues(enum.Enum):
     SOURCE_FILE = "source_filename"
     SOURCE_HASH = "checksum_hash"
     CHECKSUM_FILE = "checksum_file"
+    CACHED = "cached"
+    DIGESTS = "digests"
+    FILE_STAT = "file_stat"
+
+
+#: Label of the user option that makes a workflow ignore the checksum cache
+STRICT_OPTION = "Rehash all files"
+
+#: Label of the user option that makes a workflow write a SHA-256 manifest
+#: next to each checksum.md5
+MANIFEST_OPTION = "Write manifest-sha256.txt"
+
+
+#: Label of the user option that makes a workflow write a stat sidecar next
+#: to each checksum.md5, for quick verification
+SIDECAR_OPTION = "Write quick verify sidecar"
+
+#: Label of the user option that only rehashes files that changed since
+#: their checksums were recorded in a stat sidecar
+QUICK_VERIFY_OPTION = "Quick verify"
+
+#: Sidecar written next to a checksum.md5, with the size and modification
+#: time of each file when its checksum was calculated
+SIDECAR_FILE_NAME = "checksum.md5.stat"
+
+#: Percentage of unchanged files that quick verification rehashes anyway,
+#: when the quick_verify_sample setting isn't set
+DEFAULT_QUICK_VERIFY_SAMPLE = 5.0
+
+
+#: Hash algorithm of the manifest written with MANIFEST_OPTION
+MANIFEST_ALGORITHM = "sha256"
+
+
+def manifest_file_name(algorithm: str) -> str:
+    """Get the file name of a BagIt style manifest, such as
+    manifest-sha256.txt."""
+    return f"manifest-{algorithm}.txt"
+
+
+def manifest_path(checksum_report: str) -> str:
+    """Get where the manifest of a checksum.md5 is written."""
+    return os.path.join(os.path.dirname(checksum_report),
+                        manifest_file_name(MANIFEST_ALGORITHM))
+
+
+def sidecar_path(checksum_report: str) -> str:
+    """Get where the stat sidecar of a checksum.md5 is written."""
+    return os.path.join(os.path.dirname(checksum_report), SIDECAR_FILE_NAME)
+
+
+def _bool_option(label: str
+                 ) -> shared_custom_widgets.UserOptionPythonDataType2:
+    option = shared_custom_widgets.UserOptionPythonDataType2(label, bool)
+    option.data = False
+    return option
+
+
+def strict_option() -> shared_custom_widgets.UserOptionPythonDataType2:
+    """Create the user option for STRICT_OPTION, turned off."""
+    return _bool_option(STRICT_OPTION)
+
+
+def manifest_option() -> shared_custom_widgets.UserOptionPythonDataType2:
+    """Create the user option for MANIFEST_OPTION, turned off."""
+    return _bool_option(MANIFEST_OPTION)
+
+
+def sidecar_option() -> shared_custom_widgets.UserOptionPythonDataType2:
+    """Create the user option for SIDECAR_OPTION, turned off."""
+    return _bool_option(SIDECAR_OPTION)
+
+
+def quick_verify_option() -> shared_custom_widgets.UserOptionPythonDataType2:
+    """Create the user option for QUICK_VERIFY_OPTION, turned off."""
+    return _bool_option(QUICK_VERIFY_OPTION)
+
+
+#: Bytes read from a file at a time while hashing it
+HASH_BUFFER_SIZE = 1024 * 1024
+
+#: Threads shared by every file being hashed. With a single CPU, there is
+#: nothing to gain from hashing on another thread, so files are hashed on
+#: the thread that reads them.
+HASH_THREADS = os.cpu_count() or 1
+
+# Pair of read buffers of each thread, reused for every file it hashes
+_hash_buffers = threading.local()
+
+_hash_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
+
+
+def _read_buffers() -> List[memoryview]:
+    buffers = getattr(_hash_buffers, "buffers", None)
+    if buffers is None or len(buffers[0]) != HASH_BUFFER_SIZE:
+        buffers = [memoryview(bytearray(HASH_BUFFER_SIZE)) for _ in range(2)]
+        _hash_buffers.buffers = buffers
+    return buffers
+
+
+def _get_hash_pool() -> concurrent.futures.ThreadPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=HASH_THREADS,
+                thread_name_prefix="hash"
+            )
+        return _hash_pool
+
+
+def _forget_hash_pool() -> None:
+    # The threads of the pool don't exist in a forked process
+    global _hash_pool, _hash_pool_lock
+    _hash_pool = None
+    _hash_pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_hash_pool)
+
+
+def hash_file(path: str,
+              algorithms: Iterable[str] = ("md5",)) -> Dict[str, str]:
+    """Calculate the checksums of a file with several hash algorithms.
+
+    The file is only read once, into a pair of buffers that the thread
+    reuses for every file. Files larger than a buffer are hashed on a shared
+    thread pool while the next block is read, with each algorithm on its
+    own thread. hashlib releases the GIL while it hashes a block, so reading
+    and hashing run in parallel on machines with more than one CPU.
+
+    Args:
+        path: File to hash
+        algorithms: Names of hashlib algorithms, such as md5 and sha256
+
+    Returns:
+        Hex digest of the file by algorithm.
+
+    """
+    hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    buffers = _read_buffers()
+    with open(path, "rb", buffering=0) as file_:
+        size = file_.readinto(buffers[0])
+        if size < HASH_BUFFER_SIZE or HASH_THREADS < 2:
+            # Small files are most likely read in one go, so there is
+            # nothing to overlap
+            while size:
+                block = buffers[0][:size]
+                for file_hash in hashes.values():
+                    file_hash.update(block)
+                size = file_.readinto(buffers[0])
+        else:
+            _hash_blocks(file_, buffers, size, list(hashes.values()))
+    return {
+        algorithm: file_hash.hexdigest()
+        for algorithm, file_hash in hashes.items()
+    }
+
+
+def _hash_blocks(file_, buffers: List[memoryview], size: int,
+                 hashes: list) -> None:
+    pool = _get_hash_pool()
+    current = 0
+    while size:
+        block = buffers[current][:size]
+        pending = [pool.submit(file_hash.update, block)
+                   for file_hash in hashes]
+
+        # Read the next block into the other buffer while this one is hashed
+        current ^= 1
+        size = file_.readinto(buffers[current])
+
+        # The hashes have to be given blocks in order, and the buffer can't
+        # be reused until they are done with it
+        for update in pending:
+            update.result()
+
+
+class ChecksumCache:
+    """Checksums of files, remembered until the files change.
+
+    A file is looked up by its device, inode, size and modification time, so
+    a file that is renamed or moved on the same device keeps its entry and a
+    file that is written to gets a new one. The cache is shared by the
+    threads of a process and can be used by several processes at once.
+    """
+
+    #: Files modified less than this many seconds before they were hashed are
+    #: not cached. Their modification time could stay the same after another
+    #: change made within the resolution of the file system's clock.
+    RACY_INTERVAL = 2.0
+
+    def __init__(self, database: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+        self.database = database
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            database, timeout=30, check_same_thread=False,
+            isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS checksums ("
+            "device INTEGER, "
+            "inode INTEGER, "
+            "size INTEGER, "
+            "mtime_ns INTEGER, "
+            "algorithm TEXT, "
+            "digest TEXT, "
+            "PRIMARY KEY (device, inode, size, mtime_ns, algorithm))"
+        )
+
+    @staticmethod
+    def file_key(stat_result: os.stat_result
+                 ) -> Optional[Tuple[int, int, int, int]]:
+        """Get the key of a file from its stat() result.
+
+        Returns:
+            None if the file system doesn't give files a stable inode
+            number, in which case the file can't be cached.
+
+        """
+        if stat_result.st_ino == 0:
+            return None
+        return (stat_result.st_dev, stat_result.st_ino,
+                stat_result.st_size, stat_result.st_mtime_ns)
+
+    def get(self, key: Tuple[int, int, int, int],
+            algorithm: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digest FROM checksums WHERE device = ? AND inode = ? "
+                "AND size = ? AND mtime_ns = ? AND algorithm = ?",
+                (*key, algorithm)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, key: Tuple[int, int, int, int], algorithm: str,
+            digest: str) -> None:
+        try:
+            with self._lock:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO checksums "
+                    "(device, inode, size, mtime_ns, algorithm, digest) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, algorithm, digest)
+                )
+        except sqlite3.OperationalError:
+            # Another process has held the database for too long. The
+            # checksum is still correct, it just won't be remembered.
+            pass
+
+    def checksum(self, path: str, algorithm: str,
+                 calculate: Callable[[str], str],
+                 strict: bool = False) -> Tuple[str, bool]:
+        """Get the checksum of a file, calculating it if it isn't cached.
+
+        Args:
+            path: File to get the checksum of
+            algorithm: Name of the hash algorithm, such as md5
+            calculate: Calculates the checksum when it isn't cached
+            strict: Calculate the checksum even if it is cached. The new
+                checksum replaces the cached one.
+
+        Returns:
+            The checksum and whether it came from the cache.
+
+        """
+        digests, cached = self.checksums(
+            path, [algorithm],
+            lambda file_path, _: {algorithm: calculate(file_path)},
+            strict
+        )
+        return digests[algorithm], cached
+
+    def checksums(self, path: str, algorithms: Sequence[str],
+                  calculate: Callable[[str, Sequence[str]], Dict[str, str]],
+                  strict: bool = False) -> Tuple[Dict[str, str], bool]:
+        """Get the checksums of a file with several algorithms.
+
+        The checksums that aren't cached are calculated together, with a
+        single call to calculate.
+
+        Args:
+            path: File to get the checksums of
+            algorithms: Names of the hash algorithms
+            calculate: Calculates the checksums of a file with the algorithms
+                given, returning them by algorithm
+            strict: Calculate every checksum even if it is cached
+
+        Returns:
+            The checksums by algorithm and whether all of them came from the
+            cache.
+
+        """
+        key = self.file_key(os.stat(path))
+        digests: Dict[str, str] = dict()
+        if key is not None and not strict:
+            for algorithm in algorithms:
+                digest = self.get(key, algorithm)
+                if digest is not None:
+                    digests[algorithm] = digest
+
+        missing = [
+            algorithm for algorithm in algorithms if algorithm not in digests
+        ]
+        if not missing:
+            return digests, True
+
+        calculated = calculate(path, missing)
+        digests.update(calculated)
+
+        # Only remember the checksums if the file didn't change while it was
+        # being read
+        if key is not None and self.file_key(os.stat(path)) == key and \
+                time.time_ns() - key[3] > self.RACY_INTERVAL * 1e9:
+            for algorithm, digest in calculated.items():
+                self.put(key, algorithm, digest)
+        return digests, False
+
+
+tasks.register_worker_resource("checksum_cache", ChecksumCache)
+
+
+def calculate_checksums(path: str, algorithms: Sequence[str],
+                        calculate: Callable[[str, Sequence[str]],
+                                            Dict[str, str]],
+                        cache_file: Optional[str] = None,
+                        strict: bool = False
+                        ) -> Tuple[Dict[str, str], Optional[bool]]:
+    """Get the checksums of a file with several algorithms, using the
+    checksum cache if there is one.
+
+    Returns:
+        The checksums by algorithm and whether they all came from the cache,
+        or None for the second value if no cache file is given.
+
+    """
+    if cache_file is None:
+        return calculate(path, algorithms), None
+    cache: ChecksumCache = tasks.worker_resource("checksum_cache", cache_file)
+    return cache.checksums(path, algorithms, calculate, strict)
+
+
+def cache_file_setting(global_settings: Mapping[str, str]) -> Optional[str]:
+    """Get the location of the checksum cache from the global settings.
+
+    Returns:
+        None if the checksum_cache setting is missing or empty, which turns
+        the cache off.
+
+    """
+    return global_settings.get("checksum_cache") or None
+
+
+def _is_generated_file(package_root: str, root: str, file_name: str) -> bool:
+    # Files the optional outputs write next to checksum.md5 aren't part of
+    # the package, so they don't get checksums of their own
+    generated_files = {
+        SIDECAR_FILE_NAME,
+        manifest_file_name(MANIFEST_ALGORITHM),
+    }
+    return file_name in generated_files and \
+        os.path.normpath(root) == os.path.normpath(package_root)
+
+
+def checksum_jobs(package_root: str, checksum_report: str,
+                  skip_report: bool = False,
+                  **user_args) -> Iterator[Dict[str, Any]]:
+    """Describe the job for hashing each file of a package.
+
+    The files written next to checksum.md5 by the manifest and sidecar
+    options are left out. So is checksum_report itself if skip_report is
+    set, for workflows that regenerate an existing report.
+    """
+    for root, dirs, files in os.walk(package_root):
+        for file_ in files:
+            if _is_generated_file(package_root, root, file_):
+                continue
+            full_path = os.path.join(root, file_)
+            if skip_report and os.path.samefile(checksum_report, full_path):
+                continue
+            yield {
+                "source_path": package_root,
+                "filename": os.path.relpath(full_path, package_root),
+                "save_to_filename": checksum_report,
+                "strict": user_args.get(STRICT_OPTION, False),
+                "manifest": user_args.get(MANIFEST_OPTION, False)
+            }
+
+
+def add_checksum_task(task_builder: tasks.TaskBuilder,
+                      global_settings: Mapping[str, str],
+                      **job_args) -> None:
+    """Add the subtask for a job described by :py:func:`checksum_jobs`."""
+    # checksum_tasks imports this module, so it can't be imported at the top
+    from .checksum_tasks import MakeChecksumTask
+
+    task_builder.add_subtask(
+        MakeChecksumTask(
+            job_args["source_path"],
+            job_args["filename"],
+            job_args["save_to_filename"],
+            cache_file=cache_file_setting(global_settings),
+            strict=job_args.get("strict", False),
+            extra_algorithms=(MANIFEST_ALGORITHM,)
+            if job_args.get("manifest", False) else ()
+        )
+    )
+
+
+def file_stat(path: str) -> Tuple[int, int]:
+    """Get the size and modification time of a file, as recorded in a stat
+    sidecar."""
+    stat_result = os.stat(path)
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+
+def write_stat_sidecar(path: str,
+                       entries: Iterable[Tuple[str, Tuple[int, int]]]
+                       ) -> None:
+    """Write a stat sidecar.
+
+    Args:
+        path: File to write
+        entries: Name of each file, as listed in checksum.md5, with its size
+            and modification time in nanoseconds. They are written in the
+            order given, one at a time.
+
+    """
+    with open(path, "w", encoding="utf-8", newline="\n") as sidecar:
+        sidecar.write("size\tmtime_ns\tfilename\n")
+        for filename, (size, mtime_ns) in entries:
+            sidecar.write(f"{size}\t{mtime_ns}\t{filename}\n")
+
+
+def read_stat_sidecar(path: str) -> Dict[str, Tuple[int, int]]:
+    """Read the stat sidecar written with :py:func:`write_stat_sidecar`.
+
+    Returns:
+        Size and modification time of each file, by its normalized name.
+        Empty if there is no sidecar.
+
+    """
+    entries: Dict[str, Tuple[int, int]] = dict()
+    try:
+        with open(path, "r", encoding="utf-8") as sidecar:
+            next(sidecar, None)
+            for line in sidecar:
+                size, mtime_ns, filename = line.rstrip("\n").split("\t", 2)
+                entries[os.path.normpath(filename)] = \
+                    (int(size), int(mtime_ns))
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def is_unchanged(path: str, recorded_stat: Optional[Sequence[int]]) -> bool:
+    """Check if a file still has the size and modification time recorded in
+    its stat sidecar."""
+    if recorded_stat is None:
+        return False
+    try:
+        return file_stat(path) == tuple(recorded_stat)
+    except OSError:
+        return False
+
+
+def quick_verify_sample(global_settings: Mapping[str, str]) -> float:
+    """Get the fraction of unchanged files that quick verification rehashes.
+
+    Raises:
+        ValueError: The quick_verify_sample setting is not a percentage.
+
+    """
+    value = global_settings.get("quick_verify_sample") or \
+        DEFAULT_QUICK_VERIFY_SAMPLE
+    try:
+        percentage = float(value)
+    except ValueError as error:
+        raise ValueError(
+            f"Invalid quick_verify_sample setting: {value}. "
+            f"Expected a percentage") from error
+    if not 0 <= percentage <= 100:
+        raise ValueError(
+            f"Invalid quick_verify_sample setting: {value}. "
+            f"Expected a percentage between 0 and 100")
+    return percentage / 100
+
+
+def quick_verify_summary(hashed: Iterable[bool]) -> Optional[str]:
+    """Describe how many files quick verification didn't rehash.
+
+    Returns:
+        None if every file was rehashed.
+
+    """
+    hashed = list(hashed)
+    skipped = hashed.count(False)
+    if skipped == 0:
+        return None
+    return f"Quick verify: {skipped} of {len(hashed)} files were unchanged " \
+           f"since their checksums were recorded and were not rehashed"
+
+
+def cache_hit_summary(cached: Iterable[Optional[bool]]) -> Optional[str]:
+    """Describe how many checksums came from the checksum cache.
+
+    Args:
+        cached: For each file checked, whether its checksum came from the
+            cache, or None if the cache wasn't used
+
+    Returns:
+        None if the cache wasn't used.
+
+    """
+    hits = 0
+    total = 0
+    for was_cached in cached:
+        if was_cached is None:
+            continue
+        total += 1
+        if was_cached:
+            hits += 1
+    if total == 0:
+        return None
+    return f"Checksum cache: {hits} of {total} files " \
+           f"({hits / total:.1%}) were unchanged since they were last hashed"
+
+
+def checksum_reports_summary(results: Sequence[tasks.Result],
+                             **user_args) -> str:
+    """Describe the checksum reports written from the results of
+    MakeChecksumTask, and the optional files written with them."""
+    files_written = collections.Counter(
+        result.data[ResultsValues.CHECKSUM_FILE] for result in results)
+
+    report_lines = []
+    for checksum_report, file_count in sorted(files_written.items()):
+        report_lines.append(f"Checksum values for {file_count} "
+                            f"files written to {checksum_report}")
+        if user_args.get(MANIFEST_OPTION, False):
+            report_lines.append(
+                f"SHA-256 manifest written to "
+                f"{manifest_path(checksum_report)}")
+        if user_args.get(SIDECAR_OPTION, False):
+            report_lines.append(
+                f"Quick verify sidecar written to "
+                f"{sidecar_path(checksum_report)}")
+
+    cache_summary = cache_hit_summary(
+        result.data.get(ResultsValues.CACHED) for result in results)
+    if cache_summary is not None:
+        report_lines.append(cache_summary)
+
+    return "\n".join(report_lines)
+
+
+def _source_file(result: Mapping[ResultsValues, str]) -> str:
+    return result[ResultsValues.SOURCE_FILE]
+
+
+def _read_run(run_file: str) -> Iterator[Dict[ResultsValues, Any]]:
+    with open(run_file, "rb") as run:
+        while True:
+            try:
+                yield pickle.load(run)
+            except EOFError:
+                return
+
+
+class SortedChecksumResults:
+    """Results of a checksum report, sorted by file name.
+
+    The results are kept on disk in sorted runs written by
+    :py:class:`ChecksumResultsSorter`. Iterating merges the runs, so only one
+    result from each run is in memory at a time. Can be iterated more than
+    once and pickled, to be handed to a subtask.
+    """
+
+    def __init__(self, run_files: Sequence[str]) -> None:
+        self.run_files = list(run_files)
+
+    def __iter__(self) -> Iterator[Dict[ResultsValues, Any]]:
+        return heapq.merge(*(_read_run(run_file)
+                             for run_file in self.run_files),
+                           key=_source_file)
+
+
+class ChecksumResultsSorter:
+    """Group the results of MakeChecksumTask by checksum report, sorted by
+    file name, without keeping them all in memory."""
+
+    #: Number of results kept in memory before they are written to disk
+    RUN_SIZE = 100000
+
+    def __init__(self, directory: str) -> None:
+        self._directory = directory
+        self._buffers: DefaultDict[str, List[Dict[ResultsValues, Any]]] = \
+            collections.defaultdict(list)
+        self._buffered = 0
+        self._runs: DefaultDict[str, List[str]] = \
+            collections.defaultdict(list)
+        self._run_count = 0
+
+    def add(self, result: Dict[ResultsValues, Any]) -> None:
+        self._buffers[result[ResultsValues.CHECKSUM_FILE]].append(result)
+        self._buffered += 1
+        if self._buffered >= self.RUN_SIZE:
+            self._write_runs()
+
+    def _write_runs(self) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+        for checksum_report, buffer in self._buffers.items():
+            buffer.sort(key=_source_file)
+            self._run_count += 1
+            run_file = os.path.join(self._directory,
+                                    f"run-{self._run_count}.pickle")
+            with open(run_file, "wb") as run:
+                for result in buffer:
+                    pickle.dump(result, run, pickle.HIGHEST_PROTOCOL)
+            self._runs[checksum_report].append(run_file)
+        self._buffers.clear()
+        self._buffered = 0
+
+    def sorted_results(self) -> Dict[str, SortedChecksumResults]:
+        """Get the results of each checksum report, by report file name."""
+        self._write_runs()
+        return {
+            checksum_report: SortedChecksumResults(run_files)
+            for checksum_report, run_files in sorted(self._runs.items())
+        }
+
+
+def write_checksum_report(path: str,
+                          entries: Iterable[Tuple[str, str]]) -> None:
+    """Write a checksum.md5 one line at a time.
+
+    The output is the same as pyhathiprep's HathiChecksumReport.
+
+    Args:
+        path: File to write
+        entries: Name of each file with its MD5 checksum, sorted by file
+            name
+
+    """
+    with open(path, "w", encoding="utf-8") as report:
+        empty = True
+        for filename, hash_value in entries:
+            report.write(f"{hash_value} *{filename}\n")
+            empty = False
+        if empty:
+            report.write("\n")
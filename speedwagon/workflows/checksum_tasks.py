@@ -1,24 +1,53 @@
 import os
-
-from pyhathiprep import checksum
+from typing import Any, Dict, Iterable, Optional, Sequence
 
 import speedwagon
 from speedwagon import tasks
-from .checksum_shared import ResultsValues
+from .checksum_shared import ResultsValues, SortedChecksumResults, \
+    calculate_checksums, file_stat, hash_file, write_checksum_report, \
+    write_stat_sidecar
+
+
+def _in_file_name_order(checksum_calculations) -> Iterable[Dict[Any, Any]]:
+    # SortedChecksumResults are merged in file name order as they are read
+    # from disk. Anything else has to be sorted in memory.
+    if isinstance(checksum_calculations, SortedChecksumResults):
+        return checksum_calculations
+    return sorted(checksum_calculations,
+                  key=lambda item: item[ResultsValues.SOURCE_FILE])
 
 
 class MakeChecksumTask(tasks.Subtask):
+    lightweight = True
+    resource_profile = tasks.ResourceProfile.IO_BOUND
 
     def __init__(
             self,
             source_path: str,
             filename: str,
-            checksum_report: str
+            checksum_report: str,
+            cache_file: Optional[str] = None,
+            strict: bool = False,
+            extra_algorithms: Sequence[str] = ()
     ) -> None:
+        """Calculate the MD5 checksum of a file.
+
+        Args:
+            source_path: Root of the package the file is in
+            filename: Path of the file, relative to source_path
+            checksum_report: checksum.md5 the checksum is for
+            cache_file: Checksum cache to use, if any
+            strict: Hash the file even if its checksum is cached
+            extra_algorithms: Other hash algorithms to calculate from the
+                same read of the file, such as sha256 for a manifest
+        """
         super().__init__()
         self._source_path = source_path
         self._filename = filename
         self._checksum_report = checksum_report
+        self._cache_file = cache_file
+        self._strict = strict
+        self._extra_algorithms = tuple(extra_algorithms)
 
     def work(self) -> bool:
         item_path = self._source_path
@@ -27,12 +56,20 @@ class MakeChecksumTask(tasks.Subtask):
         self.log(f"Calculated the checksum for {item_file_name}")
 
         file_to_calculate = os.path.join(item_path, item_file_name)
+
+        # Recorded before the file is read, so that a change made while it
+        # is hashed shows up as a different size or modification time
+        stat_before_hashing = file_stat(file_to_calculate)
+        digests, cached = calculate_checksums(
+            file_to_calculate, ("md5", *self._extra_algorithms), hash_file,
+            cache_file=self._cache_file, strict=self._strict)
         result = {
             ResultsValues.SOURCE_FILE: item_file_name,
-            ResultsValues.SOURCE_HASH: checksum.calculate_md5_hash(
-                file_to_calculate),
-            ResultsValues.CHECKSUM_FILE: report_path_to_save_to
-
+            ResultsValues.SOURCE_HASH: digests["md5"],
+            ResultsValues.CHECKSUM_FILE: report_path_to_save_to,
+            ResultsValues.CACHED: cached,
+            ResultsValues.DIGESTS: digests,
+            ResultsValues.FILE_STAT: stat_before_hashing
         }
         self.set_results(result)
 
@@ -46,21 +83,75 @@ class MakeCheckSumReportTask(speedwagon.tasks.Subtask):
             output_filename: str,
             checksum_calculations
     ) -> None:
+        """Write a checksum.md5.
+
+        Args:
+            output_filename: checksum.md5 to write
+            checksum_calculations: Results of MakeChecksumTask for the
+                report. A SortedChecksumResults is written as it is merged
+                from disk, anything else is sorted in memory first.
+        """
         super().__init__()
         self._output_filename = output_filename
         self._checksum_calculations = checksum_calculations
 
     def work(self) -> bool:
+        write_checksum_report(
+            self._output_filename,
+            ((item[ResultsValues.SOURCE_FILE], item[ResultsValues.SOURCE_HASH])
+             for item in _in_file_name_order(self._checksum_calculations))
+        )
+        self.log("Wrote {}".format(self._output_filename))
+
+        return True
+
 
-        report_builder = checksum.HathiChecksumReport()
-        for item in self._checksum_calculations:
-            filename = item[ResultsValues.SOURCE_FILE]
-            hash_value = item[ResultsValues.SOURCE_HASH]
-            report_builder.add_entry(filename, hash_value)
-        report = report_builder.build()
+class MakeManifestTask(speedwagon.tasks.Subtask):
+    """Write a BagIt style manifest, such as manifest-sha256.txt."""
+
+    def __init__(
+            self,
+            output_filename: str,
+            algorithm: str,
+            checksum_calculations
+    ) -> None:
+        super().__init__()
+        self._output_filename = output_filename
+        self._algorithm = algorithm
+        self._checksum_calculations = checksum_calculations
 
-        with open(self._output_filename, "w", encoding="utf-8") as wf:
-            wf.write(report)
+    def work(self) -> bool:
+        # Same order as checksum.md5, so the entries can be written as they
+        # are merged from disk
+        with open(self._output_filename, "w", encoding="utf-8",
+                  newline="\n") as wf:
+            for item in _in_file_name_order(self._checksum_calculations):
+                filename = item[ResultsValues.SOURCE_FILE].replace(os.sep, "/")
+                digest = item[ResultsValues.DIGESTS][self._algorithm]
+                wf.write(f"{digest}  {filename}\n")
+        self.log("Wrote {}".format(self._output_filename))
+
+        return True
+
+
+class MakeStatSidecarTask(speedwagon.tasks.Subtask):
+    """Write the stat sidecar used to quickly verify a checksum.md5."""
+
+    def __init__(
+            self,
+            output_filename: str,
+            checksum_calculations
+    ) -> None:
+        super().__init__()
+        self._output_filename = output_filename
+        self._checksum_calculations = checksum_calculations
+
+    def work(self) -> bool:
+        write_stat_sidecar(
+            self._output_filename,
+            ((item[ResultsValues.SOURCE_FILE], item[ResultsValues.FILE_STAT])
+             for item in _in_file_name_order(self._checksum_calculations))
+        )
         self.log("Wrote {}".format(self._output_filename))
 
         return True
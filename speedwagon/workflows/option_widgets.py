@@ -0,0 +1,128 @@
+"""Qt widgets for editing the options of a workflow
+
+These are kept apart from :py:mod:`speedwagon.workflows.shared_custom_widgets`
+so that modules that only describe options don't need to import Qt.
+"""
+import abc
+
+from PyQt5 import QtWidgets, QtCore  # type: ignore
+
+
+class WidgetMeta(abc.ABCMeta, type(QtCore.QObject)):  # type: ignore
+    pass
+
+
+class CustomItemWidget(QtWidgets.QWidget):
+    editingFinished = QtCore.pyqtSignal()
+
+    def __init__(self, parent=None, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        self._data = ""
+        self.inner_layout = QtWidgets.QHBoxLayout(parent)
+        self.inner_layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self.inner_layout)
+        self.setAutoFillBackground(True)
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value) -> None:
+        self._data = value
+        self.editingFinished.emit()
+
+
+class AbsBrowseableWidget(CustomItemWidget, metaclass=WidgetMeta):
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__()
+        self.text_line = QtWidgets.QLineEdit(self)
+        self.action = \
+            self.text_line.addAction(
+                self.get_browse_icon(),
+                QtWidgets.QLineEdit.TrailingPosition
+            )
+
+        self.action.triggered.connect(self.browse_clicked)
+
+        self.text_line.textEdited.connect(self._change_data)
+        self.inner_layout.addWidget(self.text_line)
+
+    def get_browse_icon(self):
+        """Get the icon for the right type of browsing."""
+        return QtWidgets.QApplication.style().standardIcon(
+            QtWidgets.QStyle.SP_DirOpenIcon)
+
+    @abc.abstractmethod
+    def browse_clicked(self):
+        pass
+
+    @property
+    def data(self):
+        return super().data
+
+    @data.setter
+    def data(self, value: str) -> None:
+        self._data = value
+        self.text_line.setText(value)
+
+    def _change_data(self, value):
+        self.data = value
+
+
+class ChecksumFile(AbsBrowseableWidget):
+
+    def get_browse_icon(self):
+        return QtWidgets.QApplication.style().standardIcon(
+            QtWidgets.QStyle.SP_FileIcon)
+
+    def browse_clicked(self) -> None:
+        selection = QtWidgets.QFileDialog.getOpenFileName(
+            filter="Checksum files (*.md5)")
+
+        if selection[0]:
+            self.data = selection[0]
+            self.editingFinished.emit()
+
+
+class FolderBrowseWidget(AbsBrowseableWidget):
+
+    def get_browse_icon(self):
+        return QtWidgets.QApplication.style().standardIcon(
+            QtWidgets.QStyle.SP_DirOpenIcon)
+
+    def browse_clicked(self) -> None:
+        selection = QtWidgets.QFileDialog.getExistingDirectory()
+        if selection:
+            self.data = selection
+            self.editingFinished.emit()
+
+
+class ListSelectionWidget(CustomItemWidget, metaclass=WidgetMeta):
+
+    def __init__(self, selections, *args, **kwargs) -> None:
+        super().__init__()
+        self._combobox = QtWidgets.QComboBox()
+        self._selections = selections
+
+        self._model = QtCore.QStringListModel()
+        self._model.setStringList(self._selections)
+        self._combobox.setModel(self._model)
+        self._combobox.currentIndexChanged.connect(self._update)
+        self.inner_layout.addWidget(self._combobox,
+                                    alignment=QtCore.Qt.AlignBaseline)
+
+    def _update(self) -> None:
+        self.data = self._combobox.currentText()
+
+
+class ImageFile(AbsBrowseableWidget):
+    def browse_clicked(self):
+        selection = QtWidgets.QFileDialog.getOpenFileName(
+            filter="Tiff files (*.tif)"
+        )
+
+        if selection[0]:
+            self.data = selection[0]
+            self.editingFinished.emit()
@@ -1,8 +1,28 @@
 import abc
 import os
 
-from typing import Type
-from PyQt5 import QtWidgets, QtCore
+from typing import Type, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PyQt5 import QtWidgets  # type: ignore
+
+#: Widgets available from this module, loaded the first time one of them is
+#: used so that worker processes importing a workflow don't load Qt.
+_WIDGETS = {
+    "WidgetMeta",
+    "CustomItemWidget",
+    "AbsBrowseableWidget",
+    "ChecksumFile",
+    "FolderBrowseWidget",
+    "ListSelectionWidget",
+}
+
+
+def __getattr__(name):
+    if name in _WIDGETS:
+        from . import option_widgets
+        return getattr(option_widgets, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class AbsCustomData2(metaclass=abc.ABCMeta):
@@ -13,73 +33,10 @@ class AbsCustomData2(metaclass=abc.ABCMeta):
 
     @classmethod
     @abc.abstractmethod
-    def edit_widget(cls) -> QtWidgets.QWidget:
+    def edit_widget(cls) -> "QtWidgets.QWidget":
         pass
 
 
-class WidgetMeta(abc.ABCMeta, type(QtCore.QObject)):  # type: ignore
-    pass
-
-
-class CustomItemWidget(QtWidgets.QWidget):
-    editingFinished = QtCore.pyqtSignal()
-
-    def __init__(self, parent=None, *args, **kwargs):
-        super().__init__(parent, *args, **kwargs)
-        self._data = ""
-        self.inner_layout = QtWidgets.QHBoxLayout(parent)
-        self.inner_layout.setContentsMargins(0, 0, 0, 0)
-        self.setLayout(self.inner_layout)
-        self.setAutoFillBackground(True)
-
-    @property
-    def data(self):
-        return self._data
-
-    @data.setter
-    def data(self, value) -> None:
-        self._data = value
-        self.editingFinished.emit()
-
-
-class AbsBrowseableWidget(CustomItemWidget, metaclass=WidgetMeta):
-
-    def __init__(self, *args, **kwargs) -> None:
-        super().__init__()
-        self.text_line = QtWidgets.QLineEdit(self)
-        self.action = \
-            self.text_line.addAction(
-                self.get_browse_icon(),
-                QtWidgets.QLineEdit.TrailingPosition
-            )
-
-        self.action.triggered.connect(self.browse_clicked)
-
-        self.text_line.textEdited.connect(self._change_data)
-        self.inner_layout.addWidget(self.text_line)
-
-    def get_browse_icon(self):
-        """Get the icon for the right type of browsing."""
-        return QtWidgets.QApplication.style().standardIcon(
-            QtWidgets.QStyle.SP_DirOpenIcon)
-
-    @abc.abstractmethod
-    def browse_clicked(self):
-        pass
-
-    @property
-    def data(self):
-        return super().data
-
-    @data.setter
-    def data(self, value: str) -> None:
-        self._data = value
-        self.text_line.setText(value)
-
-    def _change_data(self, value):
-        self.data = value
-
-
 class AbsCustomData3(metaclass=abc.ABCMeta):
     @classmethod
     @abc.abstractmethod
@@ -88,25 +45,10 @@ class AbsCustomData3(metaclass=abc.ABCMeta):
 
     @classmethod
     @abc.abstractmethod
-    def edit_widget(cls) -> QtWidgets.QWidget:
+    def edit_widget(cls) -> "QtWidgets.QWidget":
         pass
 
 
-class ChecksumFile(AbsBrowseableWidget):
-
-    def get_browse_icon(self):
-        return QtWidgets.QApplication.style().standardIcon(
-            QtWidgets.QStyle.SP_FileIcon)
-
-    def browse_clicked(self) -> None:
-        selection = QtWidgets.QFileDialog.getOpenFileName(
-            filter="Checksum files (*.md5)")
-
-        if selection[0]:
-            self.data = selection[0]
-            self.editingFinished.emit()
-
-
 class ChecksumData(AbsCustomData3):
 
     @classmethod
@@ -119,23 +61,11 @@ class ChecksumData(AbsCustomData3):
         return True
 
     @classmethod
-    def edit_widget(cls) -> QtWidgets.QWidget:
+    def edit_widget(cls) -> "QtWidgets.QWidget":
+        from .option_widgets import ChecksumFile
         return ChecksumFile()
 
 
-class FolderBrowseWidget(AbsBrowseableWidget):
-
-    def get_browse_icon(self):
-        return QtWidgets.QApplication.style().standardIcon(
-            QtWidgets.QStyle.SP_DirOpenIcon)
-
-    def browse_clicked(self) -> None:
-        selection = QtWidgets.QFileDialog.getExistingDirectory()
-        if selection:
-            self.data = selection
-            self.editingFinished.emit()
-
-
 class FolderData(AbsCustomData3, metaclass=abc.ABCMeta):
 
     @classmethod
@@ -145,7 +75,8 @@ class FolderData(AbsCustomData3, metaclass=abc.ABCMeta):
         return True
 
     @classmethod
-    def edit_widget(cls) -> QtWidgets.QWidget:
+    def edit_widget(cls) -> "QtWidgets.QWidget":
+        from .option_widgets import FolderBrowseWidget
         return FolderBrowseWidget()
 
 
@@ -158,7 +89,7 @@ class UserOption3(metaclass=abc.ABCMeta):
     def is_valid(self) -> bool:
         pass
 
-    def edit_widget(self) -> QtWidgets.QWidget:
+    def edit_widget(self) -> "QtWidgets.QWidget":
         pass
 
 
@@ -176,7 +107,7 @@ class UserOptionCustomDataType(UserOption3):
     def is_valid(self) -> bool:
         return self.data_type.is_valid(self.data)
 
-    def edit_widget(self) -> QtWidgets.QWidget:
+    def edit_widget(self) -> "QtWidgets.QWidget":
         return self.data_type.edit_widget()
 
 
@@ -189,7 +120,7 @@ class UserOption2(metaclass=abc.ABCMeta):
     def is_valid(self) -> bool:
         pass
 
-    def edit_widget(self) -> QtWidgets.QWidget:
+    def edit_widget(self) -> "QtWidgets.QWidget":
         pass
 
 
@@ -203,24 +134,6 @@ class UserOptionPythonDataType2(UserOption2):
         return isinstance(self.data, self.data_type)
 
 
-class ListSelectionWidget(CustomItemWidget, metaclass=WidgetMeta):
-
-    def __init__(self, selections, *args, **kwargs) -> None:
-        super().__init__()
-        self._combobox = QtWidgets.QComboBox()
-        self._selections = selections
-
-        self._model = QtCore.QStringListModel()
-        self._model.setStringList(self._selections)
-        self._combobox.setModel(self._model)
-        self._combobox.currentIndexChanged.connect(self._update)
-        self.inner_layout.addWidget(self._combobox,
-                                    alignment=QtCore.Qt.AlignBaseline)
-
-    def _update(self) -> None:
-        self.data = self._combobox.currentText()
-
-
 class ListSelection(UserOption2):
 
     def __init__(self, label_text):
@@ -230,7 +143,8 @@ class ListSelection(UserOption2):
     def is_valid(self) -> bool:
         return True
 
-    def edit_widget(self) -> QtWidgets.QWidget:
+    def edit_widget(self) -> "QtWidgets.QWidget":
+        from .option_widgets import ListSelectionWidget
         return ListSelectionWidget(self._selections)
 
     def add_selection(self, text: str) -> "ListSelection":
@@ -1,18 +1,20 @@
 import itertools
 import os
 import typing
+from typing import TYPE_CHECKING
 import shutil
 
-from PyQt5 import QtWidgets  # type: ignore
 from uiucprescon.packager.packages.collection import Metadata
 from uiucprescon import packager, pygetmarc
 
 import speedwagon
 from speedwagon import tasks
 from speedwagon.workflows import shared_custom_widgets
-from . title_page_selection import PackageBrowser
 from pyhathiprep import package_creater
 
+if TYPE_CHECKING:
+    from PyQt5 import QtWidgets  # type: ignore
+
 
 class CaptureOneBatchToHathiComplete(speedwagon.Workflow):
     name = "CaptureOne Batch to HathiTrust TIFF Complete Package"
@@ -98,13 +100,16 @@ class CaptureOneBatchToHathiComplete(speedwagon.Workflow):
         task_builder.add_subtask(
             subtask=GenerateChecksumTask(bib_id, new_package_location))
 
-    def get_additional_info(self, parent: QtWidgets.QWidget, options: dict,
+    def get_additional_info(self, parent: "QtWidgets.QWidget",
+                            options: dict,
                             pretask_results: list) -> dict:
         extra_data = {}
         if len(pretask_results) == 1:
             title_pages = dict()
             results = pretask_results.pop()
             packages = results.data
+            # The dialog needs Qt, which worker processes don't load
+            from .title_page_selection import PackageBrowser
             browser = PackageBrowser(packages, parent)
             browser.exec()
 
@@ -122,7 +127,7 @@ class CaptureOneBatchToHathiComplete(speedwagon.Workflow):
         return extra_data
 
     @classmethod
-    def generate_report(cls, results: typing.List[tasks.Result],
+    def generate_report(cls, results: typing.Sequence[tasks.Result],
                         **user_args) -> typing.Optional[str]:
 
         results_sorted = sorted(results, key=lambda x: x.source.__name__)
@@ -12,7 +12,7 @@ from uiucprescon.packager.packages.collection_builder import Metadata
 
 from speedwagon import tasks, validators
 from speedwagon.job import AbsWorkflow
-from speedwagon.worker import GuiLogHandler
+from speedwagon.execution import GuiLogHandler
 from . import shared_custom_widgets as options
 
 
@@ -16,13 +16,14 @@ from hathi_validate import validator
 
 import speedwagon
 from speedwagon.tasks import Subtask
-from speedwagon.worker import GuiLogHandler
-from speedwagon.job import AbsWorkflow
+from speedwagon.execution import GuiLogHandler
+from speedwagon.job import AbsWorkflow, ResourceProfile
 from . import shared_custom_widgets as options
 
 
 class CompletenessWorkflow(AbsWorkflow):
     name = "Verify HathiTrust Package Completeness"
+    resource_profile = ResourceProfile.IO_BOUND
     description = "This workflow takes as its input a directory of " \
                   "HathiTrust packages. It evaluates each subfolder as a " \
                   "HathiTrust package, and verifies its structural " \
@@ -116,7 +117,7 @@ class CompletenessWorkflow(AbsWorkflow):
                 subtask=ValidateOCFilesUTF8Task(package_path))
 
     @classmethod
-    def generate_report(cls, results: typing.List[speedwagon.tasks.Result],
+    def generate_report(cls, results: typing.Sequence[speedwagon.tasks.Result],
                         **user_args) -> typing.Optional[str]:
 
         results_sorted = sorted(results, key=lambda x: x.source.__name__)
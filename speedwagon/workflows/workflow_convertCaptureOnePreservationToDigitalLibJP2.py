@@ -3,7 +3,7 @@ import itertools
 import os
 import sys
 import typing
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Sequence
 
 import pykdu_compress
 
@@ -133,7 +133,7 @@ class ConvertTiffPreservationToDLJp2Workflow(AbsWorkflow):
 
     @classmethod
     @reports.add_report_borders
-    def generate_report(cls, results: List[tasks.Result], **user_args) -> \
+    def generate_report(cls, results: Sequence[tasks.Result], **user_args) -> \
             Optional[str]:
 
         failure = False
@@ -111,7 +111,10 @@ class ConvertTiffToHathiJp2Workflow(AbsWorkflow):
                     "relative_path_to_root":
                         os.path.relpath(root, source_input),
                     "source_file": file_,
-                    "task_type": TaskType.CONVERT.value
+                    "task_type": TaskType.CONVERT.value,
+
+                    # Used to convert the largest files first
+                    "source_size": os.path.getsize(os.path.join(root, file_))
                 })
 
             for file_ in other_files:
@@ -146,8 +149,9 @@ class ConvertTiffToHathiJp2Workflow(AbsWorkflow):
             source_root, relative_path_to_root, source_file)
 
         if task_type == "convert":
-            task_builder.add_subtask(
-                ImageConvertTask(source_file_path, output_path))
+            convert_task = ImageConvertTask(source_file_path, output_path)
+            convert_task.cost = job_args.get("source_size")
+            task_builder.add_subtask(convert_task)
         elif task_type == "copy":
             task_builder.add_subtask(CopyTask(source_file_path, output_path))
 
@@ -174,6 +178,11 @@ class ImageConvertTask(tasks.Subtask):
         self.log(process_task.status_message())
         return True
 
+    def partial_output_files(self) -> List[str]:
+        basename = os.path.splitext(
+            os.path.basename(self._source_file_path))[0]
+        return [os.path.join(self._output_path, basename + ".jp2")]
+
 
 class CopyTask(tasks.Subtask):
 
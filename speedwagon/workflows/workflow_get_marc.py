@@ -14,7 +14,7 @@ import requests
 
 from speedwagon.exceptions import MissingConfiguration, SpeedwagonException
 from speedwagon import tasks, reports, validators
-from speedwagon.job import AbsWorkflow
+from speedwagon.job import AbsWorkflow, ResourceProfile
 from . import shared_custom_widgets as options
 
 UserOptions = Union[
@@ -45,6 +45,7 @@ class GenerateMarcXMLFilesWorkflow(AbsWorkflow):
     """
 
     name = "Generate MARC.XML Files"
+    resource_profile = ResourceProfile.IO_BOUND
     description = "For input, this tool takes a path to a directory of " \
                   "files, each of which is a digitized volume, and is named " \
                   "for that volume’s bibid. The program then retrieves " \
@@ -243,7 +244,7 @@ class GenerateMarcXMLFilesWorkflow(AbsWorkflow):
 
     @classmethod
     @reports.add_report_borders
-    def generate_report(cls, results: List[tasks.Result],
+    def generate_report(cls, results: Sequence[tasks.Result],
                         **user_args) -> Optional[str]:
         """Generate a simple home-readable report from the job results.
 
@@ -509,6 +510,8 @@ SUPPORTED_IDENTIFIERS = {
 class MarcGeneratorTask(tasks.Subtask):
     """Task for generating the MARC xml file."""
 
+    resource_profile = ResourceProfile.IO_BOUND
+
     def __init__(self,
                  identifier: str,
                  identifier_type: str,
@@ -1,14 +1,14 @@
 import logging
 import os
 from contextlib import contextmanager
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Sequence
 
 from speedwagon.job import Workflow
 from . import shared_custom_widgets as options
 from uiucprescon import packager
 
 from speedwagon import tasks, reports
-from speedwagon.worker import GuiLogHandler
+from speedwagon.execution import GuiLogHandler
 
 
 class HathiLimitedToDLWorkflow(Workflow):
@@ -48,7 +48,7 @@ class HathiLimitedToDLWorkflow(Workflow):
 
     @classmethod
     @reports.add_report_borders
-    def generate_report(cls, results: List[tasks.Result],
+    def generate_report(cls, results: Sequence[tasks.Result],
                         **user_args) -> Optional[str]:
         total = len(results)
 
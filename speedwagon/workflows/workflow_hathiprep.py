@@ -2,8 +2,7 @@ import itertools
 import os
 import shutil
 import typing
-
-from PyQt5 import QtWidgets  # type: ignore
+from typing import TYPE_CHECKING
 
 from pyhathiprep import package_creater
 import uiucprescon.packager.packages
@@ -12,9 +11,11 @@ from uiucprescon.packager.packages import collection
 
 import speedwagon.tasks
 import speedwagon
-from speedwagon.workflows.title_page_selection import PackageBrowser
 from . import shared_custom_widgets
 
+if TYPE_CHECKING:
+    from PyQt5 import QtWidgets  # type: ignore
+
 
 class HathiPrepWorkflow(speedwagon.Workflow):
     name = "Hathi Prep"
@@ -72,7 +73,8 @@ class HathiPrepWorkflow(speedwagon.Workflow):
         task_builder.add_subtask(
             subtask=GenerateChecksumTask(package_id, source))
 
-    def get_additional_info(self, parent: QtWidgets.QWidget, options: dict,
+    def get_additional_info(self, parent: "QtWidgets.QWidget",
+                            options: dict,
                             initial_results: list) -> dict:
         image_type = options['Image File Type']
 
@@ -88,6 +90,8 @@ class HathiPrepWorkflow(speedwagon.Workflow):
 
         packages = [package for package in
                     package_factory.locate_packages(root_dir)]
+        # The dialog needs Qt, which worker processes don't load
+        from .title_page_selection import PackageBrowser
         browser = PackageBrowser(packages, parent)
         browser.exec()
         result = browser.result()
@@ -101,7 +105,7 @@ class HathiPrepWorkflow(speedwagon.Workflow):
         return extra
 
     @classmethod
-    def generate_report(cls, results: typing.List[speedwagon.tasks.Result],
+    def generate_report(cls, results: typing.Sequence[speedwagon.tasks.Result],
                         **user_args) -> typing.Optional[str]:
         results_sorted = sorted(results, key=lambda x: x.source.__name__)
         _result_grouped = itertools.groupby(results_sorted, lambda x: x.source)
@@ -1,21 +1,57 @@
-import collections
-import typing
+import tempfile
 
 import os
 
-import itertools
-from typing import List, Any, DefaultDict, Optional
+from typing import List, Any, Optional, Iterable, Iterator, Sequence
 
-from speedwagon.job import AbsWorkflow
+from speedwagon.job import AbsWorkflow, ResourceProfile
 from speedwagon import tasks
 from speedwagon.reports import add_report_borders
-from .checksum_shared import ResultsValues
+from .checksum_shared import ChecksumResultsSorter, MANIFEST_ALGORITHM, \
+    MANIFEST_OPTION, SIDECAR_OPTION, add_checksum_task, \
+    checksum_jobs, checksum_reports_summary, manifest_option, \
+    manifest_path, sidecar_option, sidecar_path, strict_option
 from . import checksum_tasks, shared_custom_widgets
 from . import shared_custom_widgets as options
 
 
+def _add_report_subtasks(task_builder: tasks.TaskBuilder,
+                         results: Iterable[tasks.Result],
+                         **user_args) -> None:
+    # The results are sorted on disk, so reports for very large packages
+    # don't have to fit in memory
+    sorter = ChecksumResultsSorter(
+        tempfile.mkdtemp(prefix="checksum_reports-",
+                         dir=task_builder.working_dir))
+    for result in results:
+        sorter.add(result.data)
+
+    for checksum_report, checksums in sorter.sorted_results().items():
+
+        process = checksum_tasks.MakeCheckSumReportTask(
+            checksum_report, checksums)
+
+        task_builder.add_subtask(process)
+
+        if user_args.get(MANIFEST_OPTION, False):
+            task_builder.add_subtask(
+                checksum_tasks.MakeManifestTask(
+                    manifest_path(checksum_report),
+                    MANIFEST_ALGORITHM,
+                    checksums
+                )
+            )
+
+        if user_args.get(SIDECAR_OPTION, False):
+            task_builder.add_subtask(
+                checksum_tasks.MakeStatSidecarTask(
+                    sidecar_path(checksum_report), checksums)
+            )
+
+
 class MakeChecksumBatchSingleWorkflow(AbsWorkflow):
     name = "Make Checksum Batch [Single]"
+    resource_profile = ResourceProfile.IO_BOUND
     description = "The checksum is a signature of a file.  If any data is " \
                   "changed, the checksum will provide a different " \
                   "signature.  The checksum.md5 contains a record of each " \
@@ -28,90 +64,40 @@ class MakeChecksumBatchSingleWorkflow(AbsWorkflow):
                   "Input: Path to a root folder"
 
     def discover_task_metadata(self, initial_results: List[Any],
-                               additional_data, **user_args) -> List[dict]:
-        jobs = []
+                               additional_data,
+                               **user_args) -> Iterator[dict]:
         package_root = user_args["Input"]
         report_to_save_to = os.path.normpath(os.path.join(package_root,
                                                           "checksum.md5"))
 
-        for root, dirs, files in os.walk(package_root):
-            for file_ in files:
-                full_path = os.path.join(root, file_)
-                relpath = os.path.relpath(full_path, package_root)
-                job = {
-                    "source_path": package_root,
-                    "filename": relpath,
-                    "save_to_filename": report_to_save_to
-                }
-                jobs.append(job)
-        return jobs
+        yield from checksum_jobs(package_root, report_to_save_to, **user_args)
 
     def create_new_task(self, task_builder: tasks.TaskBuilder, **job_args):
-        source_path = job_args['source_path']
-        filename = job_args['filename']
-        report_name = job_args['save_to_filename']
-
-        new_task = checksum_tasks.MakeChecksumTask(
-            source_path, filename, report_name)
-
-        task_builder.add_subtask(new_task)
+        add_checksum_task(task_builder, self.global_settings, **job_args)
 
     def completion_task(self, task_builder: tasks.TaskBuilder, results,
                         **user_args) -> None:
-
-        sorted_results = self.sort_results([i.data for i in results])
-
-        for checksum_report, checksums in sorted_results.items():
-
-            process = checksum_tasks.MakeCheckSumReportTask(
-                checksum_report, checksums)
-
-            task_builder.add_subtask(process)
+        _add_report_subtasks(task_builder, results, **user_args)
 
     @classmethod
     @add_report_borders
-    def generate_report(cls, results: List[tasks.Result],
+    def generate_report(cls, results: Sequence[tasks.Result],
                         **user_args) -> Optional[str]:
-
-        report_lines = []
-
-        for checksum_report, items_written in \
-                cls.sort_results([i.data for i in results]).items():
-
-            report_lines.append(f"Checksum values for {len(items_written)} "
-                                f"files written to {checksum_report}")
-
-        return "\n".join(report_lines)
-
-    @classmethod
-    def sort_results(cls,
-                     results: typing.List[typing.Mapping[ResultsValues, str]]
-                     ) -> typing.Dict[str,
-                                      typing.List[typing.Dict[ResultsValues,
-                                                              str]]]:
-
-        new_results: DefaultDict[str, list] = collections.defaultdict(list)
-
-        sorted_results = sorted(results,
-                                key=lambda it: it[ResultsValues.CHECKSUM_FILE])
-
-        for k, v in itertools.groupby(
-                sorted_results,
-                key=lambda it: it[ResultsValues.CHECKSUM_FILE]):
-
-            for result_data in v:
-                new_results[k].append(result_data)
-        return dict(new_results)
+        return checksum_reports_summary(results, **user_args)
 
     def user_options(self):
         return [
             options.UserOptionCustomDataType("Input",
                                              options.FolderData),
+            strict_option(),
+            manifest_option(),
+            sidecar_option(),
         ]
 
 
 class MakeChecksumBatchMultipleWorkflow(AbsWorkflow):
     name = "Make Checksum Batch [Multiple]"
+    resource_profile = ResourceProfile.IO_BOUND
     description = "The checksum is a signature of a file.  If any data " \
                   "is changed, the checksum will provide a different " \
                   "signature.  The checksum.md5 contains a record of the " \
@@ -124,9 +110,8 @@ class MakeChecksumBatchMultipleWorkflow(AbsWorkflow):
                   "subdirectories to generate checksum.md5 files"
 
     def discover_task_metadata(self, initial_results: List[Any],
-                               additional_data, **user_args) -> List[dict]:
-
-        jobs = []
+                               additional_data,
+                               **user_args) -> Iterator[dict]:
 
         root_for_all_packages = user_args["Input"]
         for sub_dir in filter(lambda it: it.is_dir(),
@@ -136,175 +121,74 @@ class MakeChecksumBatchMultipleWorkflow(AbsWorkflow):
             report_to_save_to = os.path.normpath(
                 os.path.join(package_root, "checksum.md5"))
 
-            for root, dirs, files in os.walk(package_root):
-                for file_ in files:
-                    full_path = os.path.join(root, file_)
-                    relpath = os.path.relpath(full_path, package_root)
-                    job = {
-                        "source_path": package_root,
-                        "filename": relpath,
-                        "save_to_filename": report_to_save_to
-                    }
-                    jobs.append(job)
-        return jobs
+            yield from checksum_jobs(package_root, report_to_save_to,
+                                     **user_args)
 
     def user_options(self):
         return [
             options.UserOptionCustomDataType("Input",
                                              options.FolderData),
+            strict_option(),
+            manifest_option(),
+            sidecar_option(),
         ]
 
     def create_new_task(self, task_builder: tasks.TaskBuilder, **job_args):
-        source_path = job_args['source_path']
-        filename = job_args['filename']
-        report_name = job_args['save_to_filename']
-
-        new_task = checksum_tasks.MakeChecksumTask(
-            source_path, filename, report_name)
-
-        task_builder.add_subtask(new_task)
-
-    @classmethod
-    def sort_results(cls,
-                     results: typing.List[typing.Mapping[ResultsValues, str]]
-                     ) -> typing.Dict[str,
-                                      typing.List[typing.Dict[ResultsValues,
-                                                              str]]]:
-
-        new_results: DefaultDict[str, list] = collections.defaultdict(list)
-
-        sorted_results = sorted(results,
-                                key=lambda it: it[ResultsValues.CHECKSUM_FILE])
-
-        for k, v in itertools.groupby(
-                sorted_results,
-                key=lambda it: it[ResultsValues.CHECKSUM_FILE]):
-
-            for result_data in v:
-                new_results[k].append(result_data)
-        return dict(new_results)
+        add_checksum_task(task_builder, self.global_settings, **job_args)
 
     def completion_task(self, task_builder: tasks.TaskBuilder, results,
                         **user_args) -> None:
-
-        sorted_results = self.sort_results([i.data for i in results])
-
-        for checksum_report, checksums in sorted_results.items():
-
-            process = checksum_tasks.MakeCheckSumReportTask(
-                checksum_report, checksums)
-
-            task_builder.add_subtask(process)
+        _add_report_subtasks(task_builder, results, **user_args)
 
     @add_report_borders
-    def generate_report(cls, results: List[tasks.Result],
+    def generate_report(cls, results: Sequence[tasks.Result],
                         **user_args) -> Optional[str]:
-
-        report_lines = []
-
-        for checksum_report, items_written in \
-                cls.sort_results([i.data for i in results]).items():
-
-            report_lines.append(f"Checksum values for {len(items_written)} "
-                                f"files written to {checksum_report}")
-
-        return "\n".join(report_lines)
+        return checksum_reports_summary(results, **user_args)
 
 
 class RegenerateChecksumBatchSingleWorkflow(AbsWorkflow):
     name = "Regenerate Checksum Batch [Single]"
+    resource_profile = ResourceProfile.IO_BOUND
     description = "Regenerates hash values for every file inside for a " \
                   "given checksum.md5 file" \
                   "\n" \
                   "Input: Path to a root folder"
 
     def discover_task_metadata(self, initial_results: List[Any],
-                               additional_data, **user_args) -> List[dict]:
-        jobs = []
-
+                               additional_data,
+                               **user_args) -> Iterator[dict]:
         report_to_save_to = user_args["Input"]
         package_root = os.path.dirname(report_to_save_to)
 
-        for root, dirs, files in os.walk(package_root):
-            for file_ in files:
-                full_path = os.path.join(root, file_)
-                if os.path.samefile(report_to_save_to, full_path):
-                    continue
-                relpath = os.path.relpath(full_path, package_root)
-                job = {
-                    "source_path": package_root,
-                    "filename": relpath,
-                    "save_to_filename": report_to_save_to
-                }
-                jobs.append(job)
-        return jobs
+        yield from checksum_jobs(package_root, report_to_save_to,
+                                 skip_report=True, **user_args)
 
     def create_new_task(self, task_builder: tasks.TaskBuilder, **job_args):
-        source_path = job_args['source_path']
-        filename = job_args['filename']
-        report_name = job_args['save_to_filename']
-
-        new_task = checksum_tasks.MakeChecksumTask(
-            source_path, filename, report_name)
-
-        task_builder.add_subtask(new_task)
+        add_checksum_task(task_builder, self.global_settings, **job_args)
 
     def completion_task(self, task_builder: tasks.TaskBuilder, results,
                         **user_args) -> None:
-
-        sorted_results = self.sort_results([i.data for i in results])
-
-        for checksum_report, checksums in sorted_results.items():
-
-            process = checksum_tasks.MakeCheckSumReportTask(
-                checksum_report, checksums)
-
-            task_builder.add_subtask(process)
+        _add_report_subtasks(task_builder, results, **user_args)
 
     @classmethod
     @add_report_borders
-    def generate_report(cls, results: List[tasks.Result],
+    def generate_report(cls, results: Sequence[tasks.Result],
                         **user_args) -> Optional[str]:
-
-        report_lines = []
-
-        for checksum_report, items_written in \
-                cls.sort_results([i.data for i in results]).items():
-
-            report_lines.append(f"Checksum values for {len(items_written)} "
-                                f"files written to {checksum_report}")
-
-        return "\n".join(report_lines)
-
-    @classmethod
-    def sort_results(cls,
-                     results: typing.List[typing.Mapping[ResultsValues, str]]
-                     ) -> typing.Dict[str,
-                                      typing.List[typing.Dict[ResultsValues,
-                                                              str]]]:
-
-        new_results: DefaultDict[str, list] = collections.defaultdict(list)
-
-        sorted_results = sorted(results,
-                                key=lambda it: it[ResultsValues.CHECKSUM_FILE])
-
-        for k, v in itertools.groupby(
-                sorted_results,
-                key=lambda it: it[ResultsValues.CHECKSUM_FILE]):
-
-            for result_data in v:
-                new_results[k].append(result_data)
-        return dict(new_results)
+        return checksum_reports_summary(results, **user_args)
 
     def user_options(self):
         return [
             options.UserOptionCustomDataType(
                 "Input", shared_custom_widgets.ChecksumData),
+            strict_option(),
+            manifest_option(),
+            sidecar_option(),
         ]
 
 
 class RegenerateChecksumBatchMultipleWorkflow(AbsWorkflow):
     name = "Regenerate Checksum Batch [Multiple]"
+    resource_profile = ResourceProfile.IO_BOUND
     description = "Regenerates the hash values for every checksum.md5 " \
                   "located inside a given path\n" \
                   "\n" \
@@ -312,9 +196,8 @@ class RegenerateChecksumBatchMultipleWorkflow(AbsWorkflow):
                   "subdirectories to generate checksum.md5 files"
 
     def discover_task_metadata(self, initial_results: List[Any],
-                               additional_data, **user_args) -> List[dict]:
-
-        jobs = []
+                               additional_data,
+                               **user_args) -> Iterator[dict]:
 
         root_for_all_packages = user_args["Input"]
         for sub_dir in filter(lambda it: it.is_dir(),
@@ -324,78 +207,26 @@ class RegenerateChecksumBatchMultipleWorkflow(AbsWorkflow):
             report_to_save_to = os.path.normpath(
                 os.path.join(package_root, "checksum.md5"))
 
-            for root, dirs, files in os.walk(package_root):
-                for file_ in files:
-                    full_path = os.path.join(root, file_)
-                    if os.path.samefile(report_to_save_to, full_path):
-                        continue
-                    relpath = os.path.relpath(full_path, package_root)
-                    job = {
-                        "source_path": package_root,
-                        "filename": relpath,
-                        "save_to_filename": report_to_save_to
-                    }
-                    jobs.append(job)
-        return jobs
+            yield from checksum_jobs(package_root, report_to_save_to,
+                                     skip_report=True, **user_args)
 
     def user_options(self):
         return [
             options.UserOptionCustomDataType("Input",
                                              options.FolderData),
+            strict_option(),
+            manifest_option(),
+            sidecar_option(),
         ]
 
     def create_new_task(self, task_builder: tasks.TaskBuilder, **job_args):
-        source_path = job_args['source_path']
-        filename = job_args['filename']
-        report_name = job_args['save_to_filename']
-
-        new_task = \
-            checksum_tasks.MakeChecksumTask(source_path, filename, report_name)
-
-        task_builder.add_subtask(new_task)
-
-    @classmethod
-    def sort_results(cls,
-                     results: typing.List[typing.Mapping[ResultsValues, str]]
-                     ) -> typing.Dict[str,
-                                      typing.List[typing.Dict[ResultsValues,
-                                                              str]]]:
-
-        new_results: DefaultDict[str, list] = collections.defaultdict(list)
-
-        sorted_results = sorted(results,
-                                key=lambda it: it[ResultsValues.CHECKSUM_FILE])
-
-        for k, v in itertools.groupby(
-                sorted_results,
-                key=lambda it: it[ResultsValues.CHECKSUM_FILE]):
-
-            for result_data in v:
-                new_results[k].append(result_data)
-        return dict(new_results)
+        add_checksum_task(task_builder, self.global_settings, **job_args)
 
     def completion_task(self, task_builder: tasks.TaskBuilder, results,
                         **user_args) -> None:
-
-        sorted_results = self.sort_results([i.data for i in results])
-
-        for checksum_report, checksums in sorted_results.items():
-
-            process = checksum_tasks.MakeCheckSumReportTask(
-                checksum_report, checksums)
-
-            task_builder.add_subtask(process)
+        _add_report_subtasks(task_builder, results, **user_args)
 
     @add_report_borders
-    def generate_report(cls, results: List[tasks.Result],
+    def generate_report(cls, results: Sequence[tasks.Result],
                         **user_args) -> Optional[str]:
-
-        report_lines = []
-
-        for checksum_report, items_written in \
-                cls.sort_results([i.data for i in results]).items():
-
-            report_lines.append(f"Checksum values for {len(items_written)} "
-                                f"files written to {checksum_report}")
-
-        return "\n".join(report_lines)
+        return checksum_reports_summary(results, **user_args)
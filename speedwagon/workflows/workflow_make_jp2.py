@@ -1,5 +1,5 @@
 import os
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Iterator, Sequence
 
 from . import shared_custom_widgets
 from speedwagon import job, tasks
@@ -20,8 +20,12 @@ def _filter_tif_only(item: os.DirEntry) -> bool:
 
 
 class AbsProfile(metaclass=abc.ABCMeta):
-    @abc.abstractmethod
     def locate_source_files(self, root):
+        for source_entry in self.locate_source_entries(root):
+            yield source_entry.path
+
+    @abc.abstractmethod
+    def locate_source_entries(self, root) -> Iterator[os.DirEntry]:
         pass
 
     @property
@@ -33,14 +37,13 @@ class AbsProfile(metaclass=abc.ABCMeta):
 class DigitalLibraryProfile(AbsProfile):
     image_factory = "Digital Library JPEG 2000"
 
-    def locate_source_files(self, root):
+    def locate_source_entries(self, root):
         for root_access in self._find_root_access(root):
             for access_folder in filter(lambda x: os.path.isdir(x),
                                         os.scandir(root_access)):
 
-                for source_file in filter(_filter_tif_only,
-                                          os.scandir(access_folder.path)):
-                    yield source_file.path
+                yield from filter(_filter_tif_only,
+                                  os.scandir(access_folder.path))
 
     @staticmethod
     def _find_root_access(path):
@@ -53,15 +56,14 @@ class DigitalLibraryProfile(AbsProfile):
 class HathiTrustProfile(AbsProfile):
     image_factory = "HathiTrust JPEG 2000"
 
-    def locate_source_files(self, root):
+    def locate_source_entries(self, root):
 
         for root_access in self._find_root_access(root):
             for access_folder in filter(lambda x: os.path.isdir(x),
                                         os.scandir(root_access)):
 
-                for source_file in filter(_filter_tif_only,
-                                          os.scandir(access_folder.path)):
-                    yield source_file.path
+                yield from filter(_filter_tif_only,
+                                  os.scandir(access_folder.path))
 
     def _find_root_access(self, path):
         for root, dirs, files in os.walk(path):
@@ -116,8 +118,8 @@ class MakeJp2Workflow(job.AbsWorkflow):
         profile_name = user_args["Profile"]
         profile_factory = ProfileFactory()
         profile = profile_factory.create(profile_name)
-        for source_file in profile.locate_source_files(source_root):
-
+        for source_entry in profile.locate_source_entries(source_root):
+            source_file = source_entry.path
             new_name = \
                 f"{os.path.splitext(os.path.basename(source_file))[0]}.jp2"
 
@@ -132,7 +134,8 @@ class MakeJp2Workflow(job.AbsWorkflow):
                 "new_file_name": new_name,
                 "image_factory": profile.image_factory,
 
-
+                # Used to convert the largest files first
+                "source_size": source_entry.stat().st_size
             }
             jobs.append(job)
 
@@ -183,12 +186,13 @@ class MakeJp2Workflow(job.AbsWorkflow):
             destination_file=destination_file,
             image_factory_name=image_factory
         )
+        convert_task.cost = job_args.get("source_size")
 
         task_builder.add_subtask(make_dir)
         task_builder.add_subtask(convert_task)
 
     @classmethod
-    def generate_report(cls, results: List[tasks.Result], **user_args) -> \
+    def generate_report(cls, results: Sequence[tasks.Result], **user_args) -> \
             Optional[str]:
 
         report_title = "Results:"
@@ -205,6 +209,7 @@ class MakeJp2Workflow(job.AbsWorkflow):
 
 
 class EnsurePathTask(tasks.Subtask):
+    lightweight = True
 
     def __init__(self, path) -> None:
         super().__init__()
@@ -239,3 +244,6 @@ class ConvertFileTask(tasks.Subtask):
             "file_created": self._destination_file,
         })
         return os.path.exists(self._destination_file)
+
+    def partial_output_files(self) -> List[str]:
+        return [self._destination_file]
@@ -2,7 +2,7 @@ import io
 import os
 import sys
 
-from typing import List, Any, Optional, Iterator
+from typing import List, Any, Optional, Iterable, Iterator, Sequence
 import contextlib
 from uiucprescon import ocr
 import speedwagon
@@ -39,7 +39,6 @@ class OCRWorkflow(speedwagon.Workflow):
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        self.global_settings = kwargs.get('global_settings', {})
         self.tessdata_path = self._get_tessdata_dir(args, self.global_settings)
 
         if self.tessdata_path is None:
@@ -131,6 +130,10 @@ class OCRWorkflow(speedwagon.Workflow):
                 lang=lang_code,
                 tesseract_path=self.tessdata_path
             )
+
+        # Read the largest images first
+        with contextlib.suppress(OSError):
+            ocr_generation_task.cost = os.path.getsize(image_file)
         task_builder.add_subtask(ocr_generation_task)
 
     def initial_task(self, task_builder: tasks.TaskBuilder,
@@ -228,9 +231,10 @@ class OCRWorkflow(speedwagon.Workflow):
                 "Input not a valid directory {}.".format(path))
 
     @classmethod
-    def generate_report(cls, results: List[tasks.Result],
+    def generate_report(cls, results: Sequence[tasks.Result],
                         **user_args) -> Optional[str]:
-        amount = len(cls._get_ocr_tasks(results))
+        # Count without keeping the text of every page in memory
+        amount = sum(1 for _ in cls._iter_ocr_tasks(results))
 
         report = \
             "*************************************\n" \
@@ -243,14 +247,15 @@ class OCRWorkflow(speedwagon.Workflow):
         return report
 
     @staticmethod
-    def _get_ocr_tasks(results: List[tasks.Result]) -> List[tasks.Result]:
+    def _iter_ocr_tasks(results: Iterable[tasks.Result]
+                        ) -> Iterator[tasks.Result]:
 
         def filter_ocr_gen_tasks(result: tasks.Result) -> bool:
             if result.source != GenerateOCRFileTask:
                 return False
             return True
 
-        return [r for r in filter(filter_ocr_gen_tasks, results)]
+        return filter(filter_ocr_gen_tasks, results)
 
 
 class FindImagesTask(speedwagon.tasks.Subtask):
@@ -286,8 +291,20 @@ class FindImagesTask(speedwagon.tasks.Subtask):
         return True
 
 
+def _create_reader(data_set_path: str, lang: str):
+    engine = tasks.worker_resource("tesseract engine", data_set_path)
+    return engine.get_reader(lang)
+
+
+# Loading the tesseract data is slow, so each worker process keeps one engine
+# and one reader per language for all the images it reads
+tasks.register_worker_resource("tesseract engine", ocr.Engine)
+tasks.register_worker_resource("tesseract reader", _create_reader)
+
+
 class GenerateOCRFileTask(speedwagon.tasks.Subtask):
-    engine = ocr.Engine(locate_tessdata())
+    #: Engine to use instead of the one kept by the worker process
+    engine: Optional[ocr.Engine] = None
 
     def __init__(self, source_image, out_text_file, lang="eng",
                  tesseract_path=None) -> None:
@@ -296,9 +313,8 @@ class GenerateOCRFileTask(speedwagon.tasks.Subtask):
         self._source = source_image
         self._output_text_file = out_text_file
         self._lang = lang
-        self._tesseract_path = tesseract_path
-        GenerateOCRFileTask.set_tess_path(tesseract_path or locate_tessdata())
-        assert self.engine is not None
+        self._tesseract_path = tesseract_path or locate_tessdata()
+        assert self._tesseract_path is not None
 
     @classmethod
     def set_tess_path(cls, path=None):
@@ -324,13 +340,19 @@ class GenerateOCRFileTask(speedwagon.tasks.Subtask):
         self.set_results(result)
         return True
 
-    def read_image(self, file, lang):
+    def partial_output_files(self) -> List[str]:
+        return [self._output_text_file]
 
-        if self.engine.data_set_path is None:
-            self.engine.data_set_path = self._tesseract_path
+    def read_image(self, file, lang):
 
         # Get the ocr text reader for the proper language
-        reader = self.engine.get_reader(lang)
+        if self.engine is not None:
+            if self.engine.data_set_path is None:
+                self.engine.data_set_path = self._tesseract_path
+            reader = self.engine.get_reader(lang)
+        else:
+            reader = tasks.worker_resource(
+                "tesseract reader", self._tesseract_path, lang)
         self.log("Reading {}".format(os.path.normcase(file)))
 
         file_handle = io.StringIO()
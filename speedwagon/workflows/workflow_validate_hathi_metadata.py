@@ -1,23 +1,22 @@
 import os
-from typing import List, Any
+from typing import List, Any, TYPE_CHECKING
 from uiucprescon import imagevalidate
 
-from PyQt5 import QtWidgets  # type: ignore
-
 from speedwagon import tasks
 from speedwagon.job import AbsWorkflow
 from . import shared_custom_widgets as options
 
+if TYPE_CHECKING:
+    from PyQt5 import QtWidgets  # type: ignore
 
-class ImageFile(options.AbsBrowseableWidget):
-    def browse_clicked(self):
-        selection = QtWidgets.QFileDialog.getOpenFileName(
-            filter="Tiff files (*.tif)"
-        )
 
-        if selection[0]:
-            self.data = selection[0]
-            self.editingFinished.emit()
+def __getattr__(name):
+    # ImageFile moved to option_widgets. It is still available from here, but
+    # only loaded when it is used, so that worker processes don't load Qt.
+    if name == "ImageFile":
+        from .option_widgets import ImageFile
+        return ImageFile
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class TiffFileCheckData(options.AbsCustomData3):
@@ -35,7 +34,8 @@ class TiffFileCheckData(options.AbsCustomData3):
         return True
 
     @classmethod
-    def edit_widget(cls) -> QtWidgets.QWidget:
+    def edit_widget(cls) -> "QtWidgets.QWidget":
+        from .option_widgets import ImageFile
         return ImageFile()
 
 
@@ -87,15 +87,23 @@ class ValidateImageMetadataWorkflow(AbsWorkflow):
             raise ValueError("Invalid input selection")
 
 
+def _create_hathi_tiff_validator() -> imagevalidate.Profile:
+    return imagevalidate.Profile(imagevalidate.profiles.HathiTiff())
+
+
+tasks.register_worker_resource("hathi tiff validator",
+                               _create_hathi_tiff_validator)
+
+
 class MetadataValidatorTask(tasks.Subtask):
+    lightweight = True
 
     def __init__(self, source_file) -> None:
         super().__init__()
         self._source_file = source_file
 
     def work(self):
-        hathi_tiff_profile = imagevalidate.Profile(
-            imagevalidate.profiles.HathiTiff())
+        hathi_tiff_profile = tasks.worker_resource("hathi tiff validator")
 
         report = hathi_tiff_profile.validate(self._source_file)
         self.log(str(report))
@@ -1,6 +1,6 @@
 import os
 import warnings
-from typing import Iterable, Optional, List, Any
+from typing import Iterable, Optional, List, Any, Sequence
 
 from uiucprescon import imagevalidate
 
@@ -106,7 +106,7 @@ class ValidateMetadataWorkflow(AbsWorkflow):
 
     @classmethod
     def generate_report(cls,
-                        results: List[speedwagon.tasks.Result],
+                        results: Sequence[speedwagon.tasks.Result],
                         **user_args) -> Optional[str]:
 
         def validation_result_filter(
@@ -178,19 +178,34 @@ class LocateTiffImageTask(speedwagon.tasks.Subtask):
         return True
 
 
+def _create_validator(profile_name: str) -> imagevalidate.Profile:
+    return imagevalidate.Profile(imagevalidate.get_profile(profile_name))
+
+
+# Worker processes keep one validator per profile for every file they check
+speedwagon.tasks.register_worker_resource("imagevalidate profile",
+                                          imagevalidate.get_profile)
+speedwagon.tasks.register_worker_resource("imagevalidate validator",
+                                          _create_validator)
+
+
 class LocateImagesTask(speedwagon.tasks.Subtask):
     def __init__(self, root,
                  profile_name: str) -> None:
         super().__init__()
         self._root = root
-        self._profile = imagevalidate.get_profile(profile_name)
+        self._profile_name = profile_name
 
     def work(self) -> bool:
+        # Loaded by the worker that runs the task, not while the workflow
+        # is building its tasks
+        profile = speedwagon.tasks.worker_resource(
+            "imagevalidate profile", self._profile_name)
         image_files = []
         for root, dirs, files in os.walk(self._root):
             for file_name in files:
                 base, ext = os.path.splitext(file_name)
-                if not ext.lower() in self._profile.valid_extensions:
+                if not ext.lower() in profile.valid_extensions:
                     continue
                 image_file = os.path.join(root, file_name)
                 self.log(f"Found {image_file}")
@@ -204,12 +219,13 @@ class ValidateImageMetadataTask(speedwagon.tasks.Subtask):
 
         super().__init__()
         self._filename = filename
-        self._profile = imagevalidate.get_profile(profile_name)
+        self._profile_name = profile_name
 
     def work(self) -> bool:
         self.log(f"Validating {self._filename}")
 
-        profile_validator = imagevalidate.Profile(self._profile)
+        profile_validator = speedwagon.tasks.worker_resource(
+            "imagevalidate validator", self._profile_name)
 
         try:
             report = profile_validator.validate(self._filename)
@@ -3,14 +3,21 @@ import collections
 import itertools
 import os
 import enum
-from typing import DefaultDict, Iterable, Optional, Dict, List, Any, Union
+import random
+from typing import DefaultDict, Iterable, Optional, Dict, List, Any, \
+    Sequence, Union
 
 import hathi_validate.process
 
 from speedwagon import tasks
-from speedwagon.job import AbsWorkflow
+from speedwagon.job import AbsWorkflow, ResourceProfile
 from speedwagon.reports import add_report_borders
 from . import shared_custom_widgets
+from .checksum_shared import QUICK_VERIFY_OPTION, SIDECAR_FILE_NAME, \
+    STRICT_OPTION, cache_file_setting, cache_hit_summary, \
+    calculate_checksums, hash_file, is_unchanged, quick_verify_option, \
+    quick_verify_sample, quick_verify_summary, read_stat_sidecar, \
+    strict_option
 
 
 class UserArgs(enum.Enum):
@@ -22,6 +29,11 @@ class JobValues(enum.Enum):
     EXPECTED_HASH = "expected_hash"
     ITEM_FILENAME = "filename"
     ROOT_PATH = "path"
+    STRICT = "strict"
+    CHECKSUM_CACHE = "checksum_cache"
+    QUICK = "quick"
+    QUICK_VERIFY_SAMPLE = "quick_verify_sample"
+    RECORDED_STAT = "recorded_stat"
 
 
 class ResultValues(enum.Enum):
@@ -29,10 +41,35 @@ class ResultValues(enum.Enum):
     FILENAME = "filename"
     PATH = "path"
     CHECKSUM_REPORT_FILE = "checksum_report_file"
+    CACHED = "cached"
+    HASHED = "hashed"
+
+
+def _verification_summaries(
+        results: Sequence[Dict[ResultValues, Any]]) -> str:
+    # How many files quick verification skipped and how many checksums came
+    # from the cache, one line each, for the end of a report
+    summaries = [
+        quick_verify_summary(
+            result.get(ResultValues.HASHED, True) for result in results),
+        cache_hit_summary(
+            result.get(ResultValues.CACHED) for result in results),
+    ]
+    return "".join(f"\n{summary}" for summary in summaries
+                   if summary is not None)
+
+
+def _skip_unchanged(quick_verify: bool, sample: float) -> bool:
+    # Whether a file can be skipped if it hasn't changed. A random sample of
+    # the files are rehashed even if they look unchanged. This is decided
+    # when the subtask runs, so that its arguments are the same every time
+    # and an interrupted run can be resumed.
+    return quick_verify and random.random() >= sample
 
 
 class ChecksumWorkflow(AbsWorkflow):
     name = "Verify Checksum Batch [Multiple]"
+    resource_profile = ResourceProfile.IO_BOUND
     description = "Verify checksum values in checksum batch file, report " \
                   "errors. Verifies every entry in the checksum.md5 files " \
                   "matches expected hash value for the actual file.  Tool " \
@@ -54,6 +91,9 @@ class ChecksumWorkflow(AbsWorkflow):
                                additional_data,
                                **user_args) -> List[dict]:
         jobs = []
+        quick_verify = user_args.get(QUICK_VERIFY_OPTION, False)
+        sample = quick_verify_sample(self.global_settings) \
+            if quick_verify else 0
         for result in initial_results:
             for file_to_check in result.data:
                 new_job = {
@@ -65,13 +105,21 @@ class ChecksumWorkflow(AbsWorkflow):
                         file_to_check["path"],
                     JobValues.SOURCE_REPORT.value:
                         file_to_check["source_report"],
+                    JobValues.STRICT.value:
+                        user_args.get(STRICT_OPTION, False),
+                    JobValues.QUICK.value: quick_verify,
+                    JobValues.QUICK_VERIFY_SAMPLE.value: sample,
+                    JobValues.RECORDED_STAT.value:
+                        file_to_check[JobValues.RECORDED_STAT.value],
                 }
                 jobs.append(new_job)
         return jobs
 
     def user_options(self):
         return shared_custom_widgets.UserOptionCustomDataType(
-            UserArgs.INPUT.value, shared_custom_widgets.FolderData),
+            UserArgs.INPUT.value, shared_custom_widgets.FolderData), \
+            strict_option(), \
+            quick_verify_option()
 
     @staticmethod
     def validate_user_options(**user_args):
@@ -95,13 +143,21 @@ class ChecksumWorkflow(AbsWorkflow):
         expected_hash = job_args['expected_hash']
         source_report = job_args['source_report']
         task_builder.add_subtask(
-            ValidateChecksumTask(file_name=filename,
-                                 file_path=file_path,
-                                 expected_hash=expected_hash,
-                                 source_report=source_report))
+            ValidateChecksumTask(
+                file_name=filename,
+                file_path=file_path,
+                expected_hash=expected_hash,
+                source_report=source_report,
+                cache_file=cache_file_setting(self.global_settings),
+                strict=job_args.get(JobValues.STRICT.value, False),
+                quick=job_args.get(JobValues.QUICK.value, False),
+                quick_verify_sample=job_args.get(
+                    JobValues.QUICK_VERIFY_SAMPLE.value, 0),
+                recorded_stat=job_args.get(JobValues.RECORDED_STAT.value)
+            ))
 
     @classmethod
-    def generate_report(cls, results: List[tasks.Result],
+    def generate_report(cls, results: Sequence[tasks.Result],
                         **user_args) -> Optional[str]:
 
         def validation_result_filter(
@@ -110,7 +166,9 @@ class ChecksumWorkflow(AbsWorkflow):
                 return False
             return True
 
-        data = map(lambda x: x.data, filter(validation_result_filter, results))
+        data = list(
+            map(lambda x: x.data, filter(validation_result_filter, results))
+        )
         line_sep = "\n" + "-" * 60
         sorted_results = cls._sort_results(data)
         results_with_failures = cls.find_failed(sorted_results)
@@ -135,7 +193,8 @@ class ChecksumWorkflow(AbsWorkflow):
             report = f"Success" \
                      f"\n{stats_message}" \
                      f"\n{failure_list}"
-        return report
+
+        return report + _verification_summaries(data)
 
     @classmethod
     def find_failed(cls,
@@ -188,6 +247,9 @@ class ReadChecksumReportTask(tasks.Subtask):
 
         checksums = hathi_validate.process.extracts_checksums(
             self._checksum_file)
+        recorded_stats = read_stat_sidecar(
+            os.path.join(os.path.dirname(self._checksum_file),
+                         SIDECAR_FILE_NAME))
 
         for report_md5_hash, filename in checksums:
             new_job_to_do = {
@@ -198,7 +260,9 @@ class ReadChecksumReportTask(tasks.Subtask):
                 JobValues.ROOT_PATH.value:
                     os.path.dirname(self._checksum_file),
                 JobValues.SOURCE_REPORT.value:
-                    self._checksum_file
+                    self._checksum_file,
+                JobValues.RECORDED_STAT.value:
+                    recorded_stats.get(os.path.normpath(filename))
             }
             results.append(new_job_to_do)
         self.set_results(results)
@@ -206,29 +270,68 @@ class ReadChecksumReportTask(tasks.Subtask):
 
 
 class ValidateChecksumTask(tasks.Subtask):
+    lightweight = True
+    resource_profile = ResourceProfile.IO_BOUND
 
     def __init__(self,
                  file_name,
                  file_path,
                  expected_hash,
-                 source_report) -> None:
+                 source_report,
+                 cache_file: Optional[str] = None,
+                 strict: bool = False,
+                 quick: bool = False,
+                 recorded_stat: Optional[Sequence[int]] = None,
+                 quick_verify_sample: float = 0) -> None:
+        """Check the MD5 checksum of a file.
+
+        Args:
+            file_name: File to check, relative to file_path
+            file_path: Directory of the checksum report
+            expected_hash: Checksum listed in the report
+            source_report: Checksum report the file is listed in
+            cache_file: Checksum cache to use, if any
+            strict: Hash the file even if its checksum is cached
+            quick: Don't hash the file if it still has the size and
+                modification time in recorded_stat
+            recorded_stat: Size and modification time of the file from the
+                report's stat sidecar, if it has one
+            quick_verify_sample: Chance of hashing the file anyway in quick
+                mode, between 0 and 1
+        """
         super().__init__()
         self._file_name = file_name
         self._file_path = file_path
         self._expected_hash = expected_hash
         self._source_report = source_report
+        self._cache_file = cache_file
+        self._strict = strict
+        self._quick = quick
+        self._recorded_stat = recorded_stat
+        self._quick_verify_sample = quick_verify_sample
 
     def work(self) -> bool:
         self.log(f"Validating {self._file_name}")
-
-        actual_md5 = hathi_validate.process.calculate_md5(
-            os.path.join(self._file_path, self._file_name))
+        full_path = os.path.join(self._file_path, self._file_name)
 
         result = {
             ResultValues.FILENAME: self._file_name,
             ResultValues.PATH: self._file_path,
-            ResultValues.CHECKSUM_REPORT_FILE: self._source_report
+            ResultValues.CHECKSUM_REPORT_FILE: self._source_report,
+            ResultValues.HASHED: True
         }
+        if _skip_unchanged(self._quick, self._quick_verify_sample) and \
+                is_unchanged(full_path, self._recorded_stat):
+            result[ResultValues.VALID] = True
+            result[ResultValues.HASHED] = False
+            self.set_results(result)
+            return True
+
+        digests, cached = calculate_checksums(
+            full_path, ["md5"], hash_file,
+            cache_file=self._cache_file, strict=self._strict)
+        actual_md5 = digests["md5"]
+        result[ResultValues.CACHED] = cached
 
         standard_comparison = CaseSensitiveComparison()
         valid_but_warnable_strategy = CaseInsensitiveComparison()
@@ -273,6 +376,7 @@ class CaseInsensitiveComparison(AbsComparisonMethod):
 
 class VerifyChecksumBatchSingleWorkflow(AbsWorkflow):
     name = "Verify Checksum Batch [Single]"
+    resource_profile = ResourceProfile.IO_BOUND
     description = "Verify checksum values in checksum batch file, report " \
                   "errors. Verifies every entry in the checksum.md5 files " \
                   "matches expected hash value for the actual file.  Tool " \
@@ -287,6 +391,12 @@ class VerifyChecksumBatchSingleWorkflow(AbsWorkflow):
         jobs = []
         relative_path = os.path.dirname(user_args[UserArgs.INPUT.value])
         checksum_report_file = os.path.abspath(user_args[UserArgs.INPUT.value])
+        recorded_stats = read_stat_sidecar(
+            os.path.join(os.path.dirname(checksum_report_file),
+                         SIDECAR_FILE_NAME))
+        quick_verify = user_args.get(QUICK_VERIFY_OPTION, False)
+        sample = quick_verify_sample(self.global_settings) \
+            if quick_verify else 0
 
         for report_md5_hash, filename in \
                 hathi_validate.process.extracts_checksums(
@@ -297,7 +407,14 @@ class VerifyChecksumBatchSingleWorkflow(AbsWorkflow):
                 JobValues.EXPECTED_HASH.value: report_md5_hash,
                 JobValues.ITEM_FILENAME.value: filename,
                 JobValues.ROOT_PATH.value: relative_path,
-                JobValues.SOURCE_REPORT.value: checksum_report_file
+                JobValues.SOURCE_REPORT.value: checksum_report_file,
+                JobValues.STRICT.value: user_args.get(STRICT_OPTION, False),
+                JobValues.CHECKSUM_CACHE.value:
+                    cache_file_setting(self.global_settings),
+                JobValues.QUICK.value: quick_verify,
+                JobValues.QUICK_VERIFY_SAMPLE.value: sample,
+                JobValues.RECORDED_STAT.value:
+                    recorded_stats.get(os.path.normpath(filename))
             }
             jobs.append(new_job)
         return jobs
@@ -306,6 +423,8 @@ class VerifyChecksumBatchSingleWorkflow(AbsWorkflow):
         return [
             shared_custom_widgets.UserOptionCustomDataType(
                 UserArgs.INPUT.value, shared_custom_widgets.ChecksumData),
+            strict_option(),
+            quick_verify_option(),
         ]
 
     def create_new_task(self, task_builder: tasks.TaskBuilder, **job_args):
@@ -314,12 +433,12 @@ class VerifyChecksumBatchSingleWorkflow(AbsWorkflow):
 
     @classmethod
     @add_report_borders
-    def generate_report(cls, results: List[tasks.Result], **user_args) -> \
+    def generate_report(cls, results: Sequence[tasks.Result], **user_args) -> \
             Optional[str]:
-        results = [res.data for res in results]
+        data = [res.data for res in results]
 
         line_sep = "\n" + "-" * 60
-        sorted_results = cls.sort_results(results)
+        sorted_results = cls.sort_results(data)
         results_with_failures = cls.find_failed(sorted_results)
 
         if len(results_with_failures) > 0:
@@ -341,12 +460,13 @@ class VerifyChecksumBatchSingleWorkflow(AbsWorkflow):
             report = "\n{}\n".format(line_sep).join(messages)
 
         else:
-            stats_message = f"All {len(results)} passed checksum validation."
+            stats_message = f"All {len(data)} passed checksum validation."
             failure_list = ""
             report = f"Success" \
                      f"\n{stats_message}" \
                      f"\n{failure_list}"
-        return report
+
+        return report + _verification_summaries(data)
 
     @classmethod
     def sort_results(cls, results) -> \
@@ -395,6 +515,8 @@ class VerifyChecksumBatchSingleWorkflow(AbsWorkflow):
 
 
 class ChecksumTask(tasks.Subtask):
+    lightweight = True
+    resource_profile = ResourceProfile.IO_BOUND
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__()
@@ -407,13 +529,30 @@ class ChecksumTask(tasks.Subtask):
         expected = self._kwarg[JobValues.EXPECTED_HASH.value]
         checksum_path = self._kwarg[JobValues.ROOT_PATH.value]
         full_path = os.path.join(checksum_path, filename)
-        self.log("Calculating MD5 for {}".format(filename))
-        actual_md5 = hathi_validate.process.calculate_md5(full_path)
         result = {
             ResultValues.FILENAME: filename,
             ResultValues.PATH: checksum_path,
-            ResultValues.CHECKSUM_REPORT_FILE: source_report
+            ResultValues.CHECKSUM_REPORT_FILE: source_report,
+            ResultValues.HASHED: True
         }
+        skip_unchanged = _skip_unchanged(
+            self._kwarg.get(JobValues.QUICK.value, False),
+            self._kwarg.get(JobValues.QUICK_VERIFY_SAMPLE.value, 0))
+        if skip_unchanged and is_unchanged(
+                full_path, self._kwarg.get(JobValues.RECORDED_STAT.value)):
+            self.log("{} is unchanged".format(filename))
+            result[ResultValues.VALID] = True
+            result[ResultValues.HASHED] = False
+            self.set_results(result)
+            return True
+
+        self.log("Calculating MD5 for {}".format(filename))
+        digests, cached = calculate_checksums(
+            full_path, ["md5"], hash_file,
+            cache_file=self._kwarg.get(JobValues.CHECKSUM_CACHE.value),
+            strict=self._kwarg.get(JobValues.STRICT.value, False))
+        actual_md5 = digests["md5"]
+        result[ResultValues.CACHED] = cached
 
         standard_comparison = CaseSensitiveComparison()
 
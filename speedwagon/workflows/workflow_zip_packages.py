@@ -1,12 +1,13 @@
 import logging
 
 import os
+import threading
 from contextlib import contextmanager
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Sequence
 
 from speedwagon import tasks, reports
-from speedwagon.job import AbsWorkflow
-from speedwagon.worker import GuiLogHandler
+from speedwagon.job import AbsWorkflow, ResourceProfile
+from speedwagon.execution import GuiLogHandler
 from . import shared_custom_widgets as options
 import hathizip.process
 import hathizip
@@ -14,6 +15,7 @@ import hathizip
 
 class ZipPackagesWorkflow(AbsWorkflow):
     name = "Zip Packages"
+    resource_profile = ResourceProfile.IO_BOUND
 
     description = "This tool takes a folder, usually of HathiTrust " \
                   "packages, zips each subfolder, and copies the resultant " \
@@ -70,7 +72,7 @@ class ZipPackagesWorkflow(AbsWorkflow):
 
     @classmethod
     @reports.add_report_borders
-    def generate_report(cls, results: List[tasks.Result],
+    def generate_report(cls, results: Sequence[tasks.Result],
                         **user_args) -> Optional[str]:
 
         output = user_args.get("Output")
@@ -82,6 +84,8 @@ class ZipPackagesWorkflow(AbsWorkflow):
 
 
 class ZipTask(tasks.Subtask):
+    resource_profile = ResourceProfile.IO_BOUND
+
     def __init__(
             self,
             source_path: str,
@@ -113,6 +117,11 @@ class ZipTask(tasks.Subtask):
     @contextmanager
     def log_config(self, logger):
         gui_logger = GuiLogHandler(self.log)
+
+        # Other zip tasks may be running on other threads and logging to the
+        # same logger, so only forward the records from this one.
+        thread_id = threading.get_ident()
+        gui_logger.addFilter(lambda record: record.thread == thread_id)
         try:
             logger.addHandler(gui_logger)
             yield
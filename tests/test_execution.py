@@ -0,0 +1,262 @@
+import pickle
+import queue
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import speedwagon.tasks
+from speedwagon import execution, instrumentation
+
+
+class EchoSubtask(speedwagon.tasks.Subtask):
+    def __init__(self, message):
+        super().__init__()
+        self.message = message
+
+    def work(self) -> bool:
+        self.set_results(self.message)
+        return True
+
+
+def test_worker_modules_do_not_load_qt():
+    check = \
+        "import sys, speedwagon.execution, speedwagon.job; " \
+        "sys.exit('PyQt5' in sys.modules)"
+
+    assert subprocess.run([sys.executable, "-c", check]).returncode == 0
+
+
+def test_run_command_does_not_load_qt():
+    check = \
+        "import sys, speedwagon.__main__; " \
+        "sys.exit('PyQt5' in sys.modules)"
+
+    assert subprocess.run([sys.executable, "-c", check]).returncode == 0
+
+
+def test_job_manager_runs_without_qt():
+    with execution.JobManager() as manager:
+        manager.add_job(execution.SubtaskJobAdapter(EchoSubtask("spam")),
+                        settings={})
+        manager.start()
+        results = list(manager.get_results())
+
+    assert [result.data for result in results] == ["spam"]
+
+
+def test_job_manager_records_run_timings():
+    with execution.JobManager() as manager:
+        manager.run_timings = instrumentation.RunTimings("Echo")
+        for message in ["spam", "eggs"]:
+            manager.add_job(
+                execution.SubtaskJobAdapter(EchoSubtask(message)),
+                settings={})
+        manager.start()
+        list(manager.get_results())
+
+    assert [timing.subtask for timing in manager.run_timings.timings] == \
+        ["EchoSubtask", "EchoSubtask"]
+    assert all(timing.pid != os.getpid()
+               for timing in manager.run_timings.timings)
+
+
+class ImportedModulesSubtask(speedwagon.tasks.Subtask):
+    def work(self) -> bool:
+        self.set_results("colorsys" in sys.modules)
+        return True
+
+
+def test_prewarm_imports_modules_in_workers():
+    assert "colorsys" not in sys.modules
+    with execution.JobManager(max_workers=2,
+                              prewarm_modules=["colorsys"]) as manager:
+        manager.prewarm()
+        assert len(manager._executor._processes) == 2
+
+        manager.add_job(
+            execution.SubtaskJobAdapter(ImportedModulesSubtask()),
+            settings={}
+        )
+        manager.start()
+        results = list(manager.get_results())
+
+    assert [result.data for result in results] == [True]
+
+
+def test_subtask_descriptor_rebuilds_subtask():
+    subtask = EchoSubtask("spam")
+    subtask.subtask_working_dir = "/tmp/echo"
+    descriptor = execution.SubtaskJobAdapter(subtask).describe()
+
+    rebuilt = pickle.loads(pickle.dumps(descriptor)).build()
+
+    assert type(rebuilt) is EchoSubtask
+    assert rebuilt.message == "spam"
+    assert rebuilt._working_dir == "/tmp/echo"
+    assert rebuilt.status == speedwagon.tasks.TaskStatus.IDLE
+    assert "_status" not in descriptor.fields
+
+
+def test_subtask_descriptors_share_field_names():
+    first = execution.SubtaskDescriptor.from_subtask(EchoSubtask("spam"))
+    second = execution.SubtaskDescriptor.from_subtask(EchoSubtask("eggs"))
+    assert first.fields is second.fields
+
+
+def test_pending_jobs_start_with_most_expensive():
+    pending = execution._PendingJobs()
+    for message, cost in [("small", 1), ("unknown", None), ("large", 100),
+                          ("medium", 10), ("unknown too", None)]:
+        subtask = EchoSubtask(message)
+        subtask.cost = cost
+        pending.put(execution.JobPair(
+            execution.SubtaskJobAdapter(subtask), {}))
+
+    assert pending.peek().task.adaptee.message == "large"
+    assert [pending.get().task.adaptee.message for _ in range(5)] == \
+        ["large", "medium", "small", "unknown", "unknown too"]
+
+
+def test_sequence_cost_includes_following_jobs():
+    first, second = EchoSubtask("mkdir"), EchoSubtask("convert")
+    second.cost = 50
+    job_pair = execution.JobPair(
+        execution.SubtaskJobAdapter(first), {},
+        remaining=(execution.JobPair(execution.SubtaskJobAdapter(second),
+                                     {}),)
+    )
+    assert execution._sequence_cost(job_pair) == 50
+
+
+class PartialOutputSubtask(speedwagon.tasks.Subtask):
+    def __init__(self, output_file):
+        super().__init__()
+        self.output_file = output_file
+
+    def work(self) -> bool:
+        with open(self.output_file, "w") as output:
+            output.write("partial")
+        time.sleep(60)
+        return True
+
+    def partial_output_files(self):
+        return [self.output_file]
+
+
+def test_abort_terminates_running_jobs(tmpdir):
+    output_file = tmpdir / "partial.txt"
+    with execution.JobManager(max_workers=1) as manager:
+        manager.add_job(
+            execution.SubtaskJobAdapter(
+                PartialOutputSubtask(output_file.strpath)),
+            settings={}
+        )
+        manager.start()
+        while not output_file.exists():
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        manager.abort()
+        assert time.monotonic() - started < 10
+        assert not output_file.exists()
+
+        # The pool is rebuilt, so the manager can still be used
+        manager.add_job(execution.SubtaskJobAdapter(EchoSubtask("after")),
+                        settings={})
+        manager.start()
+        assert [result.data for result in manager.get_results()] == ["after"]
+
+
+def test_abort_keeps_files_the_run_did_not_create(tmpdir):
+    existing_output = tmpdir / "existing.txt"
+    existing_output.write_text("keep", encoding="utf8")
+    queued_output = tmpdir / "queued.txt"
+    queued_output.write_text("keep", encoding="utf8")
+    with execution.JobManager(max_workers=1) as manager:
+        for output_file in [existing_output, queued_output]:
+            manager.add_job(
+                execution.SubtaskJobAdapter(
+                    PartialOutputSubtask(output_file.strpath)),
+                settings={}
+            )
+        manager.start()
+        while existing_output.read_text(encoding="utf8") != "partial":
+            time.sleep(0.01)
+
+        manager.abort()
+
+    # The running job overwrote a file that was there before it started,
+    # and the queued job never started
+    assert existing_output.exists()
+    assert queued_output.read_text(encoding="utf8") == "keep"
+
+
+def test_error_in_manager_context_cancels_pending_jobs(tmpdir):
+    running_output = tmpdir / "running.txt"
+    queued_output = tmpdir / "queued.txt"
+    started = time.monotonic()
+    with pytest.raises(RuntimeError):
+        with execution.JobManager(max_workers=1) as manager:
+            for output_file in [running_output, queued_output]:
+                manager.add_job(
+                    execution.SubtaskJobAdapter(
+                        PartialOutputSubtask(output_file.strpath)),
+                    settings={}
+                )
+            manager.start()
+            while not running_output.exists():
+                time.sleep(0.01)
+            raise RuntimeError("Workflow failed")
+
+    assert time.monotonic() - started < 30
+    assert not running_output.exists()
+    assert not queued_output.exists()
+
+
+def test_forwarder_survives_a_bad_message(caplog):
+    caplog.set_level("INFO", logger=execution.__name__)
+    with execution.JobManager() as manager:
+        manager._message_queue.put(None)
+        manager._message_queue.put(["spam"])
+        manager._sync_messages()
+
+        assert manager._forwarder.is_alive()
+    assert "Unable to forward a job message" in caplog.messages
+    assert "spam" in caplog.messages
+
+
+def test_sync_messages_returns_when_forwarder_stopped():
+    with execution.JobManager() as manager:
+        manager._message_queue.put(execution.MessageChannelControl.STOP)
+        manager._forwarder.join()
+        manager._sync_messages()
+        manager._open_message_channel()
+
+
+def test_message_channel_without_close():
+    # multiprocessing.SimpleQueue has no close() before Python 3.9
+    execution.JobManager._close_message_channel(queue.Queue())
+
+
+def test_add_job_waits_for_room_in_pending_jobs():
+    with execution.JobManager(max_workers=1, max_in_flight=1) as manager:
+        manager.max_pending = 1
+        manager.start()
+        waiting = []
+        for message in ["spam", "eggs", "bacon", "ham"]:
+            manager.add_job(
+                execution.SubtaskJobAdapter(EchoSubtask(message)),
+                settings={})
+            waiting.append(manager._pending_jobs.qsize())
+        results = [result.data for result in manager.get_results()]
+
+    assert max(waiting) <= 1
+    assert sorted(results) == ["bacon", "eggs", "ham", "spam"]
+
+
+def test_max_pending_defaults_to_multiple_of_max_in_flight():
+    with execution.JobManager(max_in_flight=3) as manager:
+        assert manager.max_pending == 3 * manager.PENDING_PER_IN_FLIGHT
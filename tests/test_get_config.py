@@ -8,6 +8,7 @@ import speedwagon.config
 import pytest
 
 from speedwagon.models import SettingsModel
+import speedwagon.job
 from speedwagon.job import all_required_workflow_keys
 
 
@@ -92,7 +93,7 @@ def test_serialize_settings_model():
     cfg_parser = configparser.ConfigParser()
     original_settings = cfg_parser["GLOBAL"] = original_settings
 
-    my_model = speedwagon.config.SettingsModel()
+    my_model = SettingsModel()
     for k, v in original_settings.items():
         my_model.add_setting(k, v)
 
@@ -283,3 +284,53 @@ def test_add_empty_keys_if_missing(tmpdir):
         expected_keys=keys_that_exist.union(keys_that_dont_exist)
     )
     assert missing_keys is None
+
+
+def test_generate_default_max_workers_is_auto(default_config_file):
+    config_data = configparser.ConfigParser()
+    config_data.read(default_config_file)
+    assert config_data['GLOBAL']['max_workers'] == "auto"
+
+
+@pytest.mark.parametrize("resource_profile, expected_workers", [
+    (speedwagon.job.ResourceProfile.CPU_BOUND, 4),
+    (speedwagon.job.ResourceProfile.IO_BOUND, 4),
+    (speedwagon.job.ResourceProfile.MEMORY_BOUND, 2),
+])
+def test_resolve_max_workers_auto(monkeypatch, resource_profile,
+                                  expected_workers):
+    monkeypatch.setattr(speedwagon.config.os, "cpu_count", lambda: 4)
+    assert speedwagon.config.resolve_max_workers(
+        "auto", resource_profile) == expected_workers
+
+
+def test_resolve_io_workers(monkeypatch):
+    monkeypatch.setattr(speedwagon.config.os, "cpu_count", lambda: 4)
+    assert speedwagon.config.resolve_io_workers() == 8
+
+
+def test_resolve_max_workers_number():
+    assert speedwagon.config.resolve_max_workers("3") == 3
+
+
+@pytest.mark.parametrize("value", ["0", "-2", "lots"])
+def test_resolve_max_workers_invalid(value):
+    with pytest.raises(ValueError):
+        speedwagon.config.resolve_max_workers(value)
+
+
+def test_get_max_workers_workflow_section(tmpdir):
+    class DummyWorkflow(speedwagon.job.AbsWorkflow):
+        name = "Dummy Workflow"
+
+        def discover_task_metadata(self, initial_results, additional_data,
+                                   **user_args):
+            return []
+
+    config_file = str(os.path.join(tmpdir, "config.ini"))
+    with open(config_file, "w") as wf:
+        wf.write("[GLOBAL]\nmax_workers = 2\n\n"
+                 "[Dummy Workflow]\nmax_workers = 5\n")
+
+    assert speedwagon.config.get_max_workers(
+        config_file, DummyWorkflow()) == 5
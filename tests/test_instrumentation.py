@@ -0,0 +1,116 @@
+import cProfile
+import csv
+import io
+import json
+
+from speedwagon import instrumentation
+
+
+def timing(subtask, pid=100, start=1000.0, wall_time=0.5, read_bytes=10):
+    return instrumentation.SubtaskTiming(
+        subtask=subtask,
+        pid=pid,
+        thread_id=1,
+        start=start,
+        wall_time=wall_time,
+        cpu_time=0.25,
+        max_rss=2048,
+        read_bytes=read_bytes,
+        written_bytes=None
+    )
+
+
+def test_measure_returns_value_and_timing():
+    value, result = instrumentation.measure("Spam", sum, [1, 2, 3])
+
+    assert value == 6
+    assert result.subtask == "Spam"
+    assert result.wall_time >= 0
+    assert result.cpu_time >= 0
+
+
+def test_trace_events_are_relative_to_run_start():
+    run_timings = instrumentation.RunTimings("Dummy")
+    run_timings.extend([
+        timing("Spam", pid=100, start=1000.0),
+        timing("Eggs", pid=200, start=1001.5, wall_time=0.25),
+    ])
+
+    stream = io.StringIO()
+    run_timings.write_trace(stream)
+    events = json.loads(stream.getvalue())["traceEvents"]
+
+    assert [event["args"]["name"] for event in events
+            if event["ph"] == "M"] == ["Dummy worker 100", "Dummy worker 200"]
+    eggs = next(event for event in events if event["name"] == "Eggs")
+    assert eggs["ph"] == "X"
+    assert eggs["ts"] == 1.5e6
+    assert eggs["dur"] == 0.25e6
+    assert eggs["pid"] == 200
+
+
+def test_summary_has_row_per_subtask_and_workflow():
+    run_timings = instrumentation.RunTimings("Dummy")
+    run_timings.extend([
+        timing("Spam"),
+        timing("Spam", wall_time=1.5),
+        timing("Eggs", read_bytes=None),
+    ])
+
+    stream = io.StringIO()
+    run_timings.write_summary(stream)
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+
+    assert [(row["subtask"], row["count"]) for row in rows] == \
+        [("Eggs", "1"), ("Spam", "2"), ("", "3")]
+    spam = rows[1]
+    assert float(spam["total_wall_time"]) == 2.0
+    assert float(spam["max_wall_time"]) == 1.5
+    assert spam["read_bytes"] == "20"
+    assert rows[0]["read_bytes"] == ""
+    assert rows[2]["max_rss"] == "2048"
+
+
+def busy_function(count):
+    return sum(range(count))
+
+
+def test_profiles_are_merged(tmpdir):
+    profile_directory = str(tmpdir)
+    for count in [10, 20]:
+        assert instrumentation.profile(
+            profile_directory, busy_function, count) == sum(range(count))
+    instrumentation.save_profile(profile_directory)
+
+    stats = instrumentation.merge_profiles(profile_directory)
+    report = instrumentation.hot_functions(stats)
+
+    assert "busy_function" in report
+    busy_stats = next(value for key, value in stats.stats.items()
+                      if key[2] == "busy_function")
+    assert busy_stats[1] == 2
+
+
+def test_merge_profiles_without_profiles(tmpdir):
+    assert instrumentation.merge_profiles(str(tmpdir)) is None
+
+
+def test_save_profile_without_profiled_calls(tmpdir):
+    instrumentation.save_profile(str(tmpdir))
+    assert tmpdir.listdir() == []
+
+
+def test_merge_profiles_skips_empty_profiles(tmpdir):
+    profile_directory = str(tmpdir)
+    cProfile.Profile().dump_stats(tmpdir.join("0-empty.prof").strpath)
+    instrumentation.profile(profile_directory, busy_function, 10)
+    instrumentation.save_profile(profile_directory)
+
+    stats = instrumentation.merge_profiles(profile_directory)
+
+    assert "busy_function" in instrumentation.hot_functions(stats)
+
+
+def test_merge_profiles_with_only_empty_profiles(tmpdir):
+    cProfile.Profile().dump_stats(tmpdir.join("0-empty.prof").strpath)
+    assert instrumentation.merge_profiles(str(tmpdir)) is None
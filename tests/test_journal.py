@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+import speedwagon.tasks
+from speedwagon import journal
+
+
+class DummySubtask(speedwagon.tasks.Subtask):
+    def __init__(self, file_name):
+        super().__init__()
+        self.file_name = file_name
+
+    def work(self) -> bool:
+        self.set_results(self.file_name)
+        return True
+
+
+@pytest.fixture
+def journal_file(tmpdir):
+    return os.path.join(tmpdir, "journal.sqlite")
+
+
+def test_subtask_key_ignores_working_dir():
+    first = DummySubtask("spam.tif")
+    first.subtask_working_dir = "/tmp/run1"
+    second = DummySubtask("spam.tif")
+    second.subtask_working_dir = "/tmp/run2"
+    assert journal.subtask_key(first) == journal.subtask_key(second)
+
+
+def test_subtask_key_depends_on_arguments():
+    assert journal.subtask_key(DummySubtask("spam.tif")) != \
+        journal.subtask_key(DummySubtask("eggs.tif"))
+
+
+def test_resume_keeps_recorded_results(journal_file):
+    key = journal.subtask_key(DummySubtask("spam.tif"))
+    result = speedwagon.tasks.Result(DummySubtask, "spam.tif")
+    options = {"Input": "/data"}
+
+    with journal.RunJournal(journal_file) as run_journal:
+        run_journal.start_run("Dummy", options)
+        run_journal.record(key, result)
+
+    with journal.RunJournal(journal_file) as run_journal:
+        assert run_journal.has_unfinished_run("Dummy", options)
+        assert not run_journal.has_unfinished_run("Dummy", {"Input": "/"})
+        run_journal.start_run("Dummy", options, resume=True)
+        assert run_journal.is_completed(key)
+        assert run_journal.completed_result(key) == result
+
+
+def test_start_without_resume_discards_results(journal_file):
+    key = journal.subtask_key(DummySubtask("spam.tif"))
+    with journal.RunJournal(journal_file) as run_journal:
+        run_journal.start_run("Dummy", {})
+        run_journal.record(key, None)
+
+    with journal.RunJournal(journal_file) as run_journal:
+        run_journal.start_run("Dummy", {}, resume=False)
+        assert not run_journal.is_completed(key)
+
+
+def test_finish_run_forgets_results(journal_file):
+    with journal.RunJournal(journal_file) as run_journal:
+        run_journal.start_run("Dummy", {})
+        run_journal.record("spam", None)
+        run_journal.finish_run()
+
+    with journal.RunJournal(journal_file) as run_journal:
+        assert not run_journal.has_unfinished_run("Dummy", {})
+
+
+class Unrepresentable:
+    pass
+
+
+def test_subtask_key_rejects_arguments_without_stable_repr():
+    with pytest.raises(ValueError):
+        journal.subtask_key(DummySubtask(Unrepresentable()))
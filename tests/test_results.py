@@ -0,0 +1,33 @@
+import pytest
+
+from speedwagon import results, tasks
+
+
+@pytest.fixture
+def store(tmpdir):
+    with results.ResultStore.in_directory(tmpdir) as result_store:
+        yield result_store
+
+
+def test_store_keeps_results_in_order(store, monkeypatch):
+    monkeypatch.setattr(results.ResultStore, "BATCH_SIZE", 3)
+    store += [tasks.Result(tasks.Subtask, i) for i in range(10)]
+    store.append(tasks.Result(tasks.Subtask, 10))
+
+    assert len(store) == 11
+    assert [result.data for result in store] == list(range(11))
+
+
+def test_store_indexing(store):
+    store.extend(["spam", "bacon", "eggs"])
+
+    assert store[0] == "spam"
+    assert store[-1] == "eggs"
+    assert store[1:] == ["bacon", "eggs"]
+    with pytest.raises(IndexError):
+        store[3]
+
+
+def test_store_can_be_sorted(store):
+    store.extend([3, 1, 2])
+    assert sorted(store) == [1, 2, 3]
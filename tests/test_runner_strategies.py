@@ -0,0 +1,159 @@
+import io
+import logging
+import os
+
+import pytest
+
+import speedwagon
+from speedwagon import journal, runner_strategies, tasks, worker
+
+
+class EchoSubtask(speedwagon.Subtask):
+    def __init__(self, message):
+        super().__init__()
+        self.message = message
+
+    def work(self) -> bool:
+        self.log(f"echo {self.message}")
+        self.set_results(self.message)
+        return True
+
+
+class EchoWorkflow(speedwagon.Workflow):
+    name = "Echo"
+
+    def discover_task_metadata(self, initial_results, additional_data,
+                               **user_args):
+        return [{"message": message} for message in user_args["messages"]]
+
+    def create_new_task(self, task_builder: tasks.TaskBuilder, **job_args):
+        task_builder.add_subtask(EchoSubtask(job_args["message"]))
+
+    @classmethod
+    def generate_report(cls, results, **user_args):
+        return ", ".join(sorted(result.data for result in results))
+
+    def user_options(self):
+        return []
+
+
+class AskingWorkflow(EchoWorkflow):
+    def get_additional_info(self, parent, options, pretask_results):
+        return {"answer": 42}
+
+
+def test_headless_runner_runs_workflow():
+    progress = io.StringIO()
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.INFO)
+
+    with worker.JobManager() as manager:
+        runner = runner_strategies.RunRunner(
+            runner_strategies.UsingHeadlessManager(manager, stream=progress)
+        )
+        succeeded = runner.run(None, EchoWorkflow(),
+                               {"messages": ["spam", "eggs"]}, logger)
+
+    assert succeeded is True
+    assert progress.getvalue().splitlines()[-2] == "Echo: 2/2"
+
+
+def test_headless_runner_rejects_interactive_workflow():
+    with worker.JobManager() as manager:
+        runner = runner_strategies.RunRunner(
+            runner_strategies.UsingHeadlessManager(manager,
+                                                   stream=io.StringIO())
+        )
+        succeeded = runner.run(None, AskingWorkflow(), {"messages": []},
+                               logging.getLogger(__name__))
+
+    assert succeeded is False
+
+
+def test_headless_runner_saves_merged_profile(tmpdir):
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.INFO)
+
+    with worker.JobManager() as manager:
+        manager.profiles_path = str(tmpdir)
+        runner = runner_strategies.RunRunner(
+            runner_strategies.UsingHeadlessManager(manager,
+                                                   stream=io.StringIO())
+        )
+        assert runner.run(None, EchoWorkflow(),
+                          {"messages": ["spam", "eggs"]}, logger)
+
+    assert manager.profile_directory is None
+    assert [os.path.splitext(name)[1] for name in os.listdir(tmpdir)] == \
+        [".prof"]
+
+
+def test_invalid_max_workers_setting_falls_back_to_auto(tmpdir, caplog):
+    config_file = tmpdir / "config.ini"
+    config_file.write_text("[GLOBAL]\nmax_workers = lots\n", encoding="utf8")
+
+    with worker.JobManager() as manager:
+        manager.configuration_file = str(config_file)
+        runner = runner_strategies.RunRunner(
+            runner_strategies.UsingHeadlessManager(manager,
+                                                   stream=io.StringIO())
+        )
+        assert runner.run(None, EchoWorkflow(), {"messages": ["spam"]},
+                          logging.getLogger(__name__))
+
+    assert "Invalid value for max_workers: lots" in caplog.text
+
+
+@pytest.mark.parametrize("resume, expected_report", [
+    (True, "recorded"),
+    (False, "spam"),
+])
+def test_headless_runner_resume(tmpdir, caplog, resume, expected_report):
+    caplog.set_level(logging.INFO)
+    options = {"messages": ["spam"]}
+    with journal.RunJournal.in_directory(str(tmpdir)) as run_journal:
+        run_journal.start_run(EchoWorkflow.name, options)
+        run_journal.record(journal.subtask_key(EchoSubtask("spam")),
+                           tasks.Result(EchoSubtask, "recorded"))
+
+    with worker.JobManager() as manager:
+        manager.settings_path = str(tmpdir)
+        runner = runner_strategies.RunRunner(
+            runner_strategies.UsingHeadlessManager(
+                manager, stream=io.StringIO(), resume=resume)
+        )
+        assert runner.run(None, EchoWorkflow(), options,
+                          logging.getLogger(__name__))
+
+    assert caplog.records[-1].getMessage() == expected_report
+
+
+class FailingDiscoveryWorkflow(EchoWorkflow):
+    name = "Failing discovery"
+
+    def discover_task_metadata(self, initial_results, additional_data,
+                               **user_args):
+        yield from super().discover_task_metadata(
+            initial_results, additional_data, **user_args)
+        raise RuntimeError("Unable to read the input")
+
+
+def test_manager_can_be_reused_after_discovery_fails():
+    logger = logging.getLogger(__name__)
+    with worker.JobManager(max_workers=1) as manager:
+        runner = runner_strategies.RunRunner(
+            runner_strategies.UsingHeadlessManager(manager,
+                                                   stream=io.StringIO())
+        )
+        with pytest.raises(RuntimeError):
+            runner.run(None, FailingDiscoveryWorkflow(),
+                       {"messages": ["stale"]}, logger)
+
+        assert not manager.active
+        manager.max_workers = 2
+
+        manager.add_job(worker.SubtaskJobAdapter(EchoSubtask("fresh")),
+                        settings={})
+        manager.start()
+        assert [result.data for result in manager.get_results()] == \
+            ["fresh"]
@@ -2,7 +2,9 @@ import logging
 import os
 import shutil
 import time
+import queue
 import typing
+from unittest.mock import Mock
 import concurrent.futures
 import pytest
 import speedwagon.tasks
@@ -30,6 +32,23 @@ class SimpleSubtask(speedwagon.tasks.Subtask):
         return {"message": self.message}
 
 
+class SleepySubtask(speedwagon.tasks.Subtask):
+
+    def __init__(self, message, seconds):
+        super().__init__()
+        self.message = message
+        self.seconds = seconds
+
+    def work(self) -> bool:
+        time.sleep(self.seconds)
+        self.set_results(self.message)
+        return True
+
+    @property
+    def settings(self):
+        return {"message": self.message, "seconds": self.seconds}
+
+
 class SimplePreTask(speedwagon.tasks.Subtask):
 
     def __init__(self, message):
@@ -303,7 +322,7 @@ def test_adapter_results_with_posttask(tmpdir):
             adapted_tool = speedwagon.worker.SubtaskJobAdapter(subtask)
             manager.add_job(adapted_tool, adapted_tool.settings)
 
-        for message in manager._pending_jobs.queue:
+        for *_, message in sorted(manager._pending_jobs.queue):
             print(message)
             queued_order.append(message.args['message'])
 
@@ -332,3 +351,257 @@ def test_adapter_results_with_posttask(tmpdir):
 
     if os.path.exists(shortcut):
         os.unlink(shortcut)
+
+
+@pytest.mark.adapter
+def test_adapter_jobs_added_after_start_are_submitted(
+        simple_task_builder_with_2_subtasks):
+
+    new_task = simple_task_builder_with_2_subtasks.build_task()
+
+    with worker.ToolJobManager() as manager:
+        manager.start()
+        for subtask in new_task.main_subtasks:
+            adapted_tool = speedwagon.worker.SubtaskJobAdapter(subtask)
+            manager.add_job(adapted_tool, adapted_tool.settings)
+            assert manager._pending_jobs.empty()
+
+        results = [r.data for r in manager.get_results()]
+
+        assert results == ["First", "Second"]
+
+
+@pytest.mark.adapter
+def test_adapter_limits_jobs_in_flight(tmpdir):
+    builder = TaskBuilder(SimpleTaskBuilder(), tmpdir.mkdir("test"))
+    for i in range(5):
+        builder.add_subtask(subtask=SimpleSubtask(str(i)))
+    new_task = builder.build_task()
+
+    with worker.ToolJobManager(max_in_flight=2) as manager:
+        for subtask in new_task.main_subtasks:
+            adapted_tool = speedwagon.worker.SubtaskJobAdapter(subtask)
+            manager.add_job(adapted_tool, adapted_tool.settings)
+        manager.start()
+        assert len(manager.futures) == 2
+        assert manager._pending_jobs.qsize() == 3
+
+        results = [r.data for r in manager.get_results()]
+
+    assert sorted(results) == ["0", "1", "2", "3", "4"]
+
+
+def test_max_in_flight_defaults_to_multiple_of_workers():
+    with worker.ToolJobManager(max_workers=3) as manager:
+        assert manager.max_in_flight == 3 * manager.IN_FLIGHT_PER_WORKER
+
+
+@pytest.mark.adapter
+def test_adapter_results_in_completion_order(tmpdir):
+    builder = TaskBuilder(SimpleTaskBuilder(), tmpdir.mkdir("test"))
+    builder.add_subtask(subtask=SleepySubtask("slow", seconds=1))
+    builder.add_subtask(subtask=SleepySubtask("fast", seconds=0))
+    new_task = builder.build_task()
+
+    with worker.ToolJobManager(max_workers=2) as manager:
+        for subtask in new_task.main_subtasks:
+            adapted_tool = speedwagon.worker.SubtaskJobAdapter(subtask)
+            manager.add_job(adapted_tool, adapted_tool.settings)
+        manager.start()
+        results = [r.data for r in manager.get_results()]
+
+    assert results == ["fast", "slow"]
+
+
+@pytest.mark.adapter
+def test_adapter_results_with_qt_event_loop(
+        qtbot, simple_task_builder_with_2_subtasks):
+
+    new_task = simple_task_builder_with_2_subtasks.build_task()
+    progress = []
+    with worker.ToolJobManager() as manager:
+        for subtask in new_task.main_subtasks:
+            adapted_tool = speedwagon.worker.SubtaskJobAdapter(subtask)
+            manager.add_job(adapted_tool, adapted_tool.settings)
+        manager.start()
+        results = [
+            r.data for r in manager.get_results(
+                lambda current, total: progress.append((current, total))
+            )
+        ]
+
+    assert results == ["First", "Second"]
+    assert progress[-1] == (2, 2)
+
+
+def test_message_batcher_sends_full_batches():
+    channel = queue.Queue()
+    batcher = worker.MessageBatcher(channel, max_messages=2, max_delay=60)
+    for message in ["a", "b", "c"]:
+        batcher.put(message)
+    assert channel.get_nowait() == ["a", "b"]
+    assert channel.empty()
+    batcher.flush()
+    assert channel.get_nowait() == ["c"]
+
+
+def test_message_batcher_sends_after_delay():
+    channel = queue.Queue()
+    batcher = worker.MessageBatcher(channel, max_messages=100, max_delay=.01)
+    batcher.put("a")
+    assert channel.get(timeout=5) == ["a"]
+
+
+class LightweightSubtask(SimpleSubtask):
+    lightweight = True
+
+
+@pytest.mark.adapter
+def test_adapter_runs_lightweight_jobs_in_chunks(tmpdir):
+    builder = TaskBuilder(SimpleTaskBuilder(), tmpdir.mkdir("test"))
+    for i in range(5):
+        builder.add_subtask(subtask=LightweightSubtask(str(i)))
+    new_task = builder.build_task()
+
+    with worker.ToolJobManager(max_in_flight=1) as manager:
+        manager._lightweight_job_duration = \
+            manager.CHUNK_TARGET_DURATION / 10
+        for subtask in new_task.main_subtasks:
+            adapted_tool = speedwagon.worker.SubtaskJobAdapter(subtask)
+            manager.add_job(adapted_tool, adapted_tool.settings)
+        manager.start()
+        assert len(manager.futures) == 1
+        assert manager._pending_jobs.empty()
+
+        results = [r.data for r in manager.get_results()]
+
+    assert results == ["0", "1", "2", "3", "4"]
+
+
+def test_chunk_size_adapts_to_job_duration():
+    with worker.ToolJobManager() as manager:
+        assert manager.chunk_size == 1
+        manager._lightweight_job_duration = manager.CHUNK_TARGET_DURATION / 4
+        assert manager.chunk_size == 4
+        manager._lightweight_job_duration = 1e-9
+        assert manager.chunk_size == manager.MAX_CHUNK_SIZE
+
+
+@pytest.mark.adapter
+def test_adapter_job_sequence_runs_in_order(tmpdir):
+    first_task = TaskBuilder(SimpleTaskBuilder(), tmpdir.mkdir("first"))
+    first_task.add_subtask(subtask=SleepySubtask("first 1", seconds=1))
+    first_task.add_subtask(subtask=SleepySubtask("first 2", seconds=0))
+
+    second_task = TaskBuilder(SimpleTaskBuilder(), tmpdir.mkdir("second"))
+    second_task.add_subtask(subtask=SleepySubtask("second", seconds=0))
+
+    with worker.ToolJobManager(max_workers=2) as manager:
+        for builder in [first_task, second_task]:
+            manager.add_job_sequence([
+                (adapted_tool, adapted_tool.settings) for adapted_tool in
+                map(speedwagon.worker.SubtaskJobAdapter,
+                    builder.build_task().subtasks)
+            ])
+        manager.start()
+        results = [r.data for r in manager.get_results()]
+
+    assert results == ["second", "first 1", "first 2"]
+
+
+class ProcessIdSubtask(speedwagon.tasks.Subtask):
+
+    def work(self) -> bool:
+        self.log("processing")
+        self.set_results(os.getpid())
+        return True
+
+
+class IoBoundProcessIdSubtask(ProcessIdSubtask):
+    resource_profile = speedwagon.tasks.ResourceProfile.IO_BOUND
+
+
+@pytest.mark.adapter
+def test_adapter_runs_io_bound_jobs_on_threads(tmpdir):
+    logs = []
+    builder = TaskBuilder(SimpleTaskBuilder(), tmpdir.mkdir("test"))
+    builder.add_subtask(subtask=ProcessIdSubtask())
+    builder.add_subtask(subtask=IoBoundProcessIdSubtask())
+
+    with worker.ToolJobManager() as manager:
+        manager.logger.setLevel(logging.INFO)
+        manager.logger.addHandler(LogCatcher(logs))
+        for subtask in builder.build_task().main_subtasks:
+            adapted_tool = speedwagon.worker.SubtaskJobAdapter(subtask)
+            manager.add_job(adapted_tool, adapted_tool.settings)
+        manager.start()
+        results = {r.source: r.data for r in manager.get_results()}
+
+    assert results[IoBoundProcessIdSubtask] == os.getpid()
+    assert results[ProcessIdSubtask] != os.getpid()
+    assert [log.message for log in logs] == ["processing", "processing"]
+
+
+class IoBoundSleepySubtask(SleepySubtask):
+    resource_profile = speedwagon.tasks.ResourceProfile.IO_BOUND
+
+
+@pytest.mark.adapter
+def test_abort_with_qt_event_loop_waits_for_io_jobs(qtbot, tmpdir):
+    builder = TaskBuilder(SimpleTaskBuilder(), tmpdir.mkdir("test"))
+    builder.add_subtask(subtask=IoBoundSleepySubtask("slow", seconds=1))
+
+    with worker.ToolJobManager() as manager:
+        for subtask in builder.build_task().main_subtasks:
+            adapted_tool = speedwagon.worker.SubtaskJobAdapter(subtask)
+            manager.add_job(adapted_tool, adapted_tool.settings)
+        manager.start()
+        running = list(manager.futures)
+        manager.abort()
+
+        assert all(future.done() for future in running)
+        assert list(manager.get_results()) == []
+
+
+@pytest.mark.adapter
+def test_max_workers_resizes_pool(tmpdir):
+    builder = TaskBuilder(SimpleTaskBuilder(), tmpdir.mkdir("resized"))
+    builder.add_subtask(subtask=SleepySubtask("resized", seconds=0))
+
+    with worker.ToolJobManager(max_workers=1) as manager:
+        original_executor = manager._executor
+        manager.max_workers = 2
+        assert manager.max_workers == 2
+        assert manager._executor is not original_executor
+
+        for subtask in builder.build_task().subtasks:
+            adapted_tool = speedwagon.worker.SubtaskJobAdapter(subtask)
+            manager.add_job(adapted_tool, adapted_tool.settings)
+        manager.start()
+        results = [r.data for r in manager.get_results()]
+
+    assert results == ["resized"]
+
+
+def test_max_workers_rejects_zero():
+    manager = worker.ToolJobManager()
+    with pytest.raises(ValueError):
+        manager.max_workers = 0
+
+
+def test_worker_resource_is_built_once(monkeypatch):
+    factory = Mock(side_effect=lambda lang: object())
+    monkeypatch.setattr(speedwagon.tasks, "_resource_factories", dict())
+    monkeypatch.setattr(speedwagon.tasks, "_worker_resources", dict())
+    speedwagon.tasks.register_worker_resource("dummy reader", factory)
+
+    english = speedwagon.tasks.worker_resource("dummy reader", "eng")
+    assert speedwagon.tasks.worker_resource("dummy reader", "eng") is english
+    assert speedwagon.tasks.worker_resource("dummy reader", "fra") \
+        is not english
+    assert factory.call_count == 2
+
+
+def test_worker_resource_not_registered():
+    with pytest.raises(KeyError):
+        speedwagon.tasks.worker_resource("no such resource")
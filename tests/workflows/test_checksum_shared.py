@@ -0,0 +1,222 @@
+import hashlib
+import os
+
+import pytest
+
+from speedwagon import tasks
+from speedwagon.workflows import checksum_shared
+
+
+def md5(path):
+    with open(path, "rb") as file_:
+        return hashlib.md5(file_.read()).hexdigest()
+
+
+@pytest.fixture
+def cache(tmpdir, monkeypatch):
+    monkeypatch.setattr(checksum_shared.ChecksumCache, "RACY_INTERVAL", 0)
+    return checksum_shared.ChecksumCache(str(tmpdir / "cache.sqlite"))
+
+
+@pytest.fixture
+def sample_file(tmpdir):
+    sample_file = tmpdir / "dummy.txt"
+    sample_file.write_text("spam", encoding="utf8")
+    return str(sample_file)
+
+
+def test_unchanged_file_is_not_hashed_again(cache, sample_file):
+    assert cache.checksum(sample_file, "md5", md5) == (md5(sample_file), False)
+
+    def fail(path):
+        raise AssertionError("File was hashed again")
+
+    assert cache.checksum(sample_file, "md5", fail) == (md5(sample_file), True)
+
+
+def test_changed_file_is_hashed_again(cache, sample_file):
+    cache.checksum(sample_file, "md5", md5)
+    with open(sample_file, "w", encoding="utf8") as file_:
+        file_.write("eggs and bacon")
+
+    assert cache.checksum(sample_file, "md5", md5) == (md5(sample_file), False)
+
+
+def test_strict_mode_rehashes(cache, sample_file):
+    cache.checksum(sample_file, "md5", md5)
+
+    assert cache.checksum(sample_file, "md5", lambda path: "new",
+                          strict=True) == ("new", False)
+    assert cache.checksum(sample_file, "md5", md5) == ("new", True)
+
+
+def test_only_missing_algorithms_are_calculated(cache, sample_file):
+    cache.checksum(sample_file, "md5", md5)
+    calculated = []
+
+    def calculate(path, algorithms):
+        calculated.extend(algorithms)
+        return {algorithm: algorithm.upper() for algorithm in algorithms}
+
+    assert cache.checksums(sample_file, ["md5", "sha256"], calculate) == \
+        ({"md5": md5(sample_file), "sha256": "SHA256"}, False)
+    assert calculated == ["sha256"]
+    assert cache.checksums(sample_file, ["md5", "sha256"], calculate)[1]
+
+
+def test_recently_modified_file_is_not_cached(cache, sample_file,
+                                              monkeypatch):
+    monkeypatch.setattr(checksum_shared.ChecksumCache, "RACY_INTERVAL", 60)
+    cache.checksum(sample_file, "md5", md5)
+
+    assert cache.get(cache.file_key(os.stat(sample_file)), "md5") is None
+
+
+def test_calculate_checksum_shares_cache(tmpdir, sample_file, monkeypatch):
+    monkeypatch.setattr(checksum_shared.ChecksumCache, "RACY_INTERVAL", 0)
+    cache_file = str(tmpdir / "cache.sqlite")
+    try:
+        assert checksum_shared.calculate_checksums(
+            sample_file, ["md5"], checksum_shared.hash_file
+        ) == ({"md5": md5(sample_file)}, None)
+        checksum_shared.calculate_checksums(
+            sample_file, ["md5"], checksum_shared.hash_file,
+            cache_file=cache_file)
+        assert checksum_shared.calculate_checksums(
+            sample_file, ["md5"], checksum_shared.hash_file,
+            cache_file=cache_file)[1] is True
+    finally:
+        tasks.clear_worker_resources()
+
+
+@pytest.mark.parametrize("hash_threads", [1, 2])
+@pytest.mark.parametrize("data", [b"", b"spam", b"spam and eggs" * 5])
+def test_hash_file_calculates_every_algorithm(tmpdir, monkeypatch, data,
+                                              hash_threads):
+    monkeypatch.setattr(checksum_shared, "HASH_BUFFER_SIZE", 4)
+    monkeypatch.setattr(checksum_shared, "HASH_THREADS", hash_threads)
+    sample_file = tmpdir / "dummy.bin"
+    sample_file.write_binary(data)
+
+    assert checksum_shared.hash_file(str(sample_file), ["md5", "sha256"]) == {
+        "md5": hashlib.md5(data).hexdigest(),
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def test_cache_hit_summary():
+    assert checksum_shared.cache_hit_summary([None, None]) is None
+    assert checksum_shared.cache_hit_summary([True, False, True, True]) == \
+        "Checksum cache: 3 of 4 files (75.0%) were unchanged since they " \
+        "were last hashed"
+
+
+def test_stat_sidecar_round_trip(tmpdir, sample_file):
+    sidecar = str(tmpdir / checksum_shared.SIDECAR_FILE_NAME)
+    stat = checksum_shared.file_stat(sample_file)
+    checksum_shared.write_stat_sidecar(
+        sidecar, [("dummy.txt", stat), ("sub/other file.txt", (1, 2))])
+
+    recorded = checksum_shared.read_stat_sidecar(sidecar)
+    assert recorded[os.path.normpath("sub/other file.txt")] == (1, 2)
+    assert checksum_shared.is_unchanged(sample_file, recorded["dummy.txt"])
+
+
+def test_missing_stat_sidecar_is_empty(tmpdir):
+    assert checksum_shared.read_stat_sidecar(str(tmpdir / "missing")) == {}
+
+
+def test_changed_file_is_not_unchanged(sample_file):
+    recorded_stat = checksum_shared.file_stat(sample_file)
+    with open(sample_file, "w", encoding="utf8") as file_:
+        file_.write("eggs and bacon")
+
+    assert not checksum_shared.is_unchanged(sample_file, recorded_stat)
+    assert not checksum_shared.is_unchanged(sample_file, None)
+
+
+@pytest.mark.parametrize("settings, sample", [
+    ({}, 0.05),
+    ({"quick_verify_sample": "0"}, 0),
+    ({"quick_verify_sample": "100"}, 1),
+])
+def test_quick_verify_sample(settings, sample):
+    assert checksum_shared.quick_verify_sample(settings) == sample
+
+
+@pytest.mark.parametrize("value", ["lots", "-1", "101"])
+def test_invalid_quick_verify_sample(value):
+    with pytest.raises(ValueError):
+        checksum_shared.quick_verify_sample({"quick_verify_sample": value})
+
+
+def test_quick_verify_summary():
+    assert checksum_shared.quick_verify_summary([True, True]) is None
+    assert "1 of 3" in checksum_shared.quick_verify_summary(
+        [True, False, True])
+
+
+@pytest.mark.parametrize("entries, expected", [
+    ([], b"\n"),
+    ([("a.txt", "1234"), ("sub/b.txt", "5678")],
+     b"1234 *a.txt\n5678 *sub/b.txt\n"),
+])
+def test_write_checksum_report(tmpdir, entries, expected):
+    report = tmpdir / "checksum.md5"
+    checksum_shared.write_checksum_report(str(report), entries)
+    assert report.read_binary().replace(os.linesep.encode(), b"\n") == \
+        expected
+
+
+def test_results_sorter_merges_runs(tmpdir, monkeypatch):
+    monkeypatch.setattr(checksum_shared.ChecksumResultsSorter, "RUN_SIZE", 3)
+    sorter = checksum_shared.ChecksumResultsSorter(str(tmpdir / "runs"))
+    file_names = ["e", "b", "g", "a", "f", "c", "d"]
+    for file_name in file_names:
+        for checksum_report in ["one/checksum.md5", "two/checksum.md5"]:
+            sorter.add({
+                checksum_shared.ResultsValues.CHECKSUM_FILE: checksum_report,
+                checksum_shared.ResultsValues.SOURCE_FILE: file_name,
+            })
+
+    sorted_results = sorter.sorted_results()
+    assert list(sorted_results) == ["one/checksum.md5", "two/checksum.md5"]
+    for checksums in sorted_results.values():
+        assert len(checksums.run_files) > 1
+        assert [
+            result[checksum_shared.ResultsValues.SOURCE_FILE]
+            for result in checksums
+        ] == sorted(file_names)
+
+
+def test_stat_sidecar_keeps_the_order_given(tmpdir):
+    # The entries are streamed from the sorted merge, not sorted again
+    sidecar = tmpdir / checksum_shared.SIDECAR_FILE_NAME
+    checksum_shared.write_stat_sidecar(
+        str(sidecar), iter([("b.txt", (3, 4)), ("a.txt", (1, 2))]))
+    assert sidecar.read_text(encoding="utf8").splitlines()[1:] == \
+        ["3\t4\tb.txt", "1\t2\ta.txt"]
+
+
+@pytest.mark.parametrize("skip_report, expected", [
+    (False, ["checksum.md5", "dummy.txt"]),
+    (True, ["dummy.txt"]),
+])
+def test_checksum_jobs_leave_out_generated_files(tmpdir, skip_report,
+                                                 expected):
+    package = tmpdir.mkdir("package")
+    for file_name in ["dummy.txt", "checksum.md5",
+                      checksum_shared.SIDECAR_FILE_NAME,
+                      checksum_shared.manifest_file_name("sha256")]:
+        (package / file_name).write_text("spam", encoding="utf8")
+    report = str(package / "checksum.md5")
+
+    jobs = list(
+        checksum_shared.checksum_jobs(
+            str(package), report, skip_report=skip_report,
+            **{checksum_shared.STRICT_OPTION: True})
+    )
+
+    assert sorted(job["filename"] for job in jobs) == expected
+    assert all(job["save_to_filename"] == report and job["strict"] and
+               not job["manifest"] for job in jobs)
@@ -1,10 +1,13 @@
 
+import hashlib
 import os
 
 import logging
 
+from speedwagon.workflows.checksum_shared import cache_file_setting
 from speedwagon.workflows.workflow_make_checksum import \
-    MakeChecksumBatchSingleWorkflow, MakeChecksumBatchMultipleWorkflow
+    MakeChecksumBatchSingleWorkflow, MakeChecksumBatchMultipleWorkflow, \
+    RegenerateChecksumBatchSingleWorkflow
 
 
 def test_singleChecksum(tool_job_manager_spy, tmpdir):
@@ -55,3 +58,71 @@ def test_multipleChecksum_has_options():
     workflow = MakeChecksumBatchMultipleWorkflow()
     user_options = workflow.user_options()
     assert len(user_options) > 0
+
+
+def test_singleChecksum_writes_sha256_manifest(tool_job_manager_spy, tmpdir):
+    sample_pkg_dir = tmpdir / "sample"
+    sample_pkg_dir.mkdir()
+    (sample_pkg_dir / "dummy.txt").write_text("spam", encoding="utf8")
+    tool_job_manager_spy.run(None,
+                             MakeChecksumBatchSingleWorkflow(),
+                             options={
+                                 "Input": sample_pkg_dir.realpath(),
+                                 "Write manifest-sha256.txt": True},
+                             logger=logging.getLogger())
+
+    manifest = sample_pkg_dir / "manifest-sha256.txt"
+    assert manifest.read_text(encoding="utf8") == \
+        f"{hashlib.sha256(b'spam').hexdigest()}  dummy.txt\n"
+
+
+def test_singleChecksum_report_is_sorted(tool_job_manager_spy, tmpdir):
+    sample_pkg_dir = tmpdir / "sample"
+    (sample_pkg_dir / "sub").ensure(dir=True)
+    (sample_pkg_dir / "sub" / "a.txt").write_text("spam", encoding="utf8")
+    (sample_pkg_dir / "b.txt").write_text("eggs", encoding="utf8")
+    tool_job_manager_spy.run(None,
+                             MakeChecksumBatchSingleWorkflow(),
+                             options={"Input": sample_pkg_dir.realpath()},
+                             logger=logging.getLogger())
+
+    report = sample_pkg_dir / "checksum.md5"
+    assert report.read_text(encoding="utf8") == \
+        f"{hashlib.md5(b'eggs').hexdigest()} *b.txt\n" \
+        f"{hashlib.md5(b'spam').hexdigest()} *{os.path.join('sub', 'a.txt')}\n"
+
+
+def test_settings_given_the_way_the_tab_does():
+    # WorkflowsTab.start passes the settings as a positional argument
+    workflow = MakeChecksumBatchSingleWorkflow(
+        {"checksum_cache": "checksum_cache.sqlite"})
+    assert cache_file_setting(workflow.global_settings) == \
+        "checksum_cache.sqlite"
+
+
+def test_rerun_does_not_checksum_generated_files(tool_job_manager_spy,
+                                                 tmpdir):
+    sample_pkg_dir = tmpdir / "sample"
+    sample_pkg_dir.mkdir()
+    (sample_pkg_dir / "dummy.txt").write_text("spam", encoding="utf8")
+    report = sample_pkg_dir / "checksum.md5"
+    tool_job_manager_spy.run(None,
+                             MakeChecksumBatchSingleWorkflow(),
+                             options={
+                                 "Input": sample_pkg_dir.realpath(),
+                                 "Write manifest-sha256.txt": True,
+                                 "Write quick verify sidecar": True},
+                             logger=logging.getLogger())
+    tool_job_manager_spy.run(None,
+                             RegenerateChecksumBatchSingleWorkflow(),
+                             options={
+                                 "Input": report.realpath(),
+                                 "Write manifest-sha256.txt": True,
+                                 "Write quick verify sidecar": True},
+                             logger=logging.getLogger())
+
+    assert report.read_text(encoding="utf8") == \
+        f"{hashlib.md5(b'spam').hexdigest()} *dummy.txt\n"
+    manifest = sample_pkg_dir / "manifest-sha256.txt"
+    assert manifest.read_text(encoding="utf8") == \
+        f"{hashlib.sha256(b'spam').hexdigest()}  dummy.txt\n"